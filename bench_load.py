@@ -0,0 +1,50 @@
+"""
+版位載入時間測試
+比較依序載入與多行程平行載入目前目錄下所有 moptt_*.json 的時間（皆轉換為精簡紀錄），
+用來決定 ptt_analysis.PARALLEL_MIN_BYTES：平行載入要扣掉行程啟動與傳回資料的成本後才有效益
+
+使用方式：python bench_load.py [重複次數] [行程數]
+    第一次載入會建立快照，之後的載入讀取快照；結果為快照建立後的中位數與最小值
+"""
+import os
+import statistics
+import sys
+import time
+
+import ptt_analysis
+from ptt_analysis import _load_board_files, find_board_files
+from ptt_records import COMPACT_SNAPSHOT, compact_posts
+
+DEFAULT_REPEAT = 5
+
+def measure(board_files, parallel, repeat, max_workers=None):
+    """載入 repeat 次，回傳每次的秒數"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _load_board_files(board_files, parallel, max_workers, compact_posts, COMPACT_SNAPSHOT)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEAT
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    board_files = find_board_files()
+    if len(board_files) < 2:
+        print("需要至少兩個 moptt_*.json 檔案")
+        return
+    total = sum(os.path.getsize(file) for file in board_files.values())
+    print(f"{len(board_files)} 個檔案，共 {total / 1024 / 1024:.1f} MB，CPU 核心數 {os.cpu_count()}")
+
+    # 暫時取消大小門檻，強制平行載入
+    ptt_analysis.PARALLEL_MIN_BYTES = 0
+    measure(board_files, False, 1)  # 建立快照
+    results = {}
+    for name, parallel in (('依序載入', False), ('平行載入', True)):
+        timings = measure(board_files, parallel, repeat, max_workers)
+        results[name] = statistics.median(timings)
+        print(f"{name:<10}{results[name] * 1000:>10.0f}ms（最小值 {min(timings) * 1000:.0f}ms）")
+    print(f"平行載入加速：{results['依序載入'] / results['平行載入']:.2f} 倍")
+
+if __name__ == "__main__":
+    main()
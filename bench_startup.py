@@ -0,0 +1,70 @@
+"""
+命令列啟動時間測試
+以子行程重複執行各個命令，統計從啟動到結束的時間（中位數與最小值），
+用來確認解析參數與載入模組的成本；排程中的短時間工作大部分時間都花在這裡
+
+使用方式：python bench_startup.py [重複次數] [JSON檔案]
+    有指定 JSON 檔案時另外測試 moptt convert 轉換該檔案（輸出到暫存目錄）的總時間
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REPEAT = 10
+
+COMMANDS = [
+    ('python（基準）', ['-c', 'pass']),
+    ('moptt --help', [os.path.join(BASE_DIR, 'moptt.py'), '--help']),
+    ('moptt convert --help', [os.path.join(BASE_DIR, 'moptt.py'), 'convert', '--help']),
+    ('import moptt', ['-c', 'import moptt']),
+    ('import ptt_export', ['-c', 'import ptt_export']),
+    ('import json_to_csv_converter', ['-c', 'import json_to_csv_converter']),
+    ('import simple_json_to_csv', ['-c', 'import simple_json_to_csv']),
+    ('import upload_to_sheets', ['-c', 'import upload_to_sheets']),
+    ('import pandas（參考）', ['-c', 'import pandas']),
+]
+
+def measure(args, repeat, cwd=BASE_DIR):
+    """執行命令 repeat 次，回傳每次的秒數；命令失敗時回傳 None"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable] + args, cwd=cwd, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return None
+    return timings
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEAT
+    commands = [(name, args, BASE_DIR) for name, args in COMMANDS]
+    work_dir = None
+    if len(sys.argv) > 2:
+        # 在暫存目錄中轉換，不覆蓋原本的輸出檔案
+        work_dir = tempfile.mkdtemp(prefix='moptt-bench-')
+        shutil.copy(sys.argv[2], work_dir)
+        json_file = os.path.basename(sys.argv[2])
+        commands.append((f'moptt convert {json_file}', [os.path.join(BASE_DIR, 'moptt.py'), 'convert', json_file],
+                         work_dir))
+
+    print(f"每個命令執行 {repeat} 次（{sys.executable}）")
+    print(f"{'命令':<36}{'中位數':>10}{'最小值':>10}")
+    try:
+        for name, args, cwd in commands:
+            timings = measure(args, repeat, cwd)
+            if timings is None:
+                print(f"{name:<36}執行失敗（缺少套件？）")
+                continue
+            print(f"{name:<36}{statistics.median(timings) * 1000:>8.0f}ms{min(timings) * 1000:>8.0f}ms")
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    main()
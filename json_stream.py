@@ -0,0 +1,95 @@
+"""
+串流式 JSON 讀取與 CSV 寫入
+版位檔案是一個很大的 JSON 陣列，iter_json_array 以固定大小的區塊讀取檔案，
+用 json.JSONDecoder.raw_decode 逐一解析陣列元素，記憶體中同時只保留一個區塊與一篇文章；
+write_csv_rows 將產生器產生的資料列分批寫入 CSV。只使用標準函式庫。
+"""
+import csv
+import json
+import os
+import re
+
+READ_SIZE = 1 << 20  # 每次從檔案讀取的字元數
+CHUNK_ROWS = 1000  # 每次寫入 CSV 的資料列數
+
+_WHITESPACE = re.compile(r'\s*')
+
+def iter_json_array(file_path, read_size=READ_SIZE):
+    """逐一產生 JSON 陣列檔案中的元素
+
+    檔案最外層不是陣列或格式錯誤時拋出 json.JSONDecodeError
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        eof = False
+
+        def fill():
+            """捨棄已解析的部分並讀入下一個區塊"""
+            nonlocal buffer, position, eof
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        def peek():
+            """略過空白，回傳下一個字元；檔案結束時回傳空字串"""
+            nonlocal position
+            while True:
+                position = _WHITESPACE.match(buffer, position).end()
+                if position < len(buffer):
+                    return buffer[position]
+                if eof:
+                    return ''
+                fill()
+
+        fill()
+        if peek() != '[':
+            raise json.JSONDecodeError("最外層不是 JSON 陣列", buffer, position)
+        position += 1
+        if peek() == ']':
+            return
+        while True:
+            peek()
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                    # 元素剛好在區塊尾端結束時可能被截斷（例如數字），讀入更多內容後重新解析
+                    if end < len(buffer) or eof:
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+            position = end
+            yield item
+
+            separator = peek()
+            if separator == ',':
+                position += 1
+            elif separator == ']':
+                return
+            else:
+                raise json.JSONDecodeError("陣列元素之間缺少逗號", buffer, position)
+
+def write_csv_rows(output_file, fieldnames, rows, chunk_rows=CHUNK_ROWS):
+    """將資料列分批寫入 CSV（utf-8-sig，與 pandas 的 to_csv 輸出格式相同），回傳寫入的列數
+
+    rows 可以是產生器，產生 dict（依 fieldnames 取值，缺少的欄位寫入空字串）
+    """
+    count = 0
+    with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator=os.linesep, extrasaction='ignore')
+        writer.writeheader()
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                writer.writerows(chunk)
+                count += len(chunk)
+                chunk = []
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
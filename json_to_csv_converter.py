@@ -1,19 +1,20 @@
 import json
-import pandas as pd
 import sys
 import os
 import glob
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 import pickle
+from ptt_export import FullCsvSink, export_board, flatten_post
+from ptt_incremental import incremental_export
 
 # Google Sheets API 設置
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+# pandas 與 Google API 套件在需要時才載入，串流或增量轉換不會因為匯入這些套件而延遲啟動
+
 def get_google_sheets_credentials():
     """獲取 Google Sheets API 認證"""
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
     creds = None
     # 檢查是否有已存在的 token
     if os.path.exists('token.pickle'):
@@ -42,6 +43,7 @@ def get_google_sheets_credentials():
 
 def upload_to_google_sheets(df, spreadsheet_name):
     """上傳 DataFrame 到 Google Sheets"""
+    from googleapiclient.discovery import build
     try:
         creds = get_google_sheets_credentials()
         if not creds:
@@ -105,7 +107,19 @@ def list_json_files():
         except ValueError:
             print("請輸入有效的數字")
 
-def convert_json_to_csv(input_file, output_file=None):
+def stream_json_to_csv(input_file, output_file=None):
+    """
+    以固定的記憶體用量將版位 JSON 檔案轉換為 CSV
+    
+    透過 ptt_export 的共用引擎串流讀取一次，輸出內容與 convert_json_to_csv 相同。回傳寫入的資料筆數。
+    """
+    if output_file is None:
+        output_file = os.path.splitext(input_file)[0] + '.csv'
+    count = export_board(input_file, [FullCsvSink(output_file)])
+    print(f"成功將 {input_file} 轉換為 {output_file}（串流模式，共 {count} 筆）")
+    return count
+
+def convert_json_to_csv(input_file, output_file=None, stream=False, incremental=False):
     """
     Convert a JSON file containing PTT board data to CSV format
     
@@ -113,30 +127,28 @@ def convert_json_to_csv(input_file, output_file=None):
         input_file (str): Path to the input JSON file
         output_file (str, optional): Path to the output CSV file. If not provided,
                                    will use the same name as input file with .csv extension
+        stream (bool, optional): Convert with constant memory (see stream_json_to_csv);
+                                 the Google Sheets upload prompt is skipped in this mode
+        incremental (bool, optional): Only append new posts and rewrite changed ones, using the
+                                      export state saved next to the CSV (see ptt_incremental);
+                                      the upload prompt is skipped in this mode as well
     """
     try:
+        if incremental:
+            if output_file is None:
+                output_file = os.path.splitext(input_file)[0] + '.csv'
+            return incremental_export(input_file, output_file, format='full')
+        if stream:
+            return stream_json_to_csv(input_file, output_file)
+        
+        import pandas as pd
+
         # Read JSON file
         with open(input_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
         # Process the data to flatten the comments
-        processed_data = []
-        for item in data:
-            comments_data = item.get('comments_data', {})
-            base_data = {k: v for k, v in item.items() if k != 'comments_data'}
-            
-            # Add comment statistics
-            base_data['total_comments'] = comments_data.get('total_comments', 0)
-            base_data['like_count'] = comments_data.get('like_count', 0)
-            base_data['dislike_count'] = comments_data.get('dislike_count', 0)
-            base_data['neutral_count'] = comments_data.get('neutral_count', 0)
-            
-            # Convert comments list to string to avoid nested structure
-            comments = comments_data.get('comments', [])
-            comments_str = json.dumps(comments, ensure_ascii=False)
-            base_data['comments'] = comments_str
-            
-            processed_data.append(base_data)
+        processed_data = [flatten_post(item) for item in data]
         
         # Convert to DataFrame
         df = pd.DataFrame(processed_data)
@@ -171,10 +183,14 @@ def convert_json_to_csv(input_file, output_file=None):
         print(f"發生錯誤：{str(e)}")
 
 def main():
-    if len(sys.argv) > 1:
+    # --stream：以固定記憶體用量轉換大型版位檔案；--incremental：只匯出新增與有變動的文章
+    stream = '--stream' in sys.argv
+    incremental = '--incremental' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg not in ('--stream', '--incremental')]
+    if args:
         # 如果提供命令列參數，直接使用
-        input_file = sys.argv[1]
-        output_file = sys.argv[2] if len(sys.argv) > 2 else None
+        input_file = args[0]
+        output_file = args[1] if len(args) > 1 else None
     else:
         # 否則進入互動模式
         input_file = list_json_files()
@@ -182,7 +198,7 @@ def main():
             return
         output_file = None
     
-    convert_json_to_csv(input_file, output_file)
+    convert_json_to_csv(input_file, output_file, stream=stream, incremental=incremental)
 
 if __name__ == "__main__":
     main()
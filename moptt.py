@@ -0,0 +1,126 @@
+"""
+moptt 統一命令列工具
+每個子命令只在執行時才載入需要的模組（requests、pandas、Google API 套件等），
+解析參數與顯示說明不需要載入任何重量級套件，適合短時間的排程工作
+
+使用方式：
+    python moptt.py crawl [版位 ...]                 爬取文章列表（test.py）
+    python moptt.py fetch-comments [版位 ...]        抓取文章內容與留言（scraper_content_with_api.py）
+    python moptt.py convert <json檔案 ...|--all> [--format full|simple|both] [--incremental] [--normalized]
+    python moptt.py upload <json檔案>                上傳到 Google Sheets
+    python moptt.py analyze [--batch 查詢檔 [--output 目錄]] [--serve [--port 埠號]]
+"""
+import argparse
+import glob
+import importlib.util
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _load_script(name, filename):
+    """以檔案路徑載入腳本模組（test.py 與標準函式庫的 test 套件同名，無法直接 import）"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(BASE_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _input_files(args):
+    files = sorted(glob.glob('*.json')) if args.all else args.files
+    if not files:
+        print("找不到任何 JSON 檔案")
+    return files
+
+def crawl(args):
+    crawler = _load_script('moptt_crawler', 'test.py')
+    for board in args.boards or crawler.BOARD_NAMES:
+        print(f"\r開始爬取 {board} 看板", end="")
+        crawler.MopttScraper(board).scrape()
+
+def fetch_comments(args):
+    from scraper_content_with_api import BOARD_NAMES, CommentScraper
+    for board in args.boards or BOARD_NAMES:
+        CommentScraper(board).process_urls_from_file()
+
+def convert(args):
+    from ptt_export import export_all, export_normalized
+    formats = ['full', 'simple'] if args.format == 'both' else [args.format]
+    for input_file in _input_files(args):
+        base = os.path.splitext(input_file)[0]
+        try:
+            if args.incremental:
+                # 增量匯出各自依狀態檔判斷要改寫的資料列，正規化匯出另外讀取一次
+                from ptt_incremental import incremental_export
+                for format in formats:
+                    output_file = base + ('.csv' if format == 'full' else '_simple.csv')
+                    incremental_export(input_file, output_file, format=format)
+                outputs = export_normalized(input_file) if args.normalized else {}
+            else:
+                # 所有輸出（包含正規化的文章表與留言表）共用同一次讀取
+                outputs = export_all(input_file, full_csv='full' in formats, simple_csv='simple' in formats,
+                                     normalized=args.normalized)
+            for output_file in outputs.values():
+                if output_file:
+                    print(f"- {output_file}")
+        except (OSError, ValueError) as e:
+            print(f"轉換 {input_file} 時發生錯誤：{e}")
+
+def upload(args):
+    from upload_to_sheets import process_json_file, upload_frame
+    df = process_json_file(args.file)
+    if df is not None:
+        upload_frame(df, args.file)
+
+def analyze(args):
+    if args.batch:
+        from ptt_batch import run_batch
+        run_batch(args.batch, args.output)
+    elif args.serve:
+        from ptt_server import serve
+        if args.port is None:
+            serve()
+        else:
+            serve(port=args.port)
+    else:
+        import ptt_advanced_analysis
+        ptt_advanced_analysis.main()
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='moptt', description="MoPTT 爬蟲、轉換、上傳與分析工具")
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    p = subparsers.add_parser('crawl', help="爬取版位的文章列表")
+    p.add_argument('boards', nargs='*', help="版位名稱，預設為 test.py 中的 BOARD_NAMES")
+    p.set_defaults(func=crawl)
+
+    p = subparsers.add_parser('fetch-comments', help="抓取文章內容與留言")
+    p.add_argument('boards', nargs='*', help="版位名稱，預設為 scraper_content_with_api.py 中的 BOARD_NAMES")
+    p.set_defaults(func=fetch_comments)
+
+    p = subparsers.add_parser('convert', help="將版位 JSON 轉換為 CSV（串流讀取一次產生所有輸出）")
+    p.add_argument('files', nargs='*', help="JSON 檔案")
+    p.add_argument('--all', action='store_true', help="轉換目前目錄下所有 JSON 檔案")
+    p.add_argument('--format', choices=('full', 'simple', 'both'), default='both',
+                   help="完整 CSV、簡易 CSV 或兩者（預設）")
+    p.add_argument('--incremental', action='store_true', help="只附加新文章、改寫有變動的文章")
+    p.add_argument('--normalized', action='store_true', help="另外產生正規化的文章表與留言表")
+    p.set_defaults(func=convert)
+
+    p = subparsers.add_parser('upload', help="將版位 JSON 上傳到 Google Sheets")
+    p.add_argument('file', help="JSON 檔案")
+    p.set_defaults(func=upload)
+
+    p = subparsers.add_parser('analyze', help="互動式分析選單、批次查詢或 HTTP 查詢服務")
+    p.add_argument('--batch', metavar='QUERY_FILE', help="執行查詢檔中的所有查詢")
+    p.add_argument('--output', default='batch_results', help="批次查詢結果目錄（預設 batch_results）")
+    p.add_argument('--serve', action='store_true', help="啟動 HTTP 查詢服務")
+    p.add_argument('--port', type=int, default=None, help="HTTP 查詢服務的埠號")
+    p.set_defaults(func=analyze)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,134 +1,422 @@
 import json
 import glob
-from collections import Counter
-from datetime import datetime
-import re
 import csv
 import os
-from ptt_analysis import load_json_file, load_all_json_files, find_top_comments_posts
+import sys
+from array import array
+from ptt_analysis import LazyBoardData, find_board_files, load_board_file, load_json_file, load_all_json_files
+from ptt_comment_index import TAG_LABELS, CommentIndexes, parse_tags
+from ptt_index import BigramIndexes, DateIndex, TextColumns, to_epoch_day
+from ptt_ngram import count_ngrams, count_phrases, iter_post_texts
+from ptt_matcher import AhoCorasick
+from ptt_query import evaluate_query, parse_query
+from ptt_output import DEFAULT_PRINT_LIMIT, ConsolePager, ResultWriter, stream_results
+from ptt_ranking import METRICS, Rankings
+from ptt_records import COMPACT_SNAPSHOT, StringPool, compact_posts
+from ptt_suffix_array import SuffixArrays
+from ptt_trend import TrendTracker
+
+def _file_stat(path):
+    """檔案的 (大小, 修改時間)"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
 
 class AdvancedAnalysis:
-    def __init__(self):
+    def __init__(self, lazy=False, parallel=False, max_workers=None, compact=True):
+        """
+        Args:
+            lazy: 版位在第一次被查詢時才載入並建立索引
+            parallel: 以多個行程平行解析各版位檔案
+            max_workers: 平行解析時使用的行程數
+            compact: 將文章轉換為精簡紀錄（PostRecord），重複字串只保留一份以降低記憶體用量
+        """
         print("載入資料中...")
-        self.board_data = load_all_json_files()
+        # 所有版位共用同一個字串池，跨版位重複的標籤與短留言也只保留一份
+        self._string_pool = StringPool() if compact else None
+        # 記錄各版位檔案的大小與修改時間，reload() 時只處理有變動的版位
+        self._sources = {board: (path, _file_stat(path)) for board, path in find_board_files().items()}
+        # 平行解析時在子行程中轉換為精簡紀錄（每個版位各自使用字串池），只傳回精簡後的資料
+        transform = (compact_posts if parallel else self._compact) if compact else None
+        # 快照保存精簡紀錄，之後載入時不需要再解析 JSON 與轉換
+        self.board_data = load_all_json_files(parallel=parallel, lazy=lazy, max_workers=max_workers,
+                                              transform=transform,
+                                              snapshot_kind=COMPACT_SNAPSHOT if compact else None)
+        self.date_index = DateIndex(self.board_data)
+        # 預先正規化搜尋用的文字欄位，查詢時只為符合的文章建立結果
+        self.text_columns = TextColumns(self.board_data)
+        # 查詢語言使用的二元字倒排索引，第一次執行查詢時才建立
+        self.bigram_index = BigramIndexes(self.board_data, self.text_columns)
+        # 留言層級的索引（標籤、所屬文章與內容），第一次查詢留言時才建立
+        self.comment_index = CommentIndexes(self.board_data)
+        # 各版位依排序指標預先排好的排行榜
+        self.rankings = Rankings(self.board_data, self.date_index)
+        # 後綴陣列建立成本較高，只在查詢任意字串時才建立
+        self.suffix_arrays = SuffixArrays(self.board_data)
+        if not lazy:
+            self.date_index.build()
+            self.text_columns.build()
+            self.rankings.build()
         self.stop_words = {'推推', '推文', '感謝', '謝謝', '這個', '那個', '所以', '因為', '可是', '但是', '什麼', '如果', '的話'}
+        self._phrase_cache = {}
+        self._frames = None
+        self._duplicate_index = None
+
+    def _compact(self, posts):
+        return compact_posts(posts, self._string_pool)
+
+    def _load_board(self, path):
+        """讀取版位檔案，精簡模式下轉換為精簡紀錄"""
+        if self._string_pool is None:
+            return load_json_file(path)
+        return load_board_file(path, self._compact, COMPACT_SNAPSHOT)
+
+    def board_names(self):
+        """回傳所有版位名稱；延遲載入模式下會先一次載入尚未讀取的版位"""
+        if isinstance(self.board_data, LazyBoardData):
+            self.board_data.preload()
+        return list(self.board_data)
+
+    def match_row(self, board, position):
+        """以預先計算的欄位建立單篇符合文章的輸出資料"""
+        post = self.board_data[board][position]
+        columns = self.text_columns.board(board)
+        content = columns.content(position)
+        return {
+            'title': post['title'],
+            'url': post['url'],
+            'date': post.get('acceptedDate', '').split('T')[0],
+            'content': content[:500] + '...' if len(content) > 500 else content,
+            'comments': columns.comments_summary[position]
+        }
+
+    def add_posts(self, board_name, posts):
+        """將新文章加入版位資料，並增量更新索引與排行榜"""
+        if self._string_pool is not None:
+            posts = self._compact(posts)
+        board_posts = self.board_data[board_name]
+        for post in posts:
+            board_posts.append(post)
+            position = len(board_posts) - 1
+            self.date_index.add_post(board_name, position)
+            self.text_columns.add_post(board_name, position)
+            self.bigram_index.add_post(board_name, position)
+            self.comment_index.add_post(board_name, position)
+            self.rankings.add_post(board_name, position)
+            self.suffix_arrays.add_post(board_name, position)
+        self._phrase_cache = {key: counter for key, counter in self._phrase_cache.items()
+                              if key[0] != board_name}
+        self._frames = None
+        self._duplicate_index = None
+
+    def _invalidate_board(self, board_name):
+        """丟棄版位的索引、排行榜與快取"""
+        self.date_index.invalidate(board_name)
+        self.text_columns.invalidate(board_name)
+        self.bigram_index.invalidate(board_name)
+        self.comment_index.invalidate(board_name)
+        self.rankings.invalidate(board_name)
+        self.suffix_arrays.invalidate(board_name)
+        self._phrase_cache = {key: counter for key, counter in self._phrase_cache.items()
+                              if key[0] != board_name}
+        self._frames = None
+        self._duplicate_index = None
+
+    def _set_board(self, board_name, path, posts=None):
+        """以新的資料取代整個版位；延遲載入模式下 posts 為 None 時等到查詢時才讀取"""
+        if isinstance(self.board_data, LazyBoardData):
+            self.board_data.set_board(board_name, path, posts)
+        else:
+            self.board_data[board_name] = posts if posts is not None else self._load_board(path)
+        self._invalidate_board(board_name)
+
+    def reload(self):
+        """重新檢查版位檔案，只重新載入有變動的版位
+
+        檔案只在尾端新增文章時，以 add_posts 增量更新索引；其他變動則重建該版位。
+
+        Returns:
+            dict: added、appended、replaced、removed 四類的版位名稱列表
+        """
+        return self.apply_reload(self.prepare_reload())
 
-    def search_posts_by_keywords_and_time(self, keywords, start_time, end_time, output_csv=False):
-        """搜尋特定時間區間內包含關鍵字的文章，並可選擇輸出成CSV"""
-        start_datetime = datetime.strptime(start_time, "%Y-%m-%d")
-        end_datetime = datetime.strptime(end_time, "%Y-%m-%d")
-        
-        matching_posts = []
-        total_count = 0
-        
-        for board, posts in self.board_data.items():
-            for post in posts:
-                try:
-                    post_time_str = post.get('acceptedDate', '').split('T')[0]
-                    post_time = datetime.strptime(post_time_str, "%Y-%m-%d")
-                    
-                    if start_datetime <= post_time <= end_datetime:
-                        title = post.get('title', '').lower()
-                        content = ''
-                        comments_summary = ''
-                        
-                        if 'comments_data' in post:
-                            if 'content' in post['comments_data']:
-                                content = post['comments_data']['content'].lower()
-                            if 'comments' in post['comments_data']:
-                                comments_summary = '; '.join([c.get('content', '') for c in post['comments_data']['comments'][:5]])
-                        
-                        # 檢查是否包含所有關鍵字
-                        text_to_search = title + ' ' + content
-                        if all(keyword.lower() in text_to_search for keyword in keywords):
-                            total_count += 1
-                            matching_posts.append({
-                                'board': board,
-                                'title': post['title'],
-                                'date': post_time_str,
-                                'url': post['url'],
-                                'content': content[:500] + '...' if len(content) > 500 else content,
-                                'comments': comments_summary
-                            })
-                except (ValueError, AttributeError) as e:
+    def prepare_reload(self):
+        """找出有變動的版位並讀取新的內容，不修改目前的資料，可以在查詢進行時執行
+
+        Returns:
+            list: (版位名稱, 路徑, 檔案狀態, 文章列表) 的列表；路徑為 None 表示版位已移除，
+                  文章列表為 None 表示延遲載入模式下等到查詢時才讀取
+        """
+        changes = []
+        current = find_board_files()
+        for board_name in self._sources:
+            if board_name not in current:
+                changes.append((board_name, None, None, None))
+
+        lazy = isinstance(self.board_data, LazyBoardData)
+        for board_name, path in current.items():
+            source = (path, _file_stat(path))
+            if self._sources.get(board_name) == source:
+                continue
+            if lazy and not (board_name in self._sources and self.board_data.is_loaded(board_name)):
+                changes.append((board_name, path, source, None))
+            else:
+                changes.append((board_name, path, source, self._load_board(path)))
+        return changes
+
+    def apply_reload(self, changes):
+        """套用 prepare_reload() 讀取的變動並更新索引
+
+        Returns:
+            dict: added、appended、replaced、removed 四類的版位名稱列表
+        """
+        summary = {'added': [], 'appended': [], 'replaced': [], 'removed': []}
+        for board_name, path, source, posts in changes:
+            known = self._sources.get(board_name)
+            if path is None:
+                if known is None:
                     continue
+                del self._sources[board_name]
+                if isinstance(self.board_data, LazyBoardData):
+                    self.board_data.remove_board(board_name)
+                else:
+                    self.board_data.pop(board_name, None)
+                self._invalidate_board(board_name)
+                summary['removed'].append(board_name)
+                continue
+
+            self._sources[board_name] = source
+            if known is None or posts is None:
+                self._set_board(board_name, path, posts)
+                summary['added' if known is None else 'replaced'].append(board_name)
+                continue
+
+            old_posts = self.board_data[board_name]
+            if len(posts) >= len(old_posts) and posts[:len(old_posts)] == old_posts:
+                self.add_posts(board_name, posts[len(old_posts):])
+                summary['appended'].append(board_name)
+            else:
+                self._set_board(board_name, path, posts)
+                summary['replaced'].append(board_name)
+        return summary
+
+    def top_posts(self, metric='total_comments', top_n=20, boards=None, start_time=None, end_time=None,
+                  collapse_duplicates=False):
+        """依指定指標找出前 N 篇文章，可限定版位與日期區間
+
+        metric 可為 total_comments、like_count、dislike_count、hits 或 push_boo_ratio；
+        collapse_duplicates 為 True 時每組重複文章只保留代表文章
+        """
+        skip = self.duplicate_index().skip_map() if collapse_duplicates else None
+        return self.rankings.top(metric, top_n, boards, start_time, end_time, skip)
+
+    def duplicate_index(self):
+        """取得跨版位的近似重複文章群組，第一次使用時建立（需要 numpy）"""
+        if self._duplicate_index is None:
+            from ptt_dedup import DuplicateIndex
+            self.board_names()
+            self._duplicate_index = DuplicateIndex(self.board_data).build()
+        return self._duplicate_index
+
+    def duplicate_clusters(self, limit=20):
+        """列出最大的 limit 組重複文章，每組的第一篇為代表文章"""
+        clusters = []
+        for cluster in self.duplicate_index().clusters()[:limit]:
+            clusters.append([dict(board=board, **self.match_row(board, position)) for board, position in cluster])
+        return clusters
+
+    def frames(self):
+        """取得 (posts, comments) DataFrame，第一次使用時建立（需要 pandas）"""
+        if self._frames is None:
+            from ptt_frame import build_frames
+            self.board_names()
+            self._frames = build_frames(self.board_data)
+        return self._frames
+
+    def board_dashboard(self, freq='D'):
+        """以向量化運算產生各版位的發文量、推噓統計與留言活動
+
+        Returns:
+            dict: volume（各時段發文數）、reactions（推噓總計）、comments（各時段各標籤留言數）
+        """
+        from ptt_frame import comment_activity, post_volume, reaction_totals
+        posts, comments = self.frames()
+        return {
+            'volume': post_volume(posts, freq),
+            'reactions': reaction_totals(posts),
+            'comments': comment_activity(posts, comments, freq),
+        }
+
+    def iter_search_matches(self, keywords, start_time, end_time, collapse_duplicates=False):
+        """逐一產生特定時間區間內包含所有關鍵字的文章資料（不輸出任何訊息）"""
+        start_day = to_epoch_day(start_time)
+        end_day = to_epoch_day(end_time)
+        duplicates = self.duplicate_index() if collapse_duplicates else None
+        for board in self.board_names():
+            skip = duplicates.duplicates(board) if duplicates else ()
+            # 透過日期索引只取出時間區間內的文章，再用預先正規化的欄位比對關鍵字
+            window = self.date_index.board(board).positions_between(start_day, end_day)
+            for position in self.text_columns.board(board).matching_positions(keywords, window):
+                if position in skip:
+                    continue
+                row = {'board': board}
+                row.update(self.match_row(board, position))
+                yield row
+
+    def iter_keyword_positions(self, keywords, collapse_duplicates=False):
+        """逐一產生包含所有關鍵字的 (版位, 文章位置)
+
+        collapse_duplicates 為 True 時略過重複文章，每組只計算代表文章
+        """
+        duplicates = self.duplicate_index() if collapse_duplicates else None
+        for board in self.board_names():
+            skip = duplicates.duplicates(board) if duplicates else ()
+            for position in self.text_columns.board(board).matching_positions(keywords):
+                if position not in skip:
+                    yield board, position
+
+    def iter_keyword_matches(self, keywords, collapse_duplicates=False):
+        """逐一產生 (版位, 文章資料)，文章需包含所有關鍵字（不輸出任何訊息）"""
+        for board, position in self.iter_keyword_positions(keywords, collapse_duplicates):
+            yield board, self.match_row(board, position)
+
+    def iter_query_matches(self, query, collapse_duplicates=False):
+        """逐一產生符合布林查詢的文章資料，查詢語法見 ptt_query（語法錯誤時拋出 ValueError）"""
+        node = parse_query(query)
+        duplicates = self.duplicate_index() if collapse_duplicates else None
+        for board, position in evaluate_query(self, node):
+            if duplicates and duplicates.is_duplicate(board, position):
+                continue
+            row = {'board': board}
+            row.update(self.match_row(board, position))
+            yield row
+
+    def iter_comment_matches(self, keyword=None, tags=None, boards=None, start_time=None, end_time=None):
+        """逐一產生符合條件的留言（不輸出任何訊息）
+
+        Args:
+            keyword: 留言需包含的字串，None 表示不限
+            tags: 留言標籤，例如 '噓'、['推', '→'] 或 'boo'，None 表示不限
+            boards: 限定的版位列表，預設為所有版位
+            start_time, end_time: 以所屬文章的發文日期（YYYY-MM-DD）限定區間
+        """
+        for board, index, comment_ids in self._comment_search(keyword, tags, boards, start_time, end_time):
+            posts = self.board_data[board]
+            for comment_id in comment_ids:
+                position = index.comment_posts[comment_id]
+                post = posts[position]
+                yield {
+                    'board': board,
+                    'tag': TAG_LABELS[index.tags[comment_id]],
+                    'content': index.content(comment_id),
+                    'title': post.get('title', ''),
+                    'url': post.get('url', ''),
+                    'date': post.get('acceptedDate', '').split('T')[0],
+                }
+
+    def _comment_search(self, keyword, tags, boards, start_time, end_time):
+        """在各版位的留言索引中查詢，逐一產生 (版位, 留言索引, 符合的留言編號)"""
+        tag_codes = parse_tags(tags)
+        windowed = start_time is not None or end_time is not None
+        if windowed:
+            start_day = to_epoch_day(start_time) if start_time else float('-inf')
+            end_day = to_epoch_day(end_time) if end_time else float('inf')
+        for board in boards if boards is not None else self.board_names():
+            positions = None
+            if windowed:
+                positions = self.date_index.board(board).positions_between(start_day, end_day)
+            index = self.comment_index.board(board)
+            yield board, index, index.search(keyword, tag_codes, positions)
+
+    def comment_tag_counts(self, keyword=None, tags=None, boards=None, start_time=None, end_time=None):
+        """統計符合條件的留言在各版位的推、噓、→ 則數，參數同 iter_comment_matches
+
+        Returns:
+            dict: {版位: {標籤: 則數}}
+        """
+        return {board: index.tag_counts(comment_ids)
+                for board, index, comment_ids in self._comment_search(keyword, tags, boards, start_time, end_time)}
+
+    def search_posts_by_keywords_and_time(self, keywords, start_time, end_time, output_csv=False,
+                                          output_path=None, print_limit=DEFAULT_PRINT_LIMIT, page_size=None,
+                                          collect=True):
+        """搜尋特定時間區間內包含關鍵字的文章，並可選擇輸出成CSV
+
+        符合的文章邊搜尋邊寫入檔案，終端機最多顯示 print_limit 篇（page_size 有設定時分頁顯示）。
+
+        Args:
+            output_csv: 是否以預設檔名輸出成CSV
+            output_path: 指定輸出檔案，副檔名為 .jsonl 時輸出 JSON Lines，.json 時輸出 JSON 陣列
+            print_limit: 終端機最多顯示的篇數，None 表示不限
+            page_size: 每顯示幾篇暫停一次詢問是否繼續
+            collect: 是否將所有結果收集成列表回傳；大量結果只需寫檔時設為 False 以固定記憶體用量
+
+        Returns:
+            (total_count, matching_posts)：collect 為 False 時 matching_posts 為 None
+        """
+        if output_path is None and output_csv:
+            output_path = f"search_{'_'.join(keywords)}_{start_time}_{end_time}.csv"
+        matching_posts = [] if collect else None
+
+        def print_post(post):
+            print(f"\n版面：{post['board']}")
+            print(f"標題：{post['title']}")
+            print(f"日期：{post['date']}")
+            print(f"網址：{post['url']}")
+            print("內容摘要：", post['content'][:200] + '...')
+            if post['comments']:
+                print("部分留言：", post['comments'][:200] + '...')
+            print()
+
+        pager = ConsolePager(print_post, print_limit, page_size)
+        matches = self.iter_search_matches(keywords, start_time, end_time)
+        if output_path:
+            # 第一篇符合的文章寫入時才建立檔案，沒有結果時不會留下檔案
+            with ResultWriter(output_path, ['board', 'title', 'date', 'url', 'content', 'comments'],
+                              lazy=True) as writer:
+                total_count = stream_results(matches, writer, pager, matching_posts)
+        else:
+            total_count = stream_results(matches, None, pager, matching_posts)
 
         # 輸出結果
-        if matching_posts:
-            print(f"\n找到 {total_count} 篇符合的文章：")
-            
-            if output_csv:
-                filename = f"search_{'_'.join(keywords)}_{start_time}_{end_time}.csv"
-                with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=['board', 'title', 'date', 'url', 'content', 'comments'])
-                    writer.writeheader()
-                    writer.writerows(matching_posts)
-                print(f"搜尋結果已保存到 {filename}")
-            
-            for post in matching_posts:
-                print(f"\n版面：{post['board']}")
-                print(f"標題：{post['title']}")
-                print(f"日期：{post['date']}")
-                print(f"網址：{post['url']}")
-                print("內容摘要：", post['content'][:200] + '...')
-                if post['comments']:
-                    print("部分留言：", post['comments'][:200] + '...')
-                print()
+        if total_count:
+            print(f"\n找到 {total_count} 篇符合的文章", end='')
+            print(f"（僅顯示前 {pager.shown} 篇）" if pager.shown < total_count else "")
+            if output_path:
+                print(f"搜尋結果已保存到 {output_path}")
         else:
             print(f"\n在指定時間區間內，未找到包含關鍵字的文章")
         
         return total_count, matching_posts
 
-    def count_keyword_by_board(self, keywords, output_csv=False):
-        """計算關鍵字在各個版位出現的次數，並可選擇輸出成CSV"""
+    def count_keyword_by_board(self, keywords, output_csv=False, collapse_duplicates=False, output_path=None):
+        """計算關鍵字在各個版位出現的次數，並可選擇輸出成CSV
+
+        collapse_duplicates 為 True 時，轉錄或複製貼上的重複文章只計算一次（歸在代表文章的版位）。
+        統計時只記錄文章位置，輸出檔案時才逐篇建立資料並直接寫入；
+        output_path 的副檔名為 .jsonl 時輸出 JSON Lines，.json 時輸出 JSON 陣列。
+        """
         if isinstance(keywords, str):
             keywords = [keywords]
         
-        counts = {}
-        matching_posts = {}
-        
-        for board, posts in self.board_data.items():
-            board_count = 0
-            board_matching_posts = []
-            
-            for post in posts:
-                title = post.get('title', '').lower()
-                content = ''
-                comments_summary = ''
-                
-                if 'comments_data' in post:
-                    if 'content' in post['comments_data']:
-                        content = post['comments_data']['content'].lower()
-                    if 'comments' in post['comments_data']:
-                        comments_summary = '; '.join([c.get('content', '') for c in post['comments_data']['comments'][:5]])
-                
-                if all(keyword.lower() in (title + ' ' + content) for keyword in keywords):
-                    board_count += 1
-                    board_matching_posts.append({
-                        'title': post['title'],
-                        'url': post['url'],
-                        'date': post.get('acceptedDate', '').split('T')[0],
-                        'content': content[:500] + '...' if len(content) > 500 else content,
-                        'comments': comments_summary
-                    })
-            
-            if board_count > 0:
-                counts[board] = board_count
-                matching_posts[board] = board_matching_posts
+        positions = {}
+        for board, position in self.iter_keyword_positions(keywords, collapse_duplicates):
+            positions.setdefault(board, array('l')).append(position)
+        counts = {board: len(board_positions) for board, board_positions in positions.items()}
 
         # 輸出結果
         print(f"\n包含所有關鍵字 {', '.join(keywords)} 的文章在各版位的出現次數：")
         for board, count in sorted(counts.items(), key=lambda x: x[1], reverse=True):
             print(f"{board}: {count} 篇")
 
-        if output_csv:
-            filename = f"keyword_analysis_{'_'.join(keywords)}.csv"
-            with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Board', 'Count', 'Title', 'Date', 'URL', 'Content', 'Comments'])
-                for board in sorted(matching_posts.keys(), key=lambda x: counts[x], reverse=True):
-                    for post in matching_posts[board]:
-                        writer.writerow([
+        if output_path is None and output_csv:
+            output_path = f"keyword_analysis_{'_'.join(keywords)}.csv"
+        if output_path:
+            fieldnames = ['Board', 'Count', 'Title', 'Date', 'URL', 'Content', 'Comments']
+            with ResultWriter(output_path, fieldnames) as writer:
+                for board in sorted(positions.keys(), key=lambda x: counts[x], reverse=True):
+                    for position in positions[board]:
+                        post = self.match_row(board, position)
+                        writer.write(dict(zip(fieldnames, [
                             board,
                             counts[board],
                             post['title'],
@@ -136,55 +424,167 @@ class AdvancedAnalysis:
                             post['url'],
                             post['content'],
                             post['comments']
-                        ])
-            print(f"\n詳細資料已保存到 {filename}")
+                        ])))
+            print(f"\n詳細資料已保存到 {output_path}")
 
         return counts
 
-    def find_most_common_strings(self, board_name, top_n=20, custom_stop_words=None):
-        """找出特定版位最常出現的字串，可自定義停用詞"""
+    def keyword_hits(self, keywords, match='all'):
+        """以 Aho–Corasick 自動機統計各關鍵字與 match 條件在各版位的命中篇數（不輸出任何訊息）"""
+        if match not in ('all', 'any'):
+            raise ValueError("match 只能是 'all' 或 'any'")
+        keywords = list(dict.fromkeys(keywords))
+        matcher = AhoCorasick([keyword.lower() for keyword in keywords])
+        required = len(keywords)
+        
+        keyword_counts = {}
+        match_counts = {}
+        for board in self.board_names():
+            hits = [0] * len(keywords)
+            matched = 0
+            for text in self.text_columns.board(board).search_text:
+                if text is None:
+                    continue
+                found = matcher.find_ids(text)
+                for keyword_id in found:
+                    hits[keyword_id] += 1
+                if found and (match == 'any' or len(found) == required):
+                    matched += 1
+            keyword_counts[board] = dict(zip(keywords, hits))
+            match_counts[board] = matched
+        return keyword_counts, match_counts
+
+    def count_keywords_multi(self, keywords, match='all', output_csv=False):
+        """以 Aho–Corasick 自動機一次掃描所有文章，統計大量關鍵字在各版位的命中次數
+
+        Args:
+            keywords: 關鍵字列表
+            match: 'all' 表示文章需包含所有關鍵字，'any' 表示包含任一關鍵字即算符合
+            output_csv: 是否將各關鍵字的命中次數輸出成CSV
+
+        Returns:
+            (keyword_counts, match_counts)：{版位: {關鍵字: 篇數}} 與 {版位: 符合 match 條件的篇數}
+        """
+        keywords = list(dict.fromkeys([keywords] if isinstance(keywords, str) else keywords))
+        keyword_counts, match_counts = self.keyword_hits(keywords, match)
+
+        label = '所有' if match == 'all' else '任一'
+        print(f"\n包含{label}關鍵字（共 {len(keywords)} 個）的文章在各版位的出現次數：")
+        for board, count in sorted(match_counts.items(), key=lambda x: x[1], reverse=True):
+            print(f"{board}: {count} 篇")
+
+        if output_csv:
+            filename = f"keyword_hits_{len(keywords)}_keywords_{match}.csv"
+            with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['Board', 'Keyword', 'Count'])
+                for board, board_hits in keyword_counts.items():
+                    for keyword, count in board_hits.items():
+                        writer.writerow([board, keyword, count])
+            print(f"\n詳細資料已保存到 {filename}")
+
+        return keyword_counts, match_counts
+
+    def find_most_common_strings(self, board_name, top_n=20, custom_stop_words=None, ngram_size=None):
+        """找出特定版位最常出現的字串，可自定義停用詞
+
+        ngram_size 為 None 時使用原本 2-4 字不重疊的詞組規則，
+        指定 2、3 或 4 時改為統計該長度的重疊 n-gram。統計結果會依版位與停用詞快取。
+        """
         if board_name not in self.board_data:
             return []
         
         if custom_stop_words:
             self.stop_words.update(custom_stop_words)
         
-        text = ""
-        for post in self.board_data[board_name]:
-            text += post.get('title', '') + " "
-            if 'comments_data' in post:
-                if 'content' in post['comments_data']:
-                    text += post['comments_data']['content'] + " "
-                if 'comments' in post['comments_data']:
-                    for comment in post['comments_data']['comments']:
-                        if 'content' in comment:
-                            text += comment['content'] + " "
-        
-        words = re.findall(r'[\u4e00-\u9fff]{2,4}', text)
-        filtered_words = [word for word in words if word not in self.stop_words]
+        return self.common_strings(board_name, top_n, self.stop_words, ngram_size)
+
+    def substring_stats(self, board_name, substring, limit=20):
+        """以後綴陣列查詢任意字串在版位中（標題、內文與留言）的出現次數與所在文章
+
+        Returns:
+            dict: count（總出現次數）、post_count（文章篇數）、posts（前 limit 篇文章與其出現次數）
+        """
+        index = self.suffix_arrays.board(board_name)
+        occurrences = index.occurrences(substring)
+        posts = []
+        for position, count in list(occurrences.items())[:limit]:
+            row = self.match_row(board_name, position)
+            row['occurrences'] = count
+            posts.append(row)
+        return {'count': sum(occurrences.values()), 'post_count': len(occurrences), 'posts': posts}
+
+    def frequent_substrings(self, board_name, min_count=10, min_length=2, max_length=10, top_n=50):
+        """以後綴陣列列舉版位中出現至少 min_count 次、長度不限於 2-4 字的中文字串"""
+        return self.suffix_arrays.board(board_name).frequent_substrings(min_count, min_length, max_length, top_n)
+
+    def detect_trends(self, board_name, window_days=1, baseline_days=7, **options):
+        """增量更新版位的每日 n-gram 統計，並找出近期爆量的詞組
+
+        只有上次執行後新增的文章會被統計，其他參數見 TrendTracker.detect
+        """
+        if board_name not in self.board_data:
+            return []
+        tracker = TrendTracker(board_name, self.stop_words)
+        added = tracker.ingest(self.board_data[board_name])
+        if added:
+            tracker.save()
+        return tracker.detect(window_days, baseline_days, **options)
+
+    def common_strings(self, board_name, top_n=20, stop_words=(), ngram_size=None):
+        """以指定的停用詞統計版位的熱門字串，結果依版位與停用詞快取"""
+        if board_name not in self.board_data:
+            return []
+        cache_key = (board_name, ngram_size, frozenset(stop_words))
+        counter = self._phrase_cache.get(cache_key)
+        if counter is None:
+            texts = iter_post_texts(self.board_data[board_name])
+            if ngram_size is None:
+                counter = count_phrases(texts, stop_words)
+            else:
+                counter = count_ngrams(texts, (ngram_size,), stop_words)[ngram_size]
+            self._phrase_cache[cache_key] = counter
         
-        return Counter(filtered_words).most_common(top_n)
+        return counter.most_common(top_n)
 
 def main():
-    analyzer = AdvancedAnalysis()
+    if len(sys.argv) > 2 and sys.argv[1] == '--batch':
+        # 批次模式：python ptt_advanced_analysis.py --batch <查詢檔> [輸出目錄]
+        from ptt_batch import run_batch
+        run_batch(sys.argv[2], *sys.argv[3:4])
+        return
+
+    analyzer = AdvancedAnalysis(lazy=True, parallel=True)
     
     while True:
         print("\n請選擇要執行的功能：")
-        print("1. 顯示所有版位留言數最多的前二十篇文章")
+        print("1. 顯示所有版位留言數（或其他指標）最多的前二十篇文章")
         print("2. 搜尋特定時間區段內的關鍵字文章（支援多關鍵字，可選擇輸出CSV）")
         print("3. 分析關鍵字在各版位的分布（支援多關鍵字，可選擇輸出CSV）")
         print("4. 分析特定版位的熱門討論詞彙（可自訂排除字詞）")
-        print("5. 退出")
+        print("5. 大量關鍵字命中統計（可讀取關鍵字檔案，支援全部/任一條件）")
+        print("6. 各版位發文量與推噓統計（每日/每週）")
+        print("7. 偵測特定版位近期爆量的熱門詞組")
+        print("8. 查詢任意字串在特定版位的出現次數與文章")
+        print("9. 列出跨版位的重複（轉錄）文章")
+        print("10. 進階查詢（AND/OR/NOT、title:/content:/comment:/board:、date:/hits: 範圍）")
+        print("11. 搜尋留言（可依推/噓/→、版位與日期篩選）")
+        print("12. 退出")
         
-        choice = input("請輸入選項（1-5）：")
+        choice = input("請輸入選項（1-12）：")
         
         if choice == '1':
-            top_posts = find_top_comments_posts(analyzer.board_data)
-            print("\n留言數最多的前二十篇文章：")
+            metric = input(f"請輸入排序依據（{'/'.join(METRICS)}，直接按Enter使用留言數）：").strip() or 'total_comments'
+            if metric not in METRICS:
+                print("無效的排序依據，改用留言數")
+                metric = 'total_comments'
+            collapse = input("是否合併重複（轉錄）文章？(y/n)：").lower() == 'y'
+            top_posts = analyzer.top_posts(metric, collapse_duplicates=collapse)
+            print(f"\n{metric} 最高的前二十篇文章：")
             for i, post in enumerate(top_posts, 1):
                 print(f"{i}. 版面：{post['board']}")
                 print(f"   標題：{post['title']}")
-                print(f"   留言數：{post['total_comments']}")
+                print(f"   {metric}：{post[metric]}")
                 print(f"   日期：{post['date']}")
                 print(f"   網址：{post['url']}\n")
         
@@ -193,26 +593,133 @@ def main():
             start_date = input("請輸入開始日期（YYYY-MM-DD）：")
             end_date = input("請輸入結束日期（YYYY-MM-DD）：")
             save_csv = input("是否要將結果保存為CSV檔案？(y/n)：").lower() == 'y'
+            output_path = None
+            if save_csv:
+                output_path = input("請輸入輸出檔名（.csv、.jsonl 或 .json，直接按Enter使用預設檔名）：").strip() or None
             
-            total_count, matching_posts = analyzer.search_posts_by_keywords_and_time(
-                keywords, start_date, end_date, output_csv=save_csv)
+            # 結果直接寫入檔案，不在記憶體中保留所有文章；輸出檔案時終端機只顯示前幾篇，否則分頁顯示全部
+            total_count, _ = analyzer.search_posts_by_keywords_and_time(
+                keywords, start_date, end_date, output_csv=save_csv, output_path=output_path,
+                page_size=None if save_csv else DEFAULT_PRINT_LIMIT,
+                print_limit=DEFAULT_PRINT_LIMIT if save_csv else None, collect=False)
         
         elif choice == '3':
             keywords = input("請輸入關鍵字（多個關鍵字請用空格分隔）：").split()
             save_csv = input("是否要將結果保存為CSV檔案？(y/n)：").lower() == 'y'
+            output_path = None
+            if save_csv:
+                output_path = input("請輸入輸出檔名（.csv、.jsonl 或 .json，直接按Enter使用預設檔名）：").strip() or None
+            collapse = input("是否合併重複（轉錄）文章？(y/n)：").lower() == 'y'
             
-            counts = analyzer.count_keyword_by_board(keywords, output_csv=save_csv)
+            counts = analyzer.count_keyword_by_board(keywords, output_csv=save_csv, collapse_duplicates=collapse,
+                                                     output_path=output_path)
         
         elif choice == '4':
             board_name = input("請輸入要分析的版位名稱（例如：Beauty）：")
             custom_stop_words = input("請輸入要排除的字詞（用空格分隔，直接按Enter跳過）：").split()
+            ngram_size = input("請輸入要統計的字數（2-4，直接按Enter使用預設的2-4字詞組）：").strip()
+            ngram_size = int(ngram_size) if ngram_size in ('2', '3', '4') else None
             
-            common_strings = analyzer.find_most_common_strings(board_name, custom_stop_words=custom_stop_words)
+            common_strings = analyzer.find_most_common_strings(board_name, custom_stop_words=custom_stop_words,
+                                                               ngram_size=ngram_size)
             print(f"\n{board_name} 版最常出現的前二十個字串：")
             for word, count in common_strings:
                 print(f"{word}: {count} 次")
         
         elif choice == '5':
+            source = input("請輸入關鍵字（用空格分隔）或關鍵字檔案路徑（每行一個）：").strip()
+            if os.path.isfile(source):
+                with open(source, 'r', encoding='utf-8') as f:
+                    keywords = [line.strip() for line in f if line.strip()]
+            else:
+                keywords = source.split()
+            match = 'any' if input("文章需包含所有關鍵字嗎？(y/n，n 表示任一即可)：").lower() == 'n' else 'all'
+            save_csv = input("是否要將結果保存為CSV檔案？(y/n)：").lower() == 'y'
+            
+            keyword_counts, match_counts = analyzer.count_keywords_multi(keywords, match=match, output_csv=save_csv)
+        
+        elif choice == '6':
+            freq = 'W' if input("以每週統計嗎？(y/n，n 表示每日)：").lower() == 'y' else 'D'
+            dashboard = analyzer.board_dashboard(freq)
+            print("\n各時段發文量：")
+            print(dashboard['volume'].tail(20).to_string())
+            print("\n各版位推噓統計：")
+            print(dashboard['reactions'].to_string())
+            comments = dashboard['comments']
+            for board in comments.index.get_level_values('board').unique():
+                print(f"\n{board} 版各時段留言數：")
+                print(comments.xs(board, level='board').tail(20).to_string())
+        
+        elif choice == '7':
+            board_name = input("請輸入要分析的版位名稱（例如：Gossiping）：")
+            window_days = input("請輸入近期視窗天數（直接按Enter為 1 天）：").strip() or '1'
+            baseline_days = input("請輸入基準期天數（直接按Enter為 7 天）：").strip() or '7'
+            if not (window_days.isdigit() and baseline_days.isdigit()) or int(window_days) < 1 or int(baseline_days) < 1:
+                print("天數必須是正整數")
+                continue
+            trends = analyzer.detect_trends(board_name, int(window_days), int(baseline_days))
+            print(f"\n{board_name} 版近期爆量的詞組：")
+            for trend in trends:
+                print(f"{trend['phrase']}: {trend['window_count']} 次"
+                      f"（基準日平均 {trend['baseline_avg']}，{trend['ratio']} 倍）")
+        
+        elif choice == '8':
+            board_name = input("請輸入要查詢的版位名稱（例如：Stock）：")
+            if board_name not in analyzer.board_data:
+                print(f"找不到 {board_name} 版")
+                continue
+            substring = input("請輸入要查詢的字串：")
+            stats = analyzer.substring_stats(board_name, substring)
+            print(f"\n「{substring}」在 {board_name} 版共出現 {stats['count']} 次，分布於 {stats['post_count']} 篇文章")
+            for post in stats['posts']:
+                print(f"{post['date']} {post['title']}（{post['occurrences']} 次）")
+                print(f"   {post['url']}")
+        
+        elif choice == '9':
+            clusters = analyzer.duplicate_clusters()
+            print(f"\n共找到 {len(analyzer.duplicate_index().clusters())} 組重複文章，最大的 {len(clusters)} 組：")
+            for i, cluster in enumerate(clusters, 1):
+                print(f"{i}. {cluster[0]['title']}（{len(cluster)} 篇）")
+                for post in cluster:
+                    print(f"   {post['board']} {post['date']} {post['url']}")
+        
+        elif choice == '10':
+            query = input("請輸入查詢（例如：title:台積電 -board:Gossiping date:2024-01-01..2024-03-31 hits:>100）：")
+            output_path = input("請輸入輸出檔名（.csv、.jsonl 或 .json，直接按Enter不輸出）：").strip() or None
+            # 輸出檔案時終端機只顯示前幾篇，其餘只計數；不輸出時分頁顯示全部
+            pager = ConsolePager(lambda post: print(f"{post['board']} {post['date']} {post['title']}\n   {post['url']}"),
+                                 limit=DEFAULT_PRINT_LIMIT if output_path else None,
+                                 page_size=None if output_path else DEFAULT_PRINT_LIMIT)
+            try:
+                if output_path:
+                    with ResultWriter(output_path, ['board', 'title', 'date', 'url', 'content', 'comments']) as writer:
+                        total_count = stream_results(analyzer.iter_query_matches(query), writer, pager)
+                    print(f"查詢結果已保存到 {output_path}")
+                else:
+                    total_count = stream_results(analyzer.iter_query_matches(query), pager=pager)
+                print(f"\n共找到 {total_count} 篇符合的文章", end='')
+                print(f"（僅顯示前 {pager.shown} 篇）" if pager.shown < total_count else "")
+            except ValueError as e:
+                print(e)
+        
+        elif choice == '11':
+            keyword = input("請輸入留言關鍵字（直接按Enter不限）：").strip() or None
+            tags = input("請輸入留言標籤（推/噓/→，多個用空格分隔，直接按Enter不限）：").split() or None
+            boards = input("請輸入版位（多個用空格分隔，直接按Enter為所有版位）：").split() or None
+            start_date = input("請輸入開始日期（YYYY-MM-DD，直接按Enter不限）：").strip() or None
+            end_date = input("請輸入結束日期（YYYY-MM-DD，直接按Enter不限）：").strip() or None
+            try:
+                tag_counts = analyzer.comment_tag_counts(keyword, tags, boards, start_date, end_date)
+                print("\n各版位符合的留言則數：")
+                for board, counts in tag_counts.items():
+                    print(f"{board}: " + '，'.join(f"{tag} {count}" for tag, count in counts.items()))
+                pager = ConsolePager(lambda c: print(f"{c['board']} {c['date']} {c['tag']} {c['content']}（{c['title']}）"),
+                                     limit=None, page_size=DEFAULT_PRINT_LIMIT)
+                stream_results(analyzer.iter_comment_matches(keyword, tags, boards, start_date, end_date), pager=pager)
+            except (KeyError, ValueError) as e:
+                print(f"查詢失敗：{e}")
+        
+        elif choice == '12':
             print("程式結束")
             break
         
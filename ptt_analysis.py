@@ -1,83 +1,250 @@
 import json
 import glob
-from collections import Counter
-from datetime import datetime
-import re
+import os
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+import sys
+from ptt_index import DateIndex, to_epoch_day
+from ptt_ngram import count_phrases, iter_post_texts
+from ptt_ranking import Rankings
+from ptt_snapshot import RAW, load_snapshot, save_snapshot
 
-def load_json_file(file_path):
-    """分批載入大型 JSON 檔案"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+def _parse_json_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_json_file(file_path, use_snapshot=True):
+    """分批載入大型 JSON 檔案
+
+    use_snapshot 為 True 時優先讀取預先解析的快照，沒有有效快照時才解析 JSON 並建立快照
+    """
+    if use_snapshot:
+        data = load_snapshot(file_path)
+        if data is not None:
             return data
+    try:
+        data = _parse_json_file(file_path)
     except Exception as e:
         print(f"Error loading {file_path}: {e}")
         return []
+    if use_snapshot:
+        save_snapshot(file_path, data)
+    return data
 
-def load_all_json_files():
-    """載入所有 moptt_*.json 檔案"""
-    json_files = glob.glob('moptt_*.json')
-    board_data = {}
-    for file in json_files:
+def _snapshot_kind(transform, snapshot_kind):
+    """未轉換的資料保存解析後的 JSON；有轉換時只在指定轉換後的形式時保存快照"""
+    return RAW if transform is None else snapshot_kind
+
+def _parse_board_file(file_path, transform=None, snapshot_kind=None):
+    """解析版位檔案並套用 transform，snapshot_kind 不為 None 時保存該形式的快照；解析失敗時拋出例外"""
+    data = _parse_json_file(file_path)
+    if transform is not None:
+        data = transform(data)
+    if snapshot_kind is not None:
+        save_snapshot(file_path, data, snapshot_kind)
+    return data
+
+def load_board_file(file_path, transform=None, snapshot_kind=None):
+    """載入版位檔案並套用 transform（例如轉換為精簡紀錄）
+
+    snapshot_kind 為轉換後資料形式的名稱（例如 'compact'），快照保存的是轉換後的資料，
+    讀取快照時不需要再解析與轉換；有 transform 但沒有指定 snapshot_kind 時不使用快照
+    """
+    snapshot_kind = _snapshot_kind(transform, snapshot_kind)
+    if snapshot_kind is not None:
+        data = load_snapshot(file_path, snapshot_kind)
+        if data is not None:
+            return data
+    return _parse_board_file(file_path, transform, snapshot_kind)
+
+def find_board_files():
+    """找出所有 moptt_*.json 檔案，回傳 {版位名稱: 檔案路徑}"""
+    board_files = {}
+    for file in glob.glob('moptt_*.json'):
         board_name = file.replace('moptt_', '').replace('.json', '')
+        board_files[board_name] = file
+    return board_files
+
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024  # 檔案總大小低於此值時行程啟動與傳回資料的成本高於平行解析的效益
+
+def _use_parallel(board_files, max_workers=None):
+    """只有多個檔案、多個 CPU 核心且檔案夠大時才值得平行解析（見 bench_load.py）"""
+    if len(board_files) < 2 or (max_workers or os.cpu_count() or 1) < 2:
+        return False
+    total = 0
+    for file in board_files.values():
         try:
-            print(f"載入 {file} 中...")
-            board_data[board_name] = load_json_file(file)
-        except Exception as e:
-            print(f"Error loading {file}: {e}")
+            total += os.path.getsize(file)
+        except OSError:
+            pass
+    return total >= PARALLEL_MIN_BYTES
+
+def _load_in_worker(file, transform=None, snapshot_kind=None):
+    """在子行程中解析並轉換單一版位檔案，回傳 (文章列表, 錯誤訊息)
+
+    錯誤在子行程中處理，單一檔案失敗不影響其他版位（該版位視為沒有文章）；
+    transform 在子行程中執行，傳回主行程的是轉換後（例如精簡紀錄）的資料
+    """
+    try:
+        return _parse_board_file(file, transform, snapshot_kind), None
+    except Exception as e:
+        return [], str(e)
+
+def _load_board_files(board_files, parallel=False, max_workers=None, transform=None, snapshot_kind=None):
+    """載入多個版位檔案，parallel 為 True 且檔案夠大時以多個行程同時解析
+
+    transform 會套用在每個版位解析後的文章列表上（例如轉換為精簡紀錄）；
+    平行解析時在子行程中執行，因此必須是模組層級的函式。
+    有效的快照直接在目前行程讀取，只有需要解析 JSON 的檔案才交給子行程（見 load_board_file）
+    """
+    board_data = {}
+    snapshot_kind = _snapshot_kind(transform, snapshot_kind)
+    if snapshot_kind is not None:
+        for board_name, file in board_files.items():
+            data = load_snapshot(file, snapshot_kind)
+            if data is not None:
+                board_data[board_name] = data
+        board_files = {b: file for b, file in board_files.items() if b not in board_data}
+
+    if parallel and _use_parallel(board_files, max_workers):
+        print(f"平行載入 {len(board_files)} 個檔案中...")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {board_name: executor.submit(_load_in_worker, file, transform, snapshot_kind)
+                       for board_name, file in board_files.items()}
+            for board_name, future in futures.items():
+                board_data[board_name], error = future.result()
+                if error is not None:
+                    print(f"Error loading {board_files[board_name]}: {error}")
+        return board_data
+
+    for board_name, file in board_files.items():
+        print(f"載入 {file} 中...")
+        board_data[board_name], error = _load_in_worker(file, transform, snapshot_kind)
+        if error is not None:
+            print(f"Error loading {file}: {error}")
     return board_data
 
-def find_top_comments_posts(board_data, top_n=20):
-    """找出所有版位中 total_comments 最多的前 N 篇文章"""
-    all_posts = []
-    for board, posts in board_data.items():
-        for post in posts:
-            # 檢查 comments_data 和 total_comments 是否存在
-            if 'comments_data' in post and 'total_comments' in post['comments_data']:
-                post_info = {
-                    'board': board,
-                    'title': post.get('title', ''),
-                    'url': post.get('url', ''),
-                    'total_comments': post['comments_data']['total_comments'],
-                    'date': post.get('acceptedDate', '').split('T')[0]  # 只取日期部分
-                }
-                all_posts.append(post_info)
-    
-    # 根據 total_comments 排序
-    sorted_posts = sorted(all_posts, 
-                        key=lambda x: int(x['total_comments']) if x['total_comments'] is not None else 0, 
-                        reverse=True)
-    return sorted_posts[:top_n]
-
-def search_posts_by_keywords_and_time(board_data, keywords, start_time, end_time):
-    """搜尋特定時間區間內包含關鍵字的文章"""
-    start_datetime = datetime.strptime(start_time, "%Y-%m-%d")
-    end_datetime = datetime.strptime(end_time, "%Y-%m-%d")
+class LazyBoardData(Mapping):
+    """延遲載入的版位資料，版位在第一次被查詢時才讀取檔案
+
+    需要所有版位的操作（例如 items()）會一次載入尚未讀取的版位，可搭配多行程平行解析。
+    """
+
+    def __init__(self, board_files, parallel=False, max_workers=None, transform=None, snapshot_kind=None):
+        self.board_files = dict(board_files)
+        self.parallel = parallel
+        self.max_workers = max_workers
+        self.transform = transform
+        self.snapshot_kind = snapshot_kind
+        self._loaded = {}
+
+    def __getitem__(self, board_name):
+        if board_name not in self._loaded:
+            if board_name not in self.board_files:
+                raise KeyError(board_name)
+            self._loaded.update(_load_board_files({board_name: self.board_files[board_name]},
+                                                  transform=self.transform, snapshot_kind=self.snapshot_kind))
+        return self._loaded[board_name]
+
+    def __contains__(self, board_name):
+        return board_name in self.board_files
+
+    def __iter__(self):
+        return iter(self.board_files)
+
+    def __len__(self):
+        return len(self.board_files)
+
+    def is_loaded(self, board_name):
+        """檢查版位是否已載入"""
+        return board_name in self._loaded
+
+    def set_board(self, board_name, file, data=None):
+        """設定版位的來源檔案；提供 data 時直接使用，否則在下次查詢時重新讀取"""
+        self.board_files[board_name] = file
+        if data is None:
+            self._loaded.pop(board_name, None)
+        else:
+            self._loaded[board_name] = data
+
+    def remove_board(self, board_name):
+        """移除版位"""
+        self.board_files.pop(board_name, None)
+        self._loaded.pop(board_name, None)
+
+    def preload(self, board_names=None):
+        """一次載入指定（預設為全部）尚未讀取的版位"""
+        if board_names is None:
+            board_names = self.board_files
+        pending = {b: self.board_files[b] for b in board_names if b not in self._loaded}
+        if pending:
+            self._loaded.update(_load_board_files(pending, self.parallel, self.max_workers, self.transform,
+                                                  self.snapshot_kind))
+        return self
+
+    def items(self):
+        self.preload()
+        return [(board_name, self._loaded[board_name]) for board_name in self.board_files]
+
+    def values(self):
+        return [data for _, data in self.items()]
+
+def load_all_json_files(parallel=False, lazy=False, max_workers=None, transform=None, snapshot_kind=None):
+    """載入所有 moptt_*.json 檔案
+
+    Args:
+        parallel: 是否以多個行程平行解析各版位檔案
+        lazy: 是否延遲到版位第一次被查詢時才載入（回傳 LazyBoardData）
+        max_workers: 平行解析時使用的行程數，預設為 CPU 核心數
+        transform: 套用在每個版位文章列表上的轉換函式
+        snapshot_kind: 轉換後資料形式的名稱，快照保存轉換後的資料（見 load_board_file）
+    """
+    board_files = find_board_files()
+    if lazy:
+        return LazyBoardData(board_files, parallel, max_workers, transform, snapshot_kind)
+    return _load_board_files(board_files, parallel, max_workers, transform, snapshot_kind)
+
+def find_top_comments_posts(board_data, top_n=20, rankings=None):
+    """找出所有版位中 total_comments 最多的前 N 篇文章
+
+    rankings 為載入時建立的 Rankings，未提供時會臨時建立
+    """
+    if rankings is None:
+        rankings = Rankings(board_data)
+    return rankings.top('total_comments', top_n)
+
+def search_posts_by_keywords_and_time(board_data, keywords, start_time, end_time, date_index=None):
+    """搜尋特定時間區間內包含關鍵字的文章
+
+    date_index 為載入時建立的 DateIndex，未提供時會臨時建立
+    """
+    if date_index is None:
+        date_index = DateIndex(board_data)
+    start_day = to_epoch_day(start_time)
+    end_day = to_epoch_day(end_time)
     
     matching_posts = []
     total_count = 0
     for board, posts in board_data.items():
-        for post in posts:
+        # 透過日期索引只取出時間區間內的文章
+        for position in date_index.board(board).positions_between(start_day, end_day):
+            post = posts[position]
             try:
-                # 使用 acceptedDate 欄位，並轉換成 datetime 物件
                 post_time_str = post.get('acceptedDate', '').split('T')[0]  # 只取日期部分
-                post_time = datetime.strptime(post_time_str, "%Y-%m-%d")
+                title = post.get('title', '').lower()
+                content = ''
+                if 'comments_data' in post and 'content' in post['comments_data']:
+                    content = post['comments_data']['content'].lower()
                 
-                if start_datetime <= post_time <= end_datetime:
-                    title = post.get('title', '').lower()
-                    content = ''
-                    if 'comments_data' in post and 'content' in post['comments_data']:
-                        content = post['comments_data']['content'].lower()
-                    
-                    if any(keyword.lower() in title or keyword.lower() in content 
-                          for keyword in keywords):
-                        total_count += 1
-                        matching_posts.append({
-                            'board': board,
-                            'title': post['title'],
-                            'date': post_time_str,
-                            'url': post['url']
-                        })
+                if any(keyword.lower() in title or keyword.lower() in content 
+                      for keyword in keywords):
+                    total_count += 1
+                    matching_posts.append({
+                        'board': board,
+                        'title': post['title'],
+                        'date': post_time_str,
+                        'url': post['url']
+                    })
             except (ValueError, AttributeError) as e:
                 continue
     
@@ -146,35 +313,26 @@ def find_most_common_strings(board_data, board_name, top_n=20):
     if board_name not in board_data:
         return []
     
-    # 將所有文章的標題和內容合併
-    text = ""
-    for post in board_data[board_name]:
-        # 加入標題
-        text += post.get('title', '') + " "
-        
-        # 加入文章內容
-        if 'comments_data' in post and 'content' in post['comments_data']:
-            text += post['comments_data']['content'] + " "
-            
-            # 加入留言內容
-            if 'comments' in post['comments_data']:
-                for comment in post['comments_data']['comments']:
-                    if 'content' in comment:
-                        text += comment['content'] + " "
-    
-    # 使用正則表達式找出中文詞組（2-4個字）
-    words = re.findall(r'[\u4e00-\u9fff]{2,4}', text)
-    
+    # 逐篇讀取標題、內文與留言，以固定記憶體統計中文詞組（2-4個字）
     # 過濾掉一些常見但無意義的詞組（可以根據需要添加更多）
     stop_words = {'推推', '推文', '感謝', '謝謝', '這個', '那個', '所以', '因為', '可是', '但是', '什麼', '如果', '的話'}
-    filtered_words = [word for word in words if word not in stop_words]
+    counter = count_phrases(iter_post_texts(board_data[board_name]), stop_words)
     
-    return Counter(filtered_words).most_common(top_n)
+    return counter.most_common(top_n)
 
 def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--batch':
+        # 批次模式：python ptt_analysis.py --batch <查詢檔> [輸出目錄]
+        from ptt_batch import run_batch
+        run_batch(sys.argv[2], *sys.argv[3:4])
+        return
+
     # 載入所有 JSON 檔案
     print("載入資料中...")
-    board_data = load_all_json_files()
+    # 版位在第一次被查詢時才載入，需要全部版位時再平行解析
+    board_data = load_all_json_files(parallel=True, lazy=True)
+    date_index = DateIndex(board_data)
+    rankings = Rankings(board_data, date_index)
     
     while True:
         print("\n請選擇要執行的功能：")
@@ -187,7 +345,7 @@ def main():
         choice = input("請輸入選項（1-5）：")
         
         if choice == '1':
-            top_posts = find_top_comments_posts(board_data)
+            top_posts = find_top_comments_posts(board_data, rankings=rankings)
             print("\n留言數最多的前二十篇文章：")
             for i, post in enumerate(top_posts, 1):
                 print(f"{i}. 版面：{post['board']}")
@@ -201,7 +359,8 @@ def main():
             start_date = input("請輸入開始日期（YYYY-MM-DD）：")
             end_date = input("請輸入結束日期（YYYY-MM-DD）：")
             
-            total_count = search_posts_by_keywords_and_time(board_data, keywords, start_date, end_date)
+            total_count = search_posts_by_keywords_and_time(board_data, keywords, start_date, end_date,
+                                                            date_index=date_index)
             print(f"\n在指定時間區間內，包含關鍵字的文章總數：{total_count}")
         
         elif choice == '3':
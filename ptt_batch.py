@@ -0,0 +1,190 @@
+"""
+批次查詢模式
+讀取查詢檔，載入資料一次後依序執行所有查詢，並將每個查詢的結果寫成獨立的 JSON 檔案
+
+查詢檔為 JSON Lines（每行一個查詢）或 JSON 陣列，每個查詢包含 type 與對應參數：
+    {"id": "top_hits", "type": "top", "metric": "hits", "top_n": 50, "boards": ["Stock"]}
+    {"type": "search", "keywords": ["台積電"], "start": "2024-01-01", "end": "2024-03-31"}
+    {"type": "count", "keywords": ["台積電", "法說會"], "collapse": true}
+    {"type": "keywords", "keywords": ["台積電", "聯發科"], "match": "any"}
+    {"type": "common", "board": "Gossiping", "top_n": 50, "stop_words": ["八卦"], "ngram_size": 2}
+    {"type": "query", "query": "title:台積電 -board:Gossiping hits:>100"}
+    {"type": "comments", "keyword": "台積電", "tags": ["噓"], "boards": ["Stock"], "start": "2024-01-01"}
+
+所有 count 與 keywords 查詢會合併成一個 Aho–Corasick 自動機，整個資料集只掃描一次。
+top、search、query 與 count 查詢可加上 "collapse": true，每組重複（轉錄）文章只保留代表文章。
+"""
+import json
+import os
+import re
+import time
+
+from ptt_matcher import AhoCorasick
+
+# 各查詢類型必要的參數
+QUERY_TYPES = {
+    'top': (),
+    'search': ('keywords', 'start', 'end'),
+    'count': ('keywords',),
+    'keywords': ('keywords',),
+    'common': ('board',),
+    'query': ('query',),
+    'comments': (),
+}
+
+def load_queries(query_file):
+    """讀取查詢檔，支援 JSON 陣列與 JSON Lines"""
+    with open(query_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        queries = json.loads(text)
+    else:
+        queries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for i, query in enumerate(queries, 1):
+        if query.get('type') not in QUERY_TYPES:
+            raise ValueError(f"第 {i} 個查詢的 type 不正確：{query.get('type')}（可用：{', '.join(QUERY_TYPES)}）")
+        missing = [name for name in QUERY_TYPES[query['type']] if name not in query]
+        if missing:
+            raise ValueError(f"第 {i} 個查詢缺少參數：{', '.join(missing)}")
+        query.setdefault('id', f"{i:03d}_{query['type']}")
+    # 每個查詢的結果寫成以 id 命名的檔案，id 重複或轉換為檔名後相同時會互相覆蓋
+    filenames = {}
+    for i, query in enumerate(queries, 1):
+        filename = _result_filename(query['id']).lower()  # 不分大小寫的檔案系統上大小寫不同也是同一個檔案
+        if filename in filenames:
+            raise ValueError(f"第 {i} 個查詢的 id「{query['id']}」與第 {filenames[filename]} 個查詢的結果檔名相同")
+        filenames[filename] = i
+    return queries
+
+def _keyword_list(keywords):
+    if isinstance(keywords, str):
+        keywords = keywords.split()
+    return [keyword for keyword in dict.fromkeys(keywords) if keyword]
+
+def _shared_keyword_scan(analyzer, queries):
+    """以單一自動機一次掃描所有文章，同時計算所有 count 與 keywords 查詢
+
+    Returns:
+        tuple: ({查詢 id: 結果}, {查詢 id: 錯誤訊息})；參數不正確的查詢不參與掃描
+    """
+    results, errors = {}, {}
+    if not queries:
+        return results, errors
+
+    # 所有查詢的關鍵字合併後編號，每個查詢記錄自己用到的編號
+    all_keywords = {}
+    plans = []
+    for query in queries:
+        if query['type'] == 'keywords' and query.get('match', 'all') not in ('all', 'any'):
+            errors[query['id']] = "match 只能是 'all' 或 'any'"
+            continue
+        keywords = _keyword_list(query['keywords'])
+        ids = [all_keywords.setdefault(keyword.lower(), len(all_keywords)) for keyword in keywords]
+        plans.append((query, keywords, ids, frozenset(ids)))
+        if query['type'] == 'count':
+            results[query['id']] = {'counts': {}, 'posts': {}}
+        else:
+            results[query['id']] = {'match': query.get('match', 'all'), 'keyword_counts': {}, 'match_counts': {}}
+    if not plans:
+        return results, errors
+    matcher = AhoCorasick(list(all_keywords))
+    duplicates = analyzer.duplicate_index() if any(query.get('collapse') for query, _, _, _ in plans) else None
+
+    for board in analyzer.board_names():
+        skip = duplicates.duplicates(board) if duplicates else ()
+        for query, keywords, _, _ in plans:
+            result = results[query['id']]
+            if query['type'] == 'keywords':
+                result['keyword_counts'][board] = dict.fromkeys(keywords, 0)
+                result['match_counts'][board] = 0
+        for position, text in enumerate(analyzer.text_columns.board(board).search_text):
+            if text is None:
+                continue
+            found = matcher.find_ids(text)
+            if not found:
+                continue
+            for query, keywords, ids, id_set in plans:
+                result = results[query['id']]
+                matched = bool(ids) and id_set <= found
+                if query['type'] == 'count':
+                    if matched and not (query.get('collapse') and position in skip):
+                        result['counts'][board] = result['counts'].get(board, 0) + 1
+                        result['posts'].setdefault(board, []).append(analyzer.match_row(board, position))
+                    continue
+                board_hits = result['keyword_counts'][board]
+                for keyword, keyword_id in zip(keywords, ids):
+                    if keyword_id in found:
+                        board_hits[keyword] += 1
+                if matched or (result['match'] == 'any' and not id_set.isdisjoint(found)):
+                    result['match_counts'][board] += 1
+    return results, errors
+
+def run_query(analyzer, query):
+    """執行單一非關鍵字掃描類的查詢"""
+    query_type = query['type']
+    if query_type == 'top':
+        return analyzer.top_posts(query.get('metric', 'total_comments'), query.get('top_n', 20),
+                                  query.get('boards'), query.get('start'), query.get('end'),
+                                  bool(query.get('collapse')))
+    if query_type == 'search':
+        posts = list(analyzer.iter_search_matches(_keyword_list(query['keywords']), query['start'], query['end'],
+                                                  bool(query.get('collapse'))))
+        return {'total_count': len(posts), 'posts': posts}
+    if query_type == 'query':
+        posts = list(analyzer.iter_query_matches(query['query'], bool(query.get('collapse'))))
+        return {'total_count': len(posts), 'posts': posts}
+    if query_type == 'comments':
+        options = (query.get('keyword'), query.get('tags'), query.get('boards'), query.get('start'), query.get('end'))
+        return {'tag_counts': analyzer.comment_tag_counts(*options),
+                'comments': list(analyzer.iter_comment_matches(*options))}
+    if query_type == 'common':
+        stop_words = analyzer.stop_words | set(query.get('stop_words', ()))
+        return analyzer.common_strings(query['board'], query.get('top_n', 20), stop_words, query.get('ngram_size'))
+    raise ValueError(f"不支援的查詢類型：{query_type}")
+
+def _result_filename(query_id):
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(query_id)) + '.json'
+
+def run_batch(query_file, output_dir='batch_results', analyzer=None):
+    """執行查詢檔中的所有查詢，回傳 {查詢 id: 結果檔路徑}
+
+    analyzer 未提供時會建立一個延遲載入的 AdvancedAnalysis，所有查詢共用同一份資料
+    """
+    queries = load_queries(query_file)
+    if analyzer is None:
+        from ptt_advanced_analysis import AdvancedAnalysis
+        analyzer = AdvancedAnalysis(lazy=True, parallel=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.time()
+    scan_queries = [query for query in queries if query['type'] in ('count', 'keywords')]
+    try:
+        results, errors = _shared_keyword_scan(analyzer, scan_queries)
+    except Exception as e:  # 掃描失敗時記錄在每個參與掃描的查詢，其他查詢照常執行
+        results, errors = {}, {query['id']: f"{type(e).__name__}: {e}" for query in scan_queries}
+    if results:
+        print(f"已以單次掃描完成 {len(results)} 個關鍵字統計查詢")
+
+    output_files = {}
+    for query in queries:
+        try:
+            if query['id'] in errors:
+                raise ValueError(errors[query['id']])
+            if query['id'] in results:
+                result = results[query['id']]
+            else:
+                result = run_query(analyzer, query)
+            output = {'query': query, 'result': result}
+        except (KeyError, ValueError) as e:
+            print(f"查詢 {query['id']} 執行失敗：{e}")
+            output = {'query': query, 'error': str(e)}
+        except Exception as e:  # 單一查詢的未預期錯誤記錄在該查詢的結果中，不中斷其他查詢
+            print(f"查詢 {query['id']} 執行失敗：{e!r}")
+            output = {'query': query, 'error': f"{type(e).__name__}: {e}"}
+        path = os.path.join(output_dir, _result_filename(query['id']))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        output_files[query['id']] = path
+
+    print(f"完成 {len(queries)} 個查詢，耗時 {time.time() - start:.1f} 秒，結果已保存到 {output_dir}")
+    return output_files
@@ -0,0 +1,143 @@
+"""
+留言層級的索引
+將每則留言的標籤（推/噓/→）與所屬文章攤平成欄位陣列，並建立留言內容的二元字倒排索引，
+可直接查詢「某版位某段時間內提到 X 的噓文」並統計各標籤的則數，不需要逐篇掃描留言
+"""
+from array import array
+
+from ptt_index import BoardIndexes, iter_bigrams
+
+TAGS = ('推', '噓', '→')
+TAG_CODES = {tag: code for code, tag in enumerate(TAGS)}
+OTHER_TAG = len(TAGS)  # 沒有標籤或無法辨識的標籤
+TAG_LABELS = TAGS + ('其他',)
+TAG_ALIASES = {'push': '推', 'boo': '噓', 'neutral': '→', 'arrow': '→'}
+
+def tag_code(tag):
+    """將留言標籤轉換為代碼；原始資料的 → 標籤帶有尾端空白"""
+    return TAG_CODES.get((tag or '').strip() if isinstance(tag, str) else '', OTHER_TAG)
+
+def parse_tags(tags):
+    """將標籤名稱（推/噓/→ 或 push/boo/neutral）轉換為代碼集合，None 或空值表示不限"""
+    if not tags:
+        return None
+    if isinstance(tags, str):
+        tags = [tags]
+    codes = set()
+    for tag in tags:
+        tag = TAG_ALIASES.get(tag.strip().lower(), tag.strip())
+        if tag not in TAG_CODES:
+            raise ValueError(f"不支援的留言標籤：{tag}（可用：{'、'.join(TAGS)} 或 {', '.join(TAG_ALIASES)}）")
+        codes.add(TAG_CODES[tag])
+    return codes
+
+def _comments(post):
+    comments_data = post.get('comments_data') or {}
+    comments = comments_data.get('comments') if hasattr(comments_data, 'get') else None
+    return comments if isinstance(comments, (list, tuple)) else ()
+
+class BoardCommentIndex:
+    """單一版位的留言索引
+
+    留言依所屬文章順序攤平編號；post_offsets[i] 到 post_offsets[i + 1] 為第 i 篇文章的留言編號範圍，
+    編號減去 post_offsets[i] 即為留言在文章留言列表中的位置（無法辨識的項目也佔一個編號，內容視為空字串）。
+    comment_posts 為每則留言所屬的文章位置，tags 為標籤代碼；留言內容不另外保存，比對時從文章讀取。
+    """
+    __slots__ = ('posts', 'post_offsets', 'comment_posts', 'tags', 'bigrams')
+
+    def __init__(self, posts):
+        self.posts = posts
+        self.post_offsets = array('l', [0])
+        self.comment_posts = array('l')
+        self.tags = array('b')
+        self.bigrams = {}
+        for position, post in enumerate(posts):
+            self.add(position, post)
+
+    def add(self, position, post):
+        """在尾端加入文章的所有留言"""
+        while len(self.post_offsets) <= position:
+            self.post_offsets.append(len(self.tags))
+        for comment in _comments(post):
+            comment_id = len(self.tags)
+            self.comment_posts.append(position)
+            if not hasattr(comment, 'get'):
+                self.tags.append(OTHER_TAG)
+                continue
+            self.tags.append(tag_code(comment.get('tag')))
+            content = comment.get('content')
+            for bigram in iter_bigrams(content.lower() if isinstance(content, str) else ''):
+                postings = self.bigrams.get(bigram)
+                if postings is None:
+                    postings = self.bigrams[bigram] = array('l')
+                postings.append(comment_id)
+        self.post_offsets.append(len(self.tags))
+
+    def __len__(self):
+        return len(self.tags)
+
+    def content(self, comment_id):
+        """留言的原始內容；無法辨識的項目回傳空字串"""
+        position = self.comment_posts[comment_id]
+        comment = _comments(self.posts[position])[comment_id - self.post_offsets[position]]
+        content = comment.get('content') if hasattr(comment, 'get') else None
+        return content if isinstance(content, str) else ''
+
+    def estimate(self, keyword):
+        """符合關鍵字的留言數上限；關鍵字少於兩個字時回傳所有留言數"""
+        keyword = keyword.lower()
+        if len(keyword) < 2:
+            return len(self.tags)
+        return min(len(self.bigrams.get(bigram, ())) for bigram in iter_bigrams(keyword))
+
+    def _comment_ids(self, positions):
+        for position in positions:
+            yield from range(self.post_offsets[position], self.post_offsets[position + 1])
+
+    def search(self, keyword=None, tags=None, positions=None):
+        """找出符合條件的留言編號（依編號排序）
+
+        Args:
+            keyword: 留言需包含的字串（不分大小寫），None 表示不限
+            tags: 標籤代碼集合（見 parse_tags），None 表示不限
+            positions: 限定的文章位置，例如日期索引取得的區間
+        """
+        keyword = keyword.lower() if keyword else None
+        candidates = None
+        if keyword and len(keyword) >= 2:
+            postings = sorted((self.bigrams.get(bigram, ()) for bigram in iter_bigrams(keyword)), key=len)
+            if positions is None or len(postings[0]) < self._comment_count(positions):
+                candidates = set(postings[0])
+                for other in postings[1:]:
+                    if not candidates:
+                        break
+                    candidates.intersection_update(other)
+                if positions is not None:
+                    allowed = set(positions)
+                    candidates = {i for i in candidates if self.comment_posts[i] in allowed}
+        if candidates is None:
+            candidates = range(len(self.tags)) if positions is None else self._comment_ids(positions)
+
+        tag_codes, content = self.tags, self.content
+        return sorted(i for i in candidates
+                      if (tags is None or tag_codes[i] in tags) and (keyword is None or keyword in content(i).lower()))
+
+    def _comment_count(self, positions):
+        offsets = self.post_offsets
+        return sum(offsets[position + 1] - offsets[position] for position in positions)
+
+    def post_positions(self, keyword=None, tags=None, positions=None):
+        """有符合條件留言的文章位置集合"""
+        comment_posts = self.comment_posts
+        return {comment_posts[i] for i in self.search(keyword, tags, positions)}
+
+    def tag_counts(self, comment_ids):
+        """統計留言編號中各標籤的則數"""
+        counts = dict.fromkeys(TAG_LABELS, 0)
+        for i in comment_ids:
+            counts[TAG_LABELS[self.tags[i]]] += 1
+        return counts
+
+class CommentIndexes(BoardIndexes):
+    """所有版位的留言索引"""
+    index_class = BoardCommentIndex
@@ -0,0 +1,158 @@
+"""
+跨版位的近似重複文章偵測
+以 MinHash 簽章與 LSH 分段（banding）找出內文幾乎相同的文章（轉錄、複製貼上的文章），
+只比較落在同一個桶中的文章，不需要兩兩比對，整體約為線性時間
+"""
+import re
+import zlib
+
+import numpy as np
+
+from ptt_index import post_epoch_day
+
+SHINGLE_SIZE = 5  # 以連續 5 個字元為一個 shingle
+NUM_PERM = 128  # MinHash 簽章長度
+BANDS = 16  # LSH 分段數，每段 NUM_PERM // BANDS 列；約在相似度 0.7 附近開始成為候選
+SIMILARITY_THRESHOLD = 0.8  # 候選文章的估計 Jaccard 相似度需達到此值才視為重複
+MIN_CONTENT_LENGTH = 50  # 內文太短的文章不參與比對，避免短文被誤判為重複
+SEED = 1
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WHITESPACE = re.compile(r'\s+')
+
+def _permutations(num_perm=NUM_PERM, seed=SEED):
+    """產生 num_perm 組 (a, b)，以 (a * x + b) mod p 模擬隨機排列"""
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    return a, b
+
+def post_content(post):
+    """取出用來比對的文章內文，空白統一為單一空格；沒有內文時回傳空字串"""
+    comments_data = post.get('comments_data')
+    content = comments_data.get('content') if comments_data else None
+    if not isinstance(content, str):
+        return ''
+    return _WHITESPACE.sub(' ', content).strip()
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """文字所有長度為 size 的 shingle 的 32 位元雜湊值（去除重複）"""
+    hashes = {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(max(len(text) - size + 1, 1))}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+class MinHasher:
+    """計算 MinHash 簽章；相同參數產生的簽章可以互相比較"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        self.num_perm = num_perm
+        self.a, self.b = _permutations(num_perm, seed)
+
+    def signature(self, hashes):
+        """shingle 雜湊值的 MinHash 簽章（長度 num_perm 的 uint64 陣列）"""
+        # uint64 乘法溢位時自動取模，與常見 MinHash 實作相同，不影響雜湊的均勻性
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1)
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+class DuplicateIndex:
+    """所有版位文章的近似重複群組
+
+    每個群組以最早發表的文章為代表（同一天時依版位與文章順序），
+    其餘文章視為重複，可在查詢時略過。文章變動時以 invalidate() 丟棄，下次使用再重建。
+    """
+
+    def __init__(self, board_data, threshold=SIMILARITY_THRESHOLD, bands=BANDS, num_perm=NUM_PERM,
+                 min_length=MIN_CONTENT_LENGTH):
+        if num_perm % bands:
+            raise ValueError("num_perm 必須是 bands 的倍數")
+        self.board_data = board_data
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.min_length = min_length
+        self.hasher = MinHasher(num_perm)
+        self._clusters = None
+        self._duplicates = None
+
+    def build(self):
+        """計算所有文章的簽章並分群"""
+        keys = []  # 第 i 個參與比對的文章為 (版位, 文章位置)
+        signatures = []
+        for board_name in self.board_data:
+            for position, post in enumerate(self.board_data[board_name]):
+                content = post_content(post)
+                if len(content) < self.min_length:
+                    continue
+                keys.append((board_name, position))
+                signatures.append(self.hasher.signature(shingle_hashes(content)))
+
+        # 同一段簽章完全相同的文章落在同一個桶，只和桶中第一篇比較估計相似度
+        groups = _UnionFind()
+        for band in range(self.bands):
+            start = band * self.rows
+            buckets = {}
+            for i, signature in enumerate(signatures):
+                first = buckets.setdefault(signature[start:start + self.rows].tobytes(), i)
+                if first != i and groups.find(first) != groups.find(i):
+                    if np.count_nonzero(signatures[first] == signature) >= self.threshold * len(signature):
+                        groups.union(first, i)
+
+        members = {}
+        for i in groups.parent:
+            members.setdefault(groups.find(i), []).append(keys[i])
+        self._clusters = [self._order(cluster) for cluster in members.values() if len(cluster) > 1]
+        self._clusters.sort(key=len, reverse=True)
+        self._duplicates = {}
+        for cluster in self._clusters:
+            for board_name, position in cluster[1:]:
+                self._duplicates.setdefault(board_name, set()).add(position)
+        return self
+
+    def _order(self, cluster):
+        """群組內依發表日期排序，第一篇為代表文章"""
+        board_order = {board_name: rank for rank, board_name in enumerate(self.board_data)}
+
+        def sort_key(key):
+            day = post_epoch_day(self.board_data[key[0]][key[1]])
+            return (day is None, day or 0, board_order[key[0]], key[1])
+        return sorted(cluster, key=sort_key)
+
+    def clusters(self):
+        """所有重複群組，每個群組為 [(版位, 文章位置), ...]，第一篇為代表文章；依群組大小排序"""
+        if self._clusters is None:
+            self.build()
+        return self._clusters
+
+    def duplicates(self, board_name):
+        """版位中不是代表文章的重複文章位置"""
+        if self._duplicates is None:
+            self.build()
+        return self._duplicates.get(board_name, set())
+
+    def is_duplicate(self, board_name, position):
+        return position in self.duplicates(board_name)
+
+    def skip_map(self):
+        """{版位: 重複文章位置}，供排行榜查詢略過重複文章"""
+        if self._duplicates is None:
+            self.build()
+        return self._duplicates
+
+    def invalidate(self):
+        self._clusters = None
+        self._duplicates = None
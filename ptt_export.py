@@ -0,0 +1,464 @@
+"""
+共用的文章攤平與匯出引擎
+版位檔案只串流讀取一次，每篇文章的 comments_data 只攤平一次，再同時交給多個輸出：
+完整 CSV（json_to_csv_converter）、簡易 CSV（simple_json_to_csv）與 Google Sheets 用的 DataFrame（upload_to_sheets）
+
+使用方式：python ptt_export.py <json檔案|--all> [--upload] [--normalized]
+    一次讀取同時產生 <檔名>.csv 與 <檔名>_simple.csv，加上 --upload 時另外上傳到 Google Sheets；
+    加上 --normalized 時另外產生正規化的 <檔名>_posts.csv 與 <檔名>_comments.csv
+    （有安裝 pyarrow 時也產生同名的 .parquet 檔案）
+"""
+import csv
+import glob
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+
+from dateutil import parser
+
+from json_stream import iter_json_array, write_csv_rows
+
+COMMENT_COUNT_FIELDS = ('total_comments', 'like_count', 'dislike_count', 'neutral_count')
+COMMENT_COLUMNS = ['post_id', 'position', 'tag', 'content']
+SIMPLE_COLUMNS = ['title', 'time', 'views', 'total_comments', 'likes', 'dislikes', 'neutral', 'content', 'comments']
+SHEETS_MAX_CHARS = 40000  # Google Sheets 單一儲存格的留言字元上限（官方上限為 50,000）
+
+# clean_text 的字元規則：移除引號（避免 CSV 格式問題），逗號改為全形分號（逗號是 CSV 分隔符）
+CLEAN_TABLE = str.maketrans({'"': None, "'": None, ',': '；'})
+# 與 str.split() 相同的空白定義，連續空白合併為一個空格
+WHITESPACE_RUN = re.compile(r'\s+')
+
+def post_fields(item):
+    """文章除了 comments_data 以外的欄位，加上留言統計欄位"""
+    comments_data = item.get('comments_data', {})
+    row = {k: v for k, v in item.items() if k != 'comments_data'}
+    for field in COMMENT_COUNT_FIELDS:
+        row[field] = comments_data.get(field, 0)
+    return row
+
+def flatten_post(item):
+    """將單篇文章攤平：留言統計成為獨立欄位，留言列表轉為 JSON 字串"""
+    row = post_fields(item)
+    row['comments'] = json.dumps(item.get('comments_data', {}).get('comments', []), ensure_ascii=False)
+    return row
+
+def clean_text(text):
+    """清理文字，移除可能造成 CSV 格式問題的字元"""
+    if not text:
+        return ''
+    # 移除換行符和多餘的空白，再以轉換表移除引號並替換逗號
+    return ' '.join(str(text).split()).translate(CLEAN_TABLE)
+
+def clean_series(values):
+    """clean_text 的批次版本：以 pandas 字串運算一次清理整欄，結果與逐一呼叫 clean_text 完全相同"""
+    import pandas as pd
+    series = pd.Series(values, dtype=object)
+    if series.empty:
+        return series
+    truthy = series.astype(bool)
+    cleaned = series.map(str).str.replace(WHITESPACE_RUN, ' ', regex=True).str.strip().str.translate(CLEAN_TABLE)
+    return cleaned.where(truthy, '')
+
+def format_time(item):
+    """將文章的 timestamp 轉為 YYYY-MM-DD HH:MM:SS，無法解析時回傳空字串"""
+    try:
+        dt = parser.parse(item.get('timestamp', ''))
+        return dt.strftime('%Y-%m-%d %H:%M:%S')
+    except:
+        return ''
+
+def simple_row(item):
+    """將單篇文章轉換為簡單 CSV 的一列"""
+    comments_data = item.get('comments_data', {})
+
+    # 基本資料
+    row = {
+        'title': clean_text(item.get('title', '')),
+        'time': format_time(item),
+        'views': str(item.get('hits', 0)),
+        'total_comments': str(comments_data.get('total_comments', 0)),
+        'likes': str(comments_data.get('like_count', 0)),
+        'dislikes': str(comments_data.get('dislike_count', 0)),
+        'neutral': str(comments_data.get('neutral_count', 0)),
+        'content': clean_text(item.get('content', '')),
+    }
+
+    # 處理留言
+    comments_text = []
+    for comment in comments_data.get('comments', []) or []:
+        text = clean_text(comment.get('content', ''))
+        if text and not text.startswith('http'):  # 排除圖片連結
+            comments_text.append(f"{comment.get('type', '')} {text}")
+    row['comments'] = '\n'.join(comments_text)
+    return row
+
+def simple_frame(items):
+    """將多篇文章一次轉換為簡單 CSV 的 DataFrame，內容與逐篇呼叫 simple_row 相同
+
+    標題、內文與所有留言各自集中成一欄後以 clean_series 批次清理，
+    圖片連結以向量化的 startswith 排除，再依文章合併留言。
+    """
+    import pandas as pd
+    items = list(items)
+    if not items:
+        return pd.DataFrame([])
+    comments_data = [item.get('comments_data', {}) for item in items]
+    frame = pd.DataFrame({
+        'title': clean_series([item.get('title', '') for item in items]),
+        'time': [format_time(item) for item in items],
+        'views': [str(item.get('hits', 0)) for item in items],
+        'total_comments': [str(data.get('total_comments', 0)) for data in comments_data],
+        'likes': [str(data.get('like_count', 0)) for data in comments_data],
+        'dislikes': [str(data.get('dislike_count', 0)) for data in comments_data],
+        'neutral': [str(data.get('neutral_count', 0)) for data in comments_data],
+        'content': clean_series([item.get('content', '') for item in items]),
+    })
+
+    # 所有留言攤平成一欄，owners 記錄所屬的文章列
+    owners, types, texts = [], [], []
+    for row, data in enumerate(comments_data):
+        for comment in data.get('comments', []) or []:
+            owners.append(row)
+            types.append(comment.get('type', ''))
+            texts.append(comment.get('content', ''))
+    cleaned = clean_series(texts)
+    keep = (cleaned != '') & ~cleaned.str.startswith('http') if texts else []  # 排除圖片連結
+    lines = pd.Series(types, dtype=object)[keep].map(str) + ' ' + cleaned[keep]
+    joined = lines.groupby(pd.Series(owners, dtype='int64')[keep], sort=False).agg('\n'.join)
+    frame['comments'] = joined.reindex(range(len(items)), fill_value='')
+    return frame
+
+def split_comments_horizontally(comments_list, max_chars=SHEETS_MAX_CHARS):
+    """將留言列表橫向分割，每個部分不超過指定字元數
+
+    每則留言只序列化一次，長度以單獨成為一個 JSON 陣列計算（多出的兩個字元為中括號），
+    各部分直接以 ', ' 串接序列化結果，與 json.dumps 整個列表的輸出相同
+    """
+    result = []
+    current_chunk = []
+    current_length = 0
+
+    for comment in comments_list:
+        comment_str = json.dumps(comment, ensure_ascii=False)
+        comment_length = len(comment_str) + 2
+
+        if current_length + comment_length > max_chars and current_chunk:
+            result.append('[' + ', '.join(current_chunk) + ']')
+            current_chunk = [comment_str]
+            current_length = comment_length
+        else:
+            current_chunk.append(comment_str)
+            current_length += comment_length
+
+    if current_chunk:
+        result.append('[' + ', '.join(current_chunk) + ']')
+
+    return result
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class FullCsvSink:
+    """完整 CSV：所有原始欄位、留言統計與 JSON 字串形式的留言
+
+    欄位要等所有文章讀完才能確定，資料列先序列化到暫存檔，結束時再依完整欄位寫出，
+    因此記憶體用量不隨版位大小增加。也記錄 pandas 會存成 float64 的欄位（數值欄位中有缺值或浮點數），
+    讓輸出與 DataFrame.to_csv 相同。comments 為 False 時不輸出留言欄位（正規化匯出的文章表）。
+    """
+
+    def __init__(self, output_file, comments=True):
+        self.output_file = output_file
+        self.comments = comments
+        self.columns = {}  # 欄位 -> [有缺值, 全為數值, 有浮點數]
+        self.count = 0
+        self._spill = tempfile.TemporaryFile()
+
+    def add(self, item, fields):
+        row = dict(fields)
+        if self.comments:
+            row['comments'] = json.dumps(item.get('comments_data', {}).get('comments', []), ensure_ascii=False)
+        for column, value in row.items():
+            stats = self.columns.get(column)
+            if stats is None:
+                # 此欄位首次出現之前的資料列都缺少這個欄位
+                stats = self.columns[column] = [self.count > 0, True, False]
+            if value is None:
+                stats[0] = True
+            elif _is_number(value):
+                stats[2] = stats[2] or isinstance(value, float)
+            else:
+                stats[1] = False
+        if len(row) < len(self.columns):
+            for column, stats in self.columns.items():
+                if column not in row:
+                    stats[0] = True
+        pickle.dump(row, self._spill, protocol=pickle.HIGHEST_PROTOCOL)
+        self.count += 1
+
+    def _rows(self, float_columns):
+        self._spill.seek(0)
+        while True:
+            try:
+                row = pickle.load(self._spill)
+            except EOFError:
+                return
+            for column in float_columns:
+                value = row.get(column)
+                if _is_number(value):
+                    row[column] = repr(float(value))
+            yield row
+
+    def close(self):
+        float_columns = [column for column, (missing, numeric, has_float) in self.columns.items()
+                         if numeric and (missing or has_float)]
+        try:
+            write_csv_rows(self.output_file, list(self.columns), self._rows(float_columns))
+        finally:
+            self._spill.close()
+        return self.output_file
+
+    def abort(self):
+        self._spill.close()
+
+class SimpleCsvSink:
+    """簡易 CSV：清理過的文字欄位，留言整合在同一個欄位中；邊讀邊分批寫入"""
+
+    def __init__(self, output_file, chunk_rows=1000):
+        self.output_file = output_file
+        self.chunk_rows = chunk_rows
+        self.count = 0
+        self._items = []
+        self._writer = None
+
+    def add(self, item, fields):
+        self._items.append(item)
+        self.count += 1
+        if len(self._items) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._writer is None:
+            self._file = open(self.output_file, 'w', encoding='utf-8-sig', newline='')
+            self._writer = csv.writer(self._file, lineterminator=os.linesep)
+            self._writer.writerow(SIMPLE_COLUMNS)
+        if self._items:
+            # 每批文章以向量化的 simple_frame 一次清理
+            self._writer.writerows(simple_frame(self._items).itertuples(index=False, name=None))
+        self._items = []
+
+    def close(self):
+        self._flush()
+        self._file.close()
+        return self.output_file
+
+    def abort(self):
+        """讀取失敗時移除寫到一半的檔案"""
+        if self._writer is not None:
+            self._file.close()
+            os.remove(self.output_file)
+
+class CommentsCsvSink:
+    """正規化匯出的留言表：每則留言一列，以 post_id（文章的 _id）與文章表對應，position 為留言在文章中的順序
+
+    留言內容保持原始字串，不需要再從儲存格中解析 JSON；邊讀邊分批寫入
+    """
+
+    def __init__(self, output_file, chunk_rows=10000):
+        self.output_file = output_file
+        self.chunk_rows = chunk_rows
+        self.count = 0
+        self._rows = []
+        self._file = open(output_file, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file, lineterminator=os.linesep)
+        self._writer.writerow(COMMENT_COLUMNS)
+
+    def add(self, item, fields):
+        post_id = item.get('_id')
+        for position, comment in enumerate(item.get('comments_data', {}).get('comments', []) or []):
+            self._rows.append((post_id, position, comment.get('tag', ''), comment.get('content', '')))
+        if len(self._rows) >= self.chunk_rows:
+            self.count += len(self._rows)
+            self._writer.writerows(self._rows)
+            self._rows = []
+
+    def close(self):
+        self.count += len(self._rows)
+        self._writer.writerows(self._rows)
+        self._rows = []
+        self._file.close()
+        return self.output_file
+
+    def abort(self):
+        """讀取失敗時移除寫到一半的檔案"""
+        self._file.close()
+        os.remove(self.output_file)
+
+def csv_to_parquet(csv_file, parquet_file=None, column_types=None):
+    """以 pyarrow 串流讀取 CSV 並分批寫成 Parquet，回傳輸出路徑；沒有安裝 pyarrow 時回傳 None
+
+    column_types 指定欄位型別（pyarrow 型別），未指定的欄位由 pyarrow 依第一個區塊推斷；
+    空字串在字串欄位中保持為空字串，在數值欄位中為缺值
+    """
+    try:
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    if parquet_file is None:
+        parquet_file = os.path.splitext(csv_file)[0] + '.parquet'
+    convert_options = pa_csv.ConvertOptions(column_types=column_types or {}, strings_can_be_null=False)
+    parse_options = pa_csv.ParseOptions(newlines_in_values=True)  # 文章與留言內容可能包含換行
+    reader = pa_csv.open_csv(csv_file, parse_options=parse_options, convert_options=convert_options)
+    with pq.ParquetWriter(parquet_file, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    return parquet_file
+
+def normalized_sinks(input_file, posts_file=None, comments_file=None):
+    """正規化匯出的兩個輸出：文章表（不含留言）與留言表（每則留言一列），以 _id / post_id 對應"""
+    base = os.path.splitext(input_file)[0]
+    return (FullCsvSink(posts_file or base + '_posts.csv', comments=False),
+            CommentsCsvSink(comments_file or base + '_comments.csv'))
+
+def write_parquet(posts, comments):
+    """將已寫完的文章表與留言表轉成 Parquet；沒有安裝 pyarrow 時略過
+
+    Returns:
+        (文章表 Parquet 路徑, 留言表 Parquet 路徑)，未產生時為 (None, None)
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("未安裝 pyarrow，略過 Parquet 輸出")
+        return None, None
+    # 文章表的欄位型別依 FullCsvSink 的欄位統計決定（有缺值或浮點數的數值欄位為 float64），不需要推斷
+    post_types = {column: pa.string() if not numeric else pa.float64() if missing or has_float else pa.int64()
+                  for column, (missing, numeric, has_float) in posts.columns.items()}
+    comment_types = {'post_id': pa.string(), 'position': pa.int32(), 'tag': pa.string(), 'content': pa.string()}
+    return (csv_to_parquet(posts.output_file, column_types=post_types),
+            csv_to_parquet(comments.output_file, column_types=comment_types))
+
+def export_normalized(input_file, posts_file=None, comments_file=None, parquet=True):
+    """只做正規化匯出：文章表與留言表（見 normalized_sinks）
+
+    下游工具可以只讀取需要的欄位並平行載入，不需要從儲存格中解析 JSON。
+    parquet 為 True 且有安裝 pyarrow 時，另外將兩個表轉成 Parquet。
+    需要同時產生其他輸出時使用 export_all(normalized=True)，只讀取版位檔案一次。
+
+    Returns:
+        dict: posts、comments 為 CSV 路徑，posts_parquet、comments_parquet 為 Parquet 路徑（未產生時為 None）
+    """
+    outputs = export_all(input_file, full_csv=False, simple_csv=False, normalized=True, parquet=parquet,
+                         posts_file=posts_file, comments_file=comments_file)
+    return {name: outputs[name] for name in ('posts', 'comments', 'posts_parquet', 'comments_parquet')}
+
+class SheetsFrameSink:
+    """Google Sheets 用的 DataFrame：留言依儲存格字元上限橫向分割成 comments_1、comments_2…"""
+
+    def __init__(self, max_chars=SHEETS_MAX_CHARS):
+        self.max_chars = max_chars
+        self.count = 0
+        self.frame = None
+        self._rows = []
+        self._max_parts = 1  # 追蹤最大的留言分割數
+
+    def add(self, item, fields):
+        parts = split_comments_horizontally(item.get('comments_data', {}).get('comments', []), self.max_chars)
+        self._max_parts = max(self._max_parts, len(parts))
+        self._rows.append(list(fields.values()) + parts)
+        if self.count == 0:
+            self._columns = list(fields)
+        self.count += 1
+
+    def close(self):
+        import pandas as pd
+        if not self._rows:
+            self.frame = pd.DataFrame()
+            return self.frame
+        columns = self._columns + [f'comments_{i + 1}' for i in range(self._max_parts)]
+        # 欄位以第一篇文章為準，留言部分不足的資料列補上空字串
+        for row in self._rows:
+            row.extend([''] * (len(columns) - len(row)))
+        self.frame = pd.DataFrame(self._rows, columns=columns)
+        self._rows = []
+        return self.frame
+
+    def abort(self):
+        self._rows = []
+
+def export_board(input_file, sinks):
+    """串流讀取版位檔案一次，將每篇文章同時交給所有輸出，回傳處理的文章數"""
+    count = 0
+    try:
+        for item in iter_json_array(input_file):
+            fields = post_fields(item)
+            for sink in sinks:
+                sink.add(item, fields)
+            count += 1
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    for sink in sinks:
+        sink.close()
+    return count
+
+def export_all(input_file, full_csv=True, simple_csv=True, sheets=False, normalized=False, parquet=True,
+               posts_file=None, comments_file=None):
+    """一次讀取產生所有需要的輸出
+
+    normalized 為 True 時同一次讀取也產生正規化的文章表與留言表（見 normalized_sinks），
+    parquet 為 True 且有安裝 pyarrow 時另外轉成 Parquet
+
+    Returns:
+        dict: full_csv、simple_csv 為輸出檔案路徑，sheets 為 Google Sheets 用的 DataFrame，
+              posts、comments 為正規化 CSV 路徑，posts_parquet、comments_parquet 為 Parquet 路徑（未產生時為 None）
+    """
+    base = os.path.splitext(input_file)[0]
+    sinks = {}
+    if full_csv:
+        sinks['full_csv'] = FullCsvSink(base + '.csv' if full_csv is True else full_csv)
+    if simple_csv:
+        sinks['simple_csv'] = SimpleCsvSink(base + '_simple.csv' if simple_csv is True else simple_csv)
+    if sheets:
+        sinks['sheets'] = SheetsFrameSink()
+    if normalized:
+        sinks['posts'], sinks['comments'] = normalized_sinks(input_file, posts_file, comments_file)
+    count = export_board(input_file, list(sinks.values()))
+    print(f"已讀取 {input_file} 的 {count} 篇文章並產生 {len(sinks)} 種輸出")
+    outputs = {name: sink.frame if name == 'sheets' else sink.output_file for name, sink in sinks.items()}
+    if normalized:
+        print(f"- 正規化匯出 {count} 篇文章與 {sinks['comments'].count} 則留言")
+        outputs['posts_parquet'], outputs['comments_parquet'] = (
+            write_parquet(sinks['posts'], sinks['comments']) if parquet else (None, None))
+    return outputs
+
+def main():
+    upload = '--upload' in sys.argv
+    normalized = '--normalized' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg not in ('--upload', '--normalized')]
+    if not args:
+        print("使用方式：python ptt_export.py <json檔案|--all> [--upload] [--normalized]")
+        return
+    input_files = glob.glob('*.json') if args[0] == '--all' else args
+    for input_file in input_files:
+        try:
+            outputs = export_all(input_file, sheets=upload, normalized=normalized)
+        except (OSError, ValueError) as e:
+            print(f"匯出 {input_file} 時發生錯誤：{e}")
+            continue
+        print(f"- 完整 CSV：{outputs['full_csv']}")
+        print(f"- 簡易 CSV：{outputs['simple_csv']}")
+        if normalized:
+            print(f"- 文章表：{outputs['posts']}" + (f"、{outputs['posts_parquet']}" if outputs['posts_parquet'] else ''))
+            print(f"- 留言表：{outputs['comments']}"
+                  + (f"、{outputs['comments_parquet']}" if outputs['comments_parquet'] else ''))
+        if upload:
+            from upload_to_sheets import upload_frame
+            upload_frame(outputs['sheets'], input_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+以 pandas DataFrame 表示的版位資料
+將所有版位轉成型別明確的文章表與留言長表，儀表板類的統計以向量化運算完成
+"""
+import pandas as pd
+
+COUNT_COLUMNS = ['hits', 'total_comments', 'like_count', 'dislike_count', 'neutral_count']
+REACTION_COLUMNS = ['total_comments', 'like_count', 'dislike_count', 'neutral_count']
+
+def build_frames(board_data):
+    """將所有版位轉換為文章表與留言表
+
+    Returns:
+        (posts, comments)
+        posts: 每篇文章一列，board 為 category、acceptedDate 為 datetime64（UTC）、
+               各統計數字為可為空的整數（Int64）
+        comments: 每則留言一列，post_row 對應 posts 的列位置，tag 為 category
+    """
+    columns = {name: [] for name in ['board', 'post_id', 'number', 'title', 'url', 'acceptedDate'] + COUNT_COLUMNS}
+    comment_rows = []
+    comment_tags = []
+    comment_contents = []
+
+    for board, posts in board_data.items():
+        for post in posts:
+            comments_data = post.get('comments_data') or {}
+            row = len(columns['board'])
+            columns['board'].append(board)
+            columns['post_id'].append(post.get('_id'))
+            columns['number'].append(post.get('number'))
+            columns['title'].append(post.get('title', ''))
+            columns['url'].append(post.get('url', ''))
+            columns['acceptedDate'].append(post.get('acceptedDate'))
+            columns['hits'].append(post.get('hits'))
+            for name in REACTION_COLUMNS:
+                columns[name].append(comments_data.get(name))
+            for comment in comments_data.get('comments') or ():
+                comment_rows.append(row)
+                comment_tags.append((comment.get('tag') or '').strip())
+                comment_contents.append(comment.get('content', ''))
+
+    boards = list(board_data)
+    posts = pd.DataFrame(columns)
+    posts['board'] = pd.Categorical(posts['board'], categories=boards)
+    posts['acceptedDate'] = pd.to_datetime(posts['acceptedDate'], errors='coerce', utc=True).dt.tz_convert(None)
+    for name in ['number'] + COUNT_COLUMNS:
+        posts[name] = pd.to_numeric(posts[name], errors='coerce').astype('Int64')
+
+    post_rows = pd.array(comment_rows, dtype='int64')
+    comments = pd.DataFrame({
+        'board': pd.Categorical.from_codes(posts['board'].cat.codes.to_numpy()[post_rows.to_numpy()], categories=boards),
+        'post_row': post_rows,
+        'tag': pd.Categorical(comment_tags),
+        'content': pd.array(comment_contents, dtype='string'),
+    })
+    return posts, comments
+
+def post_volume(posts, freq='D'):
+    """各版位每日（freq='D'）或每週（freq='W'）的發文數，列為日期、欄為版位"""
+    return (posts.dropna(subset=['acceptedDate'])
+                 .groupby([pd.Grouper(key='acceptedDate', freq=freq), 'board'], observed=False)
+                 .size()
+                 .unstack('board', fill_value=0))
+
+def reaction_totals(posts):
+    """各版位的總留言、推、噓、箭頭數與推噓比"""
+    totals = posts.groupby('board', observed=False)[REACTION_COLUMNS].sum()
+    totals['push_boo_ratio'] = totals['like_count'] / totals['dislike_count'].clip(lower=1)
+    return totals
+
+def comment_activity(posts, comments, freq='D'):
+    """各版位每個時間區段的留言數，依推/噓/→ 分欄
+
+    留言本身沒有時間欄位，因此以所屬文章的發文日期歸類
+    """
+    dates = posts['acceptedDate'].to_numpy()[comments['post_row'].to_numpy()]
+    activity = comments[['board', 'tag']].assign(acceptedDate=dates).dropna(subset=['acceptedDate'])
+    return (activity.groupby(['board', pd.Grouper(key='acceptedDate', freq=freq), 'tag'], observed=True)
+                    .size()
+                    .unstack('tag', fill_value=0))
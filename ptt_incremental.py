@@ -0,0 +1,294 @@
+"""
+增量匯出 CSV
+每個輸出檔案旁邊保存一個狀態檔（<輸出檔案>.state，內容為 JSON），記錄已匯出的最後一篇文章編號與 _id、
+每一列對應的文章與其在檔案中的位元組位置，以及以 _id 為鍵的文章簽章。再次匯出時只串流讀取版位檔案一次：
+新文章附加到檔案尾端，有變動的文章從第一個變動的資料列開始改寫檔案尾段，之前的資料列不需要讀取或複製，
+每日匯出的成本取決於新增與變動的文章（通常是近期的文章），而不是版位的歷史資料量。
+
+文章簽章是整篇文章（包含 comments_data 中的內文與所有留言）序列化後的雜湊，
+任何欄位的修改（即使長度不變）都會讓該文章被改寫。
+
+欄位版面改變（例如出現新欄位，或整數欄位出現缺值而需要改存成浮點數）、狀態檔遺失或與輸出檔案不符時，
+會自動改為完整匯出並重建狀態檔。來源中已刪除的文章會保留在輸出檔案中。
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from json_stream import iter_json_array
+from ptt_export import FullCsvSink, SimpleCsvSink, export_board, flatten_post, simple_frame
+
+STATE_SUFFIX = '.state'  # 不使用 .json 副檔名，避免被 glob('*.json') 當成版位檔案
+STATE_VERSION = 3  # 簽章或狀態格式變更時遞增，舊的狀態檔會觸發完整匯出
+FORMATS = ('full', 'simple')
+
+def state_path(output_file):
+    return output_file + STATE_SUFFIX
+
+def post_key(item):
+    """文章的識別鍵：優先使用 _id，沒有時使用文章編號或網址"""
+    for field in ('_id', 'number', 'url'):
+        value = item.get(field)
+        if value is not None and value != '':
+            return str(value)
+    return None
+
+def post_signature(item):
+    """整篇文章內容的雜湊，用來判斷文章是否需要改寫"""
+    data = json.dumps(item, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+def load_state(output_file, format):
+    """讀取輸出檔案的匯出狀態；不存在、損毀或與輸出格式不符時回傳 None"""
+    path = state_path(output_file)
+    if not os.path.exists(output_file) or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != STATE_VERSION or state.get('format') != format:
+        return None
+    if len(state.get('rows', ())) != state.get('count') or len(state.get('offsets', ())) != state.get('count'):
+        return None
+    if os.path.getsize(output_file) != state.get('size'):
+        # 輸出檔案在上次匯出後被修改，或改寫尾段時中斷
+        return None
+    return state
+
+def save_state(output_file, state):
+    """寫入暫存檔後再取代，避免中斷時留下不完整的狀態檔"""
+    path = state_path(output_file)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.state-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+class StateSink:
+    """記錄每一列對應的文章與簽章，與 FullCsvSink / SimpleCsvSink 一起交給 export_board"""
+
+    def __init__(self, format):
+        self.state = {'version': STATE_VERSION, 'format': format, 'count': 0, 'rows': [], 'hashes': {},
+                      'last_number': None, 'last_id': None}
+        self.keyed = True  # 所有文章都有識別鍵且不重複
+
+    def add(self, item, fields):
+        key = post_key(item)
+        if key is None or key in self.state['hashes']:
+            self.keyed = False
+        self.state['rows'].append(key)
+        self.state['hashes'][key] = post_signature(item)
+        self.state['count'] += 1
+        _record_last(self.state, item)
+
+    def close(self):
+        return self.state
+
+    def abort(self):
+        pass
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _record_last(state, item):
+    number = item.get('number')
+    if _is_number(number) and (state['last_number'] is None or number >= state['last_number']):
+        state['last_number'] = number
+        state['last_id'] = item.get('_id')
+
+def _column_kinds(columns):
+    """依 FullCsvSink 的欄位統計判斷每個欄位的寫出方式：int、float（數值以浮點數寫出）或 other"""
+    kinds = {}
+    for column, (missing, numeric, has_float) in columns.items():
+        if not numeric:
+            kinds[column] = 'other'
+        elif missing or has_float:
+            kinds[column] = 'float'
+        else:
+            kinds[column] = 'int'
+    return kinds
+
+def full_export(input_file, output_file, format):
+    """完整匯出並建立狀態檔，回傳 (文章數, 狀態)"""
+    csv_sink = FullCsvSink(output_file) if format == 'full' else SimpleCsvSink(output_file)
+    state_sink = StateSink(format)
+    count = export_board(input_file, [csv_sink, state_sink])
+    state = state_sink.state
+    if format == 'full':
+        state['columns'] = list(csv_sink.columns)
+        state['kinds'] = _column_kinds(csv_sink.columns)
+    if state_sink.keyed:
+        state['offsets'], state['size'] = _row_offsets(output_file)
+        save_state(output_file, state)
+    else:
+        # 無法以識別鍵對應資料列，下次仍然完整匯出
+        print(f"注意：{input_file} 有文章缺少 _id 或 _id 重複，無法增量匯出")
+        if os.path.exists(state_path(output_file)):
+            os.remove(state_path(output_file))
+    return count, state
+
+def _full_row(item, columns, kinds):
+    """依既有的欄位版面產生完整 CSV 的一列；版面需要改變時回傳 None"""
+    row = flatten_post(item)
+    if any(column not in kinds for column in row):
+        return None
+    values = []
+    for column in columns:
+        value = row.get(column)
+        kind = kinds[column]
+        if kind == 'int':
+            if not isinstance(value, int) or isinstance(value, bool):
+                return None
+        elif kind == 'float':
+            if _is_number(value):
+                value = repr(float(value))
+            elif value is not None:
+                return None
+        values.append(value)
+    return values
+
+def _render_rows(items, state):
+    """將文章轉換為 CSV 資料列；版面不相容時回傳 None"""
+    if not items:
+        return []
+    if state['format'] == 'simple':
+        return list(simple_frame(items).itertuples(index=False, name=None))
+    rows = []
+    for item in items:
+        row = _full_row(item, state['columns'], state['kinds'])
+        if row is None:
+            return None
+        rows.append(row)
+    return rows
+
+def _row_offsets(output_file):
+    """掃描 CSV，回傳 (每一資料列開頭的位元組位置, 檔案大小)；儲存格中的換行不會被當成資料列的結尾"""
+    offsets = []
+    consumed = 0
+    with open(output_file, 'rb') as f:
+        def lines():
+            nonlocal consumed
+            for line in f:
+                consumed += len(line)
+                yield line.decode('utf-8-sig' if consumed == len(line) else 'utf-8')
+        reader = csv.reader(lines())
+        next(reader, None)  # 標題列
+        while True:
+            # csv.reader 只在需要時讀取下一行，此時已讀取的都是之前的資料列
+            offset = consumed
+            if next(reader, None) is None:
+                break
+            offsets.append(offset)
+    return offsets, consumed
+
+def _encode_rows(rows, start):
+    """將資料列編碼為 CSV 位元組，回傳 (位元組, 每一列的開頭位置)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator=os.linesep)
+    chunks, offsets = [], []
+    position = start
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        chunk = buffer.getvalue().encode('utf-8')
+        offsets.append(position)
+        chunks.append(chunk)
+        position += len(chunk)
+    return b''.join(chunks), offsets
+
+def _rewrite_tail(output_file, state, changed_rows, new_rows):
+    """從第一個有變動的資料列開始改寫檔案尾段，之前的資料列保持不動；新資料列接在最後
+
+    尾段先完整寫到暫存檔，再截斷輸出檔案並接上；中途中斷時檔案大小與狀態檔不符，下次會完整匯出
+    """
+    rows, offsets = state['rows'], state['offsets']
+    first = min((i for i, key in enumerate(rows) if key in changed_rows), default=len(rows))
+    start = offsets[first] if first < len(rows) else state['size']
+    with tempfile.TemporaryFile() as segment:
+        with open(output_file, 'rb') as f:
+            f.seek(start)
+            # 尾段的資料列依序對應 rows[first:]，只替換有變動的資料列
+            reader = csv.reader(io.TextIOWrapper(f, encoding='utf-8', newline=''))
+            data, tail_offsets = _encode_rows((changed_rows.get(key, row) for key, row in zip(rows[first:], reader)),
+                                              start)
+        segment.write(data)
+        data, new_offsets = _encode_rows(new_rows, start + len(data))
+        segment.write(data)
+        segment.seek(0)
+        with open(output_file, 'r+b') as target:
+            target.truncate(start)
+            target.seek(start)
+            shutil.copyfileobj(segment, target)
+            size = target.tell()
+    state['offsets'] = offsets[:first] + tail_offsets + new_offsets
+    state['size'] = size
+
+def incremental_export(input_file, output_file, format='full'):
+    """增量匯出版位檔案到 CSV
+
+    Args:
+        format: 'full' 為 json_to_csv_converter 的完整 CSV，'simple' 為 simple_json_to_csv 的簡易 CSV
+
+    Returns:
+        dict: 新增、改寫的列數，以及是否改為完整匯出（rebuilt）
+    """
+    if format not in FORMATS:
+        raise ValueError(f"不支援的匯出格式：{format}（可用：{', '.join(FORMATS)}）")
+    state = load_state(output_file, format)
+    if state is None:
+        count, _ = full_export(input_file, output_file, format)
+        print(f"已完整匯出 {input_file} 到 {output_file}（共 {count} 筆），並建立匯出狀態")
+        return {'appended': count, 'updated': 0, 'rebuilt': True}
+
+    # 只保留新增與有變動的文章
+    hashes = state['hashes']
+    new_items, changed_items = [], {}
+    seen = set()
+    for item in iter_json_array(input_file):
+        key = post_key(item)
+        if key is None or key in seen:
+            # 缺少識別鍵或來源中有重複的文章，無法對應資料列
+            new_items = None
+            break
+        seen.add(key)
+        digest = hashes.get(key)
+        if digest is None:
+            new_items.append(item)
+        elif digest != post_signature(item):
+            changed_items[key] = item
+
+    if new_items is not None and not new_items and not changed_items:
+        print(f"{output_file} 已是最新（最後匯出的文章編號：{state['last_number']}，_id：{state['last_id']}）")
+        return {'appended': 0, 'updated': 0, 'rebuilt': False}
+
+    new_rows = _render_rows(new_items, state) if new_items is not None else None
+    changed = _render_rows(list(changed_items.values()), state) if new_rows is not None else None
+    if changed is None:
+        count, _ = full_export(input_file, output_file, format)
+        print(f"欄位版面已改變或文章無法對應既有的資料列，已完整匯出 {input_file} 到 {output_file}（共 {count} 筆）")
+        return {'appended': count, 'updated': 0, 'rebuilt': True}
+
+    _rewrite_tail(output_file, state, dict(zip(changed_items, changed)), new_rows)
+
+    for item in list(changed_items.values()) + new_items:
+        key = post_key(item)
+        if key not in hashes:
+            state['rows'].append(key)
+        hashes[key] = post_signature(item)
+        _record_last(state, item)
+    state['count'] = len(state['rows'])
+    save_state(output_file, state)
+    print(f"已增量匯出 {input_file} 到 {output_file}：新增 {len(new_rows)} 筆，更新 {len(changed_items)} 筆"
+          f"（最後匯出的文章編號：{state['last_number']}，_id：{state['last_id']}）")
+    return {'appended': len(new_rows), 'updated': len(changed_items), 'rebuilt': False}
@@ -0,0 +1,233 @@
+"""
+分析用索引結構
+在載入資料時預先建立，讓查詢只需處理相關範圍的文章
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+EPOCH = datetime(1970, 1, 1)
+
+def to_epoch_day(date_str):
+    """將 YYYY-MM-DD 字串轉換為自 1970-01-01 起算的天數"""
+    return (datetime.strptime(date_str, "%Y-%m-%d") - EPOCH).days
+
+def post_epoch_day(post, day_cache=None):
+    """取得文章 acceptedDate 的 epoch 天數，無法解析時回傳 None"""
+    try:
+        date_str = post.get('acceptedDate', '').split('T')[0]
+        if day_cache is None:
+            return to_epoch_day(date_str)
+        day = day_cache.get(date_str)
+        if day is None:
+            day = day_cache[date_str] = to_epoch_day(date_str)
+        return day
+    except (ValueError, AttributeError):
+        return None
+
+class BoardDateIndex:
+    """單一版位的日期索引：依日期排序的 epoch 天數與對應的文章位置"""
+    __slots__ = ('days', 'positions')
+
+    def __init__(self, posts):
+        day_cache = {}  # 同一天的文章很多，日期字串只解析一次
+        pairs = []
+        for i, post in enumerate(posts):
+            day = post_epoch_day(post, day_cache)
+            if day is not None:
+                pairs.append((day, i))
+        pairs.sort()
+        self.days = array('l', [day for day, _ in pairs])
+        self.positions = array('l', [i for _, i in pairs])
+
+    def add(self, position, post):
+        """加入新文章（位置需大於既有文章）"""
+        day = post_epoch_day(post)
+        if day is not None:
+            i = bisect_right(self.days, day)
+            self.days.insert(i, day)
+            self.positions.insert(i, position)
+
+    def __len__(self):
+        return len(self.days)
+
+    def positions_between(self, start_day, end_day):
+        """回傳日期落在 [start_day, end_day] 內的文章位置，依原始文章順序排列"""
+        lo = bisect_left(self.days, start_day)
+        hi = bisect_right(self.days, end_day)
+        return sorted(self.positions[lo:hi])
+
+class BoardTextColumns:
+    """單一版位預先正規化的搜尋欄位
+
+    search_text 為小寫的「標題 + ' ' + 內文」，title_lengths 記錄標題長度以便切出內文，
+    comments_summary 為前五則留言的摘要。無法正規化的文章以 None 表示。
+    """
+    __slots__ = ('search_text', 'title_lengths', 'comments_summary')
+
+    def __init__(self, posts):
+        self.search_text = []
+        self.title_lengths = array('l')
+        self.comments_summary = []
+        for post in posts:
+            self.add(len(self.search_text), post)
+
+    def add(self, position, post):
+        """在欄位尾端加入新文章"""
+        text = None
+        title_length = 0
+        summary = ''
+        try:
+            title = post.get('title', '').lower()
+            content = ''
+            comments_data = post.get('comments_data') or {}
+            if 'content' in comments_data:
+                content = comments_data['content'].lower()
+            if comments_data.get('comments'):
+                summary = '; '.join([c.get('content') or '' for c in comments_data['comments'][:5]])
+            text = title + ' ' + content
+            title_length = len(title)
+        except (AttributeError, TypeError):
+            pass
+        self.search_text.append(text)
+        self.title_lengths.append(title_length)
+        self.comments_summary.append(summary)
+
+    def __len__(self):
+        return len(self.search_text)
+
+    def content(self, position):
+        """取得小寫的文章內文"""
+        text = self.search_text[position]
+        if text is None:
+            return ''
+        return text[self.title_lengths[position] + 1:]
+
+    def matching_positions(self, keywords, positions=None):
+        """回傳同時包含所有關鍵字的文章位置，positions 可限定要檢查的文章"""
+        keywords = [keyword.lower() for keyword in keywords]
+        search_text = self.search_text
+        if positions is None:
+            positions = range(len(search_text))
+        for position in positions:
+            text = search_text[position]
+            if text is not None and all(keyword in text for keyword in keywords):
+                yield position
+
+class BoardIndexes:
+    """依版位存放的索引集合，每個版位在第一次使用時建立一次"""
+    index_class = None
+
+    def __init__(self, board_data):
+        self.board_data = board_data
+        self._boards = {}
+
+    def board(self, board_name):
+        """取得特定版位的索引"""
+        index = self._boards.get(board_name)
+        if index is None:
+            index = self._boards[board_name] = self.index_class(self.board_data[board_name])
+        return index
+
+    def build(self):
+        """預先建立所有版位的索引"""
+        for board_name in self.board_data:
+            self.board(board_name)
+        return self
+
+    def add_post(self, board_name, position):
+        """新文章加入版位資料後，更新已建立的索引"""
+        index = self._boards.get(board_name)
+        if index is not None:
+            index.add(position, self.board_data[board_name][position])
+
+    def invalidate(self, board_name=None):
+        """版位資料變動時丟棄舊索引"""
+        if board_name is None:
+            self._boards.clear()
+        else:
+            self._boards.pop(board_name, None)
+
+class DateIndex(BoardIndexes):
+    """所有版位的日期索引"""
+    index_class = BoardDateIndex
+
+class TextColumns(BoardIndexes):
+    """所有版位預先正規化的搜尋欄位"""
+    index_class = BoardTextColumns
+
+def iter_bigrams(text):
+    """文字中所有不重複的相鄰兩字"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+class BoardBigramIndex:
+    """單一版位的二元字倒排索引，建立在 BoardTextColumns 的小寫欄位上
+
+    text 對應「標題 + ' ' + 內文」，title 只含標題；每個二元字對應依文章位置排序的位置陣列。
+    查詢時以所有二元字位置陣列的交集作為候選文章，再以子字串比對確認。
+    """
+    __slots__ = ('columns', 'text', 'title')
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.text = {}
+        self.title = {}
+        for position in range(len(columns)):
+            self.add(position)
+
+    def add(self, position, post=None):
+        """將文章加入索引（欄位需已在 columns 中）"""
+        text = self.columns.search_text[position]
+        if text is None:
+            return
+        for bigram in iter_bigrams(text):
+            postings = self.text.get(bigram)
+            if postings is None:
+                postings = self.text[bigram] = array('l')
+            postings.append(position)
+        for bigram in iter_bigrams(text[:self.columns.title_lengths[position]]):
+            postings = self.title.get(bigram)
+            if postings is None:
+                postings = self.title[bigram] = array('l')
+            postings.append(position)
+
+    def _postings(self, term, field):
+        index = self.title if field == 'title' else self.text
+        return [index.get(bigram, ()) for bigram in iter_bigrams(term)]
+
+    def estimate(self, term, field='text'):
+        """候選文章數的上限；term 少於兩個字時無法使用索引，回傳 None"""
+        if len(term) < 2:
+            return None
+        return min(len(postings) for postings in self._postings(term, field))
+
+    def candidates(self, term, field='text'):
+        """可能包含 term 的文章位置集合（尚未確認），term 少於兩個字時回傳 None"""
+        if len(term) < 2:
+            return None
+        postings = sorted(self._postings(term, field), key=len)
+        result = set(postings[0])
+        for other in postings[1:]:
+            if not result:
+                break
+            result.intersection_update(other)
+        return result
+
+class BigramIndexes(BoardIndexes):
+    """所有版位的二元字倒排索引，依附在 TextColumns 上建立"""
+
+    def __init__(self, board_data, text_columns):
+        super().__init__(board_data)
+        self.text_columns = text_columns
+
+    def board(self, board_name):
+        index = self._boards.get(board_name)
+        if index is None:
+            index = self._boards[board_name] = BoardBigramIndex(self.text_columns.board(board_name))
+        return index
+
+    def add_post(self, board_name, position):
+        """新文章加入 TextColumns 後，更新已建立的索引"""
+        index = self._boards.get(board_name)
+        if index is not None:
+            index.add(position)
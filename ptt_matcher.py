@@ -0,0 +1,74 @@
+"""
+Aho–Corasick 多關鍵字比對
+建立一次自動機後，每篇文章只需掃描一次即可找出所有出現的關鍵字
+"""
+from collections import deque
+
+class AhoCorasick:
+    """Aho–Corasick 自動機
+
+    patterns 中的每個關鍵字以其索引作為 id；重複的關鍵字共用同一個狀態。
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._pattern_count = sum(1 for pattern in self.patterns if pattern)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        # 建立 trie
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (pattern_id,)
+
+        # 以廣度優先建立失敗連結，並合併失敗狀態的輸出
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail if fail != next_state else 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """逐一產生 (結束位置, 關鍵字 id)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                yield position, pattern_id
+
+    def find_ids(self, text):
+        """回傳文字中出現過的關鍵字 id 集合，所有關鍵字都找到時提前結束"""
+        goto, fail, output = self._goto, self._fail, self._output
+        total = self._pattern_count
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+                if len(found) >= total:
+                    break
+        return found
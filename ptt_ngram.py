@@ -0,0 +1,108 @@
+"""
+串流式中文詞組頻率統計
+逐篇讀取文章的標題、內文與留言，以 Space-Saving 演算法在固定記憶體內維持前 K 名
+"""
+import heapq
+import re
+from operator import itemgetter
+
+PHRASE_PATTERN = re.compile(r'[\u4e00-\u9fff]{2,4}')  # 與原本的詞組規則相同（不重疊）
+HAN_RUN_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+DEFAULT_CAPACITY = 50000  # 每個計數器最多追蹤的詞組數
+
+class SpaceSavingCounter:
+    """Space-Saving 頻率計數器
+
+    最多追蹤 capacity 個項目；滿了之後新項目會取代目前次數最少的項目，
+    並繼承其次數（記錄在 errors 中作為誤差上限）。未滿時結果與 Counter 完全相同。
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # 每個追蹤中的項目在 heap 中只有一筆，次數只增不減，因此 heap 中的值是實際次數的下限
+        self._heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, item, count=1):
+        """增加單一項目的次數"""
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            heapq.heappush(self._heap, (count, item))
+            return
+
+        # 找出真正次數最少的項目：過期的 heap 值先更新再重新比較
+        heap = self._heap
+        while True:
+            low, victim = heap[0]
+            actual = counts[victim]
+            if low == actual:
+                break
+            heapq.heapreplace(heap, (actual, victim))
+        del counts[victim]
+        self.errors.pop(victim, None)
+        counts[item] = actual + count
+        self.errors[item] = actual
+        heapq.heapreplace(heap, (actual + count, item))
+
+    def update(self, items):
+        """逐一加入多個項目"""
+        counts = self.counts
+        for item in items:
+            if item in counts:
+                counts[item] += 1
+            else:
+                self.add(item)
+
+    def most_common(self, n=None):
+        """依次數由多到少回傳 (項目, 次數)，同次數時保留先出現的順序"""
+        if n is None:
+            return sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
+
+def iter_post_texts(posts):
+    """逐一產生文章的標題、內文與留言內容"""
+    for post in posts:
+        title = post.get('title', '')
+        if isinstance(title, str):
+            yield title
+        comments_data = post.get('comments_data')
+        if not comments_data:
+            continue
+        content = comments_data.get('content')
+        if isinstance(content, str):
+            yield content
+        for comment in comments_data.get('comments') or ():
+            text = comment.get('content')
+            if isinstance(text, str):
+                yield text
+
+def count_phrases(texts, stop_words=(), capacity=DEFAULT_CAPACITY):
+    """以原本的規則（2-4 個中文字、不重疊）統計詞組"""
+    counter = SpaceSavingCounter(capacity)
+    findall = PHRASE_PATTERN.findall
+    for text in texts:
+        counter.update(word for word in findall(text) if word not in stop_words)
+    return counter
+
+def iter_ngrams(text, size):
+    """逐一產生文字中連續中文字的重疊 n-gram"""
+    for match in HAN_RUN_PATTERN.finditer(text):
+        run = match.group()
+        for i in range(len(run) - size + 1):
+            yield run[i:i + size]
+
+def count_ngrams(texts, sizes=(2, 3, 4), stop_words=(), capacity=DEFAULT_CAPACITY):
+    """分別統計各長度的重疊 n-gram，回傳 {長度: SpaceSavingCounter}"""
+    counters = {size: SpaceSavingCounter(capacity) for size in sizes}
+    for text in texts:
+        for size, counter in counters.items():
+            counter.update(gram for gram in iter_ngrams(text, size) if gram not in stop_words)
+    return counters
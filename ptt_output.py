@@ -0,0 +1,110 @@
+"""
+查詢結果的串流輸出
+結果由產生器逐筆產生時直接寫入 CSV、JSON Lines 或 JSON 檔案，終端機只顯示有限筆數（可分頁），
+不需要先把所有結果收集成列表，大量結果的記憶體用量維持固定
+"""
+import csv
+import json
+import os
+
+DEFAULT_PRINT_LIMIT = 20  # 終端機預設最多顯示的筆數
+OUTPUT_FORMATS = ('csv', 'jsonl', 'json')
+
+def output_format(path):
+    """依副檔名判斷輸出格式，.jsonl 為 JSON Lines，.json 為 JSON 陣列，其餘為 CSV"""
+    return {'.jsonl': 'jsonl', '.json': 'json'}.get(os.path.splitext(path)[1].lower(), 'csv')
+
+class ResultWriter:
+    """將結果逐筆寫入 CSV、JSON Lines 或 JSON 檔案
+
+    CSV 只輸出 fieldnames 中的欄位；JSON Lines 每行寫入完整的一筆結果；
+    JSON 同樣逐筆寫入完整的結果，關閉檔案時補上結尾，整個檔案是一個陣列。
+    lazy 為 True 時寫入第一筆結果才建立檔案，沒有結果時不留下空檔案。
+    可作為 context manager 使用，離開時關閉檔案。
+    """
+
+    def __init__(self, path, fieldnames, format=None, lazy=False):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.format = format or output_format(path)
+        if self.format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支援的輸出格式：{self.format}（可用：{', '.join(OUTPUT_FORMATS)}）")
+        self.count = 0
+        self._file = None
+        self._writer = None
+        if not lazy:
+            self._open()
+
+    def _open(self):
+        if self.format == 'csv':
+            self._file = open(self.path, 'w', encoding='utf-8-sig', newline='')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+            self._writer.writeheader()
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            if self.format == 'json':
+                self._file.write('[')
+
+    def write(self, row):
+        if self._file is None:
+            self._open()
+        if self._writer is not None:
+            self._writer.writerow(row)
+        elif self.format == 'json':
+            self._file.write((',\n' if self.count else '\n') + json.dumps(row, ensure_ascii=False))
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.count += 1
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            if self.format == 'json':
+                self._file.write('\n]\n' if self.count else ']\n')
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ConsolePager:
+    """在終端機顯示結果，最多顯示 limit 筆；page_size 有設定時每頁暫停詢問是否繼續
+
+    超過上限或使用者停止後，其餘結果只計數不顯示。
+    """
+
+    def __init__(self, print_row, limit=DEFAULT_PRINT_LIMIT, page_size=None, input_func=input):
+        self.print_row = print_row
+        self.limit = limit
+        self.page_size = page_size
+        self.input_func = input_func
+        self.shown = 0
+        self.stopped = False
+
+    def show(self, row):
+        if self.stopped or (self.limit is not None and self.shown >= self.limit):
+            return
+        if self.page_size and self.shown and self.shown % self.page_size == 0:
+            if self.input_func("按 Enter 顯示下一頁，輸入 q 停止顯示：").strip().lower() == 'q':
+                self.stopped = True
+                return
+        self.print_row(row)
+        self.shown += 1
+
+def stream_results(rows, writer=None, pager=None, collect=None):
+    """逐筆處理結果：寫入檔案、在終端機顯示，並視需要收集到 collect 列表
+
+    Returns:
+        int: 結果筆數
+    """
+    count = 0
+    for row in rows:
+        if writer is not None:
+            writer.write(row)
+        if pager is not None:
+            pager.show(row)
+        if collect is not None:
+            collect.append(row)
+        count += 1
+    return count
@@ -0,0 +1,460 @@
+"""
+布林查詢語言
+將查詢字串編譯成語法樹，在每個版位上以索引查詢求值：
+
+    台積電 法說會                      兩個詞都要出現（標題或內文，AND 可省略）
+    台積電 OR 聯發科                   任一詞出現
+    NOT 廣告 / -廣告                   排除
+    "護國 神山"                        以引號表示包含空白的片語
+    title:台積電 content:財報 comment:噓爆
+    boo:爛 push:神 neutral:笑死        只比對指定標籤（噓/推/→）的留言
+    board:Stock                        限定版位
+    date:2024-01-01..2024-03-31        日期區間（也可用 date:>=2024-01-01、date:2024-01-05）
+    hits:>1000 total_comments:100..500 數值範圍（>、>=、<、<=、a..b、a..、..b 或單一值）
+    (台積電 OR 聯發科) AND -board:Gossiping
+
+AND 的子條件依估計的候選篇數由少到多求值，前面的結果為空時不再計算後面的條件；
+估計時先算成本低的條件（版位、日期與數值），任一估計為 0 就不再估計需要建立文字索引的條件。
+board: 條件在求值前就先排除不可能符合的版位，這些版位不會被載入，也不會建立任何索引。
+文字條件以二元字倒排索引取得候選文章，留言條件使用留言索引，日期以 DateIndex、數值以排行榜的預先計算值篩選。
+"""
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+
+from ptt_comment_index import TAG_ALIASES, parse_tags
+from ptt_index import post_epoch_day, to_epoch_day
+from ptt_ranking import METRICS
+
+TEXT_FIELDS = ('text', 'title', 'content', 'comment')
+RANGE_FIELDS = ('date',) + tuple(METRICS)
+COMMENT_TAG_FIELDS = ('push', 'boo', 'neutral')
+FIELDS = TEXT_FIELDS[1:] + COMMENT_TAG_FIELDS + ('board',) + RANGE_FIELDS
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|(-?(?:[A-Za-z_]+:)?"[^"]*")|([^\s()]+))')
+_RANGE = re.compile(r'^(>=|<=|>|<)?(.*?)(?:\.\.(.*))?$')
+
+class BoardQueryContext:
+    """單一版位的求值環境，提供查詢需要的欄位與索引"""
+
+    def __init__(self, analyzer, board_name):
+        self.analyzer = analyzer
+        self.board_name = board_name
+        self.posts = analyzer.board_data[board_name]
+        self.size = len(self.posts)
+        self._columns = None
+        self._bigrams = None
+        self._comments = None
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = self.analyzer.text_columns.board(self.board_name)
+        return self._columns
+
+    @property
+    def bigrams(self):
+        if self._bigrams is None:
+            self._bigrams = self.analyzer.bigram_index.board(self.board_name)
+        return self._bigrams
+
+    @property
+    def comments(self):
+        if self._comments is None:
+            self._comments = self.analyzer.comment_index.board(self.board_name)
+        return self._comments
+
+    def field_text(self, field, position):
+        """取得文章指定欄位（標題、內文或兩者）的小寫文字"""
+        columns = self.columns
+        text = columns.search_text[position]
+        if text is None:
+            return ''
+        if field == 'title':
+            return text[:columns.title_lengths[position]]
+        if field == 'content':
+            return text[columns.title_lengths[position] + 1:]
+        return text
+
+    def metric_values(self, metric):
+        return self.analyzer.rankings.board(self.board_name, metric)
+
+class Node(ABC):
+    """查詢語法樹的節點"""
+    cost = 2  # 估計的成本：0 不需要索引，1 使用日期索引或排行榜，2 需要建立文字或留言索引
+
+    def boards(self, names):
+        """可能有符合文章的版位集合，None 表示不限版位；不需要載入任何版位資料"""
+        return None
+
+    def estimate(self, ctx):
+        """估計符合的文章數，用來決定 AND 子條件的求值順序"""
+        return ctx.size
+
+    @abstractmethod
+    def evaluate(self, ctx, candidates=None):
+        """回傳符合的文章位置集合；candidates 不為 None 時只需檢查其中的文章"""
+
+class Term(Node):
+    """文字條件：field 為 text（標題或內文）、title、content 或 comment
+
+    comment 條件可以 tags（標籤代碼集合）限定只比對推、噓或 → 的留言
+    """
+
+    def __init__(self, field, value, tags=None):
+        self.field = field
+        self.value = value.lower()
+        self.tags = tags
+
+    def __repr__(self):
+        return f"{self.field}:{self.value!r}" + (f"{sorted(self.tags)}" if self.tags else '')
+
+    def _index_field(self):
+        return 'title' if self.field == 'title' else 'text'
+
+    def estimate(self, ctx):
+        if self.field == 'comment':
+            return min(ctx.size, ctx.comments.estimate(self.value))
+        estimate = ctx.bigrams.estimate(self.value, self._index_field())
+        return ctx.size if estimate is None else estimate
+
+    def evaluate(self, ctx, candidates=None):
+        if self.field == 'comment':
+            # 留言索引回傳的文章已確認包含字串，不需要再比對
+            return ctx.comments.post_positions(self.value, self.tags, candidates)
+        if candidates is None or len(candidates) > self.estimate(ctx):
+            indexed = ctx.bigrams.candidates(self.value, self._index_field())
+            if indexed is not None:
+                candidates = indexed if candidates is None else indexed & candidates
+        if candidates is None:
+            candidates = range(ctx.size)
+        value, field = self.value, self.field
+        return {position for position in candidates if value in ctx.field_text(field, position)}
+
+class BoardTerm(Node):
+    """版位條件：不符合的版位直接得到空集合"""
+
+    def __init__(self, value):
+        self.value = value.lower()
+
+    cost = 0
+
+    def __repr__(self):
+        return f"board:{self.value!r}"
+
+    def boards(self, names):
+        return {name for name in names if name.lower() == self.value}
+
+    def _matches(self, ctx):
+        return ctx.board_name.lower() == self.value
+
+    def estimate(self, ctx):
+        return ctx.size if self._matches(ctx) else 0
+
+    def evaluate(self, ctx, candidates=None):
+        if not self._matches(ctx):
+            return set()
+        return set(range(ctx.size)) if candidates is None else set(candidates)
+
+class Range(Node):
+    """日期或數值範圍條件，low、high 為包含端點的上下限（None 表示不限）"""
+    cost = 1
+
+    def __init__(self, field, low, high):
+        self.field = field
+        self.low = low
+        self.high = high
+
+    def __repr__(self):
+        return f"{self.field}:{self.low}..{self.high}"
+
+    def _bounds(self):
+        return (float('-inf') if self.low is None else self.low,
+                float('inf') if self.high is None else self.high)
+
+    def _indexed(self, ctx):
+        """以排序好的索引取得符合的文章位置（依日期或數值排序）"""
+        low, high = self._bounds()
+        if self.field == 'date':
+            index = ctx.analyzer.date_index.board(ctx.board_name)
+            return index.positions[bisect_left(index.days, low):bisect_right(index.days, high)]
+        # 排行榜依 (-值, 位置) 排序
+        entries = ctx.metric_values(self.field).entries
+        lo = bisect_left(entries, (-high, -1))
+        hi = bisect_right(entries, (-low, float('inf')))
+        return [position for _, position in entries[lo:hi]]
+
+    def _contains(self, ctx, position):
+        low, high = self._bounds()
+        if self.field == 'date':
+            value = post_epoch_day(ctx.posts[position])
+        else:
+            value = ctx.metric_values(self.field).values[position]
+        return value is not None and low <= value <= high
+
+    def estimate(self, ctx):
+        low, high = self._bounds()
+        if self.field == 'date':
+            days = ctx.analyzer.date_index.board(ctx.board_name).days
+            return bisect_right(days, high) - bisect_left(days, low)
+        entries = ctx.metric_values(self.field).entries
+        return bisect_right(entries, (-low, float('inf'))) - bisect_left(entries, (-high, -1))
+
+    def evaluate(self, ctx, candidates=None):
+        if candidates is not None and len(candidates) < self.estimate(ctx):
+            return {position for position in candidates if self._contains(ctx, position)}
+        result = set(self._indexed(ctx))
+        return result if candidates is None else result & candidates
+
+class Not(Node):
+    def __init__(self, child):
+        self.child = child
+        self.cost = child.cost
+
+    def __repr__(self):
+        return f"NOT {self.child!r}"
+
+    def boards(self, names):
+        if isinstance(self.child, BoardTerm):
+            return set(names) - self.child.boards(names)
+        return None
+
+    def evaluate(self, ctx, candidates=None):
+        if candidates is None:
+            candidates = set(range(ctx.size))
+        return set(candidates) - self.child.evaluate(ctx, candidates)
+
+class And(Node):
+    def __init__(self, children):
+        self.children = children
+        self.cost = max(child.cost for child in children)
+
+    def __repr__(self):
+        return f"({' AND '.join(map(repr, self.children))})"
+
+    def boards(self, names):
+        allowed = None
+        for child in self.children:
+            child_boards = child.boards(names)
+            if child_boards is not None:
+                allowed = child_boards if allowed is None else allowed & child_boards
+        return allowed
+
+    def _estimates(self, ctx):
+        """依成本由低到高估計子條件，遇到估計為 0 的子條件時停止並回傳 None"""
+        estimates = []
+        for child in sorted(self.children, key=lambda child: child.cost):
+            estimate = child.estimate(ctx)
+            if estimate == 0:
+                return None
+            estimates.append((child, estimate))
+        return estimates
+
+    def estimate(self, ctx):
+        estimates = self._estimates(ctx)
+        return 0 if estimates is None else min(estimate for _, estimate in estimates)
+
+    def plan(self, ctx):
+        """子條件的求值順序：NOT 只能從候選中剔除，排在最後；其餘依估計篇數由少到多
+
+        有子條件的估計為 0 時整個 AND 不會有結果，回傳空列表
+        """
+        estimates = self._estimates(ctx)
+        if estimates is None:
+            return []
+        return [child for child, _ in sorted(estimates, key=lambda pair: (isinstance(pair[0], Not), pair[1]))]
+
+    def evaluate(self, ctx, candidates=None):
+        plan = self.plan(ctx)
+        if not plan:
+            return set()
+        for child in plan:
+            candidates = child.evaluate(ctx, candidates)
+            if not candidates:
+                return set()
+        return candidates
+
+class Or(Node):
+    def __init__(self, children):
+        self.children = children
+        self.cost = max(child.cost for child in children)
+
+    def __repr__(self):
+        return f"({' OR '.join(map(repr, self.children))})"
+
+    def boards(self, names):
+        allowed = set()
+        for child in self.children:
+            child_boards = child.boards(names)
+            if child_boards is None:
+                return None
+            allowed |= child_boards
+        return allowed
+
+    def estimate(self, ctx):
+        return min(ctx.size, sum(child.estimate(ctx) for child in self.children))
+
+    def evaluate(self, ctx, candidates=None):
+        result = set()
+        remaining = candidates
+        for child in self.children:
+            result |= child.evaluate(ctx, remaining)
+            if candidates is not None:
+                # 已符合的文章不需要再由其他子條件檢查
+                remaining = candidates - result
+                if not remaining:
+                    break
+            elif len(result) == ctx.size:
+                break
+        return result
+
+def _parse_value(field, text):
+    if field == 'date':
+        try:
+            return to_epoch_day(text)
+        except ValueError:
+            raise ValueError(f"日期格式錯誤：{text}（應為 YYYY-MM-DD）")
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"{field} 的數值格式錯誤：{text}")
+
+def parse_range(field, text):
+    """解析範圍條件：>a、>=a、<a、<=a、a..b、a..、..b 或單一值"""
+    match = _RANGE.match(text)
+    if not match or not (match.group(2) or match.group(3)):
+        raise ValueError(f"範圍條件格式錯誤：{field}:{text}")
+    operator, first, second = match.groups()
+    if second is not None:
+        if operator:
+            raise ValueError(f"範圍條件格式錯誤：{field}:{text}")
+        low = _parse_value(field, first) if first else None
+        high = _parse_value(field, second) if second else None
+        return Range(field, low, high)
+    value = _parse_value(field, first)
+    # 日期以天為單位，數值皆為整數或比值；開區間以最小的間隔換算成閉區間
+    step = 1 if field == 'date' else 1e-9
+    if operator == '>':
+        return Range(field, value + step, None)
+    if operator == '>=':
+        return Range(field, value, None)
+    if operator == '<':
+        return Range(field, None, value - step)
+    if operator == '<=':
+        return Range(field, None, value)
+    return Range(field, value, value)
+
+def tokenize(query):
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if not match:
+            raise ValueError(f"無法解析的查詢：{query[position:]}")
+        tokens.append(match.group(match.lastindex))
+        position = match.end()
+    return tokens
+
+def _make_term(token):
+    negate = False
+    if token.startswith('-') and len(token) > 1:
+        negate, token = True, token[1:]
+    field, value = 'text', token
+    prefix, separator, rest = token.partition(':')
+    if separator and prefix.lower() in FIELDS:
+        field, value = prefix.lower(), rest
+    if value.startswith('"') and value.endswith('"') and len(value) >= 2:
+        value = value[1:-1]
+    if not value:
+        raise ValueError(f"查詢條件缺少內容：{token}")
+
+    if field == 'board':
+        node = BoardTerm(value)
+    elif field in COMMENT_TAG_FIELDS:
+        node = Term('comment', value, parse_tags(TAG_ALIASES[field]))
+    elif field in RANGE_FIELDS:
+        node = parse_range(field, value)
+    else:
+        node = Term(field, value)
+    return Not(node) if negate else node
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        self.index += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"查詢語法錯誤：多餘的 {self.peek()}")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.next()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() not in (None, 'OR', ')'):
+            if self.peek() == 'AND':
+                self.next()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not(self):
+        if self.peek() == 'NOT':
+            self.next()
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        token = self.next()
+        if token is None:
+            raise ValueError("查詢語法錯誤：條件不完整")
+        if token == '(':
+            node = self.parse_or()
+            if self.next() != ')':
+                raise ValueError("查詢語法錯誤：缺少右括號")
+            return node
+        if token in (')', 'AND', 'OR'):
+            raise ValueError(f"查詢語法錯誤：不應出現 {token}")
+        return _make_term(token)
+
+def parse_query(query):
+    """將查詢字串編譯成語法樹，語法錯誤時拋出 ValueError"""
+    tokens = tokenize(query)
+    if not tokens:
+        raise ValueError("查詢不可為空白")
+    return _Parser(tokens).parse()
+
+def evaluate_query(analyzer, node, boards=None):
+    """在各版位上求值，逐一產生 (版位, 文章位置)，版位內依文章順序排列
+
+    查詢的 board: 條件排除的版位不會被載入；不限版位時一次載入所有版位
+    """
+    names = list(boards) if boards is not None else list(analyzer.board_data)
+    allowed = node.boards(names)
+    if allowed is not None:
+        names = [name for name in names if name in allowed]
+        if hasattr(analyzer.board_data, 'preload'):
+            analyzer.board_data.preload(names)
+    elif boards is None:
+        names = analyzer.board_names()
+    for board_name in names:
+        ctx = BoardQueryContext(analyzer, board_name)
+        if ctx.size == 0 or node.estimate(ctx) == 0:
+            continue
+        for position in sorted(node.evaluate(ctx)):
+            yield board_name, position
@@ -0,0 +1,167 @@
+"""
+文章排行榜
+載入時為每個版位、每個排序指標建立排序好的排行榜，查詢前 N 名時不需要重新排序整個資料集
+"""
+import heapq
+from bisect import insort
+from itertools import islice
+
+from ptt_index import DateIndex, to_epoch_day
+
+def _comments_field(field):
+    def value(post):
+        comments_data = post.get('comments_data')
+        if not comments_data or field not in comments_data:
+            return None
+        return int(comments_data[field]) if comments_data[field] is not None else 0
+    return value
+
+def _hits(post):
+    if 'hits' not in post:
+        return None
+    return int(post['hits']) if post['hits'] is not None else 0
+
+def _push_boo_ratio(post):
+    """推噓比：推文數 / 噓文數（噓文數為 0 時以 1 計算）"""
+    like_count = _comments_field('like_count')(post)
+    dislike_count = _comments_field('dislike_count')(post)
+    if like_count is None or dislike_count is None:
+        return None
+    return like_count / max(dislike_count, 1)
+
+# 可用的排序指標，回傳 None 表示該文章不列入排行
+METRICS = {
+    'total_comments': _comments_field('total_comments'),
+    'like_count': _comments_field('like_count'),
+    'dislike_count': _comments_field('dislike_count'),
+    'hits': _hits,
+    'push_boo_ratio': _push_boo_ratio,
+}
+
+WINDOW_SELECT_RATIO = 4  # 日期區間內的文章少於排行榜的 1/4 時，直接在區間內做 heap 選擇
+
+class BoardLeaderboard:
+    """單一版位、單一指標的排行榜
+
+    entries 為依 (-值, 文章位置) 排序的串列，同值時保留原始文章順序；
+    values 記錄每篇文章的指標值，不列入排行的文章為 None。
+    """
+    __slots__ = ('metric', 'entries', 'values')
+
+    def __init__(self, posts, metric):
+        self.metric = metric
+        self.values = []
+        for post in posts:
+            self.values.append(self._value(post))
+        self.entries = sorted((-value, i) for i, value in enumerate(self.values) if value is not None)
+
+    def _value(self, post):
+        try:
+            return METRICS[self.metric](post)
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, position, post):
+        """加入新文章，以二分搜尋插入排行榜"""
+        while len(self.values) < position:
+            self.values.append(None)
+        value = self._value(post)
+        self.values.append(value)
+        if value is not None:
+            insort(self.entries, (-value, position))
+
+    def top(self, n, positions=None, skip=None):
+        """回傳前 n 名的 (-值, 文章位置)
+
+        positions 為日期區間內的文章位置（已排序），skip 為要略過的文章位置集合
+        """
+        skip = skip or ()
+        if positions is None:
+            if not skip:
+                return self.entries[:n]
+            return list(islice((entry for entry in self.entries if entry[1] not in skip), n))
+        if len(positions) * WINDOW_SELECT_RATIO < len(self.entries):
+            values = self.values
+            return heapq.nsmallest(n, ((-values[i], i) for i in positions
+                                       if values[i] is not None and i not in skip))
+        window = set(positions).difference(skip)
+        return list(islice((entry for entry in self.entries if entry[1] in window), n))
+
+class Rankings:
+    """所有版位的排行榜，每個 (版位, 指標) 在第一次查詢時建立並持續增量更新"""
+
+    def __init__(self, board_data, date_index=None):
+        self.board_data = board_data
+        self.date_index = date_index if date_index is not None else DateIndex(board_data)
+        self._boards = {}
+
+    def board(self, board_name, metric):
+        """取得特定版位與指標的排行榜"""
+        if metric not in METRICS:
+            raise ValueError(f"不支援的排序指標：{metric}（可用：{', '.join(METRICS)}）")
+        key = (board_name, metric)
+        leaderboard = self._boards.get(key)
+        if leaderboard is None:
+            leaderboard = self._boards[key] = BoardLeaderboard(self.board_data[board_name], metric)
+        return leaderboard
+
+    def build(self, metrics=('total_comments',)):
+        """預先建立所有版位指定指標的排行榜"""
+        for board_name in self.board_data:
+            for metric in metrics:
+                self.board(board_name, metric)
+        return self
+
+    def add_post(self, board_name, position):
+        """新文章加入版位資料後，更新已建立的排行榜"""
+        post = self.board_data[board_name][position]
+        for (board, _), leaderboard in self._boards.items():
+            if board == board_name:
+                leaderboard.add(position, post)
+
+    def invalidate(self, board_name=None):
+        """版位資料變動時丟棄舊排行榜"""
+        for key in list(self._boards):
+            if board_name is None or key[0] == board_name:
+                del self._boards[key]
+
+    def top(self, metric='total_comments', top_n=20, boards=None, start_time=None, end_time=None, skip=None):
+        """找出指定版位與日期區間內某指標最高的前 N 篇文章
+
+        Args:
+            metric: 排序指標，見 METRICS
+            top_n: 回傳篇數
+            boards: 限定的版位列表，預設為所有版位
+            start_time, end_time: 日期區間（YYYY-MM-DD），皆未提供時不限日期
+            skip: {版位: 要略過的文章位置集合}，例如重複文章
+        """
+        if boards is None:
+            boards = list(self.board_data)
+        windowed = start_time is not None or end_time is not None
+        if windowed:
+            start_day = to_epoch_day(start_time) if start_time else float('-inf')
+            end_day = to_epoch_day(end_time) if end_time else float('inf')
+
+        # 各版位取出前 N 名後合併，同值時依版位順序與文章順序排列
+        candidates = []
+        for rank, board_name in enumerate(boards):
+            positions = None
+            if windowed:
+                positions = self.date_index.board(board_name).positions_between(start_day, end_day)
+            entries = self.board(board_name, metric).top(top_n, positions, skip.get(board_name) if skip else None)
+            candidates.append([(key, rank, position, board_name) for key, position in entries])
+
+        results = []
+        for key, _, position, board_name in islice(heapq.merge(*candidates), top_n):
+            post = self.board_data[board_name][position]
+            results.append({
+                'board': board_name,
+                'title': post.get('title', ''),
+                'url': post.get('url', ''),
+                metric: -key,
+                'date': post.get('acceptedDate', '').split('T')[0]
+            })
+        return results
@@ -0,0 +1,144 @@
+"""
+精簡的文章資料結構
+將 json 解析出的文章 dict 轉換為以 __slots__ 儲存的紀錄：重複的字串（標籤、留言內容等）只保留一份，
+數字欄位轉為 int。紀錄實作唯讀的 Mapping 介面，既有以 post.get(...) / post['...'] 存取的程式不需修改。
+"""
+import sys
+from collections.abc import Mapping
+
+class _Missing:
+    """不存在的欄位；以模組屬性的名稱 pickle，紀錄經過 pickle（子行程、快照）後仍是同一個物件"""
+    __slots__ = ()
+
+    def __reduce__(self):
+        return '_MISSING'
+
+    def __repr__(self):
+        return '<missing>'
+
+_MISSING = _Missing()
+
+COMPACT_SNAPSHOT = 'compact'  # 精簡紀錄快照的形式名稱（見 ptt_snapshot）
+POOL_MAX_LENGTH = 64  # 只共用短字串；長的留言幾乎不會重複，放進字串池反而多佔記憶體
+
+class StringPool:
+    """字串池：相同內容的短字串共用同一個物件"""
+
+    def __init__(self, max_length=POOL_MAX_LENGTH):
+        self.max_length = max_length
+        self._strings = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def intern(self, value):
+        if not isinstance(value, str) or len(value) > self.max_length:
+            return value
+        return self._strings.setdefault(value, value)
+
+def _to_int(value):
+    if isinstance(value, int) or value is None:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+class _SlotRecord(Mapping):
+    """以 __slots__ 儲存欄位的唯讀 Mapping，不存在的欄位以 _MISSING 表示"""
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (key for key in self.FIELDS if getattr(self, key) is not _MISSING)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and getattr(self, key) is not _MISSING
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        return default
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+class Comment(_SlotRecord):
+    """單則留言"""
+    __slots__ = FIELDS = ('tag', 'content')
+
+    def __init__(self, data, pool):
+        self.tag = sys.intern(data['tag']) if isinstance(data.get('tag'), str) else data.get('tag', _MISSING)
+        self.content = pool.intern(data.get('content', _MISSING))
+
+class CommentsData(_SlotRecord):
+    """文章的留言統計、內文與留言列表"""
+    __slots__ = FIELDS = ('total_comments', 'like_count', 'dislike_count', 'neutral_count', 'content', 'comments')
+    COUNT_FIELDS = ('total_comments', 'like_count', 'dislike_count', 'neutral_count')
+
+    def __init__(self, data, pool):
+        for field in self.COUNT_FIELDS:
+            setattr(self, field, _to_int(data.get(field, _MISSING)) if field in data else _MISSING)
+        self.content = data.get('content', _MISSING)
+        if 'comments' in data:
+            comments = data['comments']
+            # 無法辨識的留言項目（非 dict）原樣保留
+            self.comments = (tuple(Comment(c, pool) if isinstance(c, dict) else c for c in comments)
+                             if isinstance(comments, list) else comments)
+        else:
+            self.comments = _MISSING
+
+class PostRecord(_SlotRecord):
+    """單篇文章；不在 FIELDS 中的欄位存放在 extra"""
+    __slots__ = ('_id', 'id', 'title', 'url', 'hits', 'acceptedDate', 'timestamp', 'number', 'comments_data', 'extra')
+    FIELDS = __slots__[:-1]
+    INT_FIELDS = ('hits', 'number')
+
+    def __init__(self, data, pool):
+        for field in self.FIELDS:
+            value = data.get(field, _MISSING)
+            if field in self.INT_FIELDS and value is not _MISSING:
+                value = _to_int(value)
+            setattr(self, field, value)
+        if isinstance(self.comments_data, dict):
+            self.comments_data = CommentsData(self.comments_data, pool)
+        extra = {sys.intern(key): pool.intern(value) for key, value in data.items() if key not in self.FIELDS}
+        self.extra = extra or None
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        yield from super().__iter__()
+        if self.extra:
+            yield from self.extra
+
+    def __contains__(self, key):
+        return super().__contains__(key) or (self.extra is not None and key in self.extra)
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is _MISSING:
+            return self.extra.get(key, default) if self.extra else default
+        return value
+
+def compact_posts(posts, pool=None):
+    """將文章 dict 列表轉換為 PostRecord 列表；無法轉換的項目（非 dict）原樣保留"""
+    if pool is None:
+        pool = StringPool()
+    return [PostRecord(post, pool) if isinstance(post, dict) else post for post in posts]
@@ -0,0 +1,191 @@
+"""
+常駐的本機分析查詢服務
+將 AdvancedAnalysis 的資料與索引保留在記憶體中，以 HTTP/JSON 提供查詢
+
+使用方式：python ptt_server.py [port]
+
+可用端點（GET，參數以 query string 傳入，多個值以逗號或空白分隔）：
+    /health                                   已知的版位與載入狀態
+    /search?keywords=&start=&end=&limit=      時間區間內包含所有關鍵字的文章
+    /count?keywords=&collapse=                包含所有關鍵字的文章在各版位的篇數
+    /keywords?keywords=&match=all|any         各關鍵字在各版位的命中篇數
+    /top?metric=&top_n=&boards=&start=&end=&collapse=  指定指標最高的前 N 篇文章
+    /duplicates?limit=                        最大的幾組跨版位重複文章
+    /query?q=&limit=&collapse=                布林查詢（語法見 ptt_query）
+    /comments?keyword=&tags=&boards=&start=&end=&limit=  符合條件的留言與各版位推/噓/→ 則數
+    /common?board=&top_n=&ngram_size=&stop_words=  版位的熱門字串
+    /reload                                   重新載入有變動的版位檔案（GET 或 POST）
+
+/search、/count、/top 與 /query 的 collapse=1 表示每組重複（轉錄）文章只保留代表文章
+"""
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import parse_qs, urlparse
+
+from ptt_advanced_analysis import AdvancedAnalysis
+from ptt_analysis import LazyBoardData
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 100  # /search 預設最多回傳的文章數
+
+def _split(value):
+    return [item for item in re.split(r'[,\s]+', value) if item] if value else []
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'y')
+
+class MissingParameter(Exception):
+    """查詢缺少必要參數"""
+
+class AnalysisService:
+    """包裝 AdvancedAnalysis 的查詢邏輯；索引在第一次使用時建立，因此以鎖避免同時建立"""
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()  # 同一時間只執行一次 reload
+
+    @staticmethod
+    def _required(params, name):
+        try:
+            return params[name]
+        except KeyError:
+            raise MissingParameter(name) from None
+
+    def _boards(self, value):
+        """解析版位名稱列表，有不存在的版位時回報錯誤"""
+        boards = _split(value)
+        unknown = [board for board in boards if board not in self.analyzer.board_data]
+        if unknown:
+            raise ValueError(f"找不到版位：{', '.join(unknown)}")
+        return boards or None
+
+    def health(self, params):
+        board_data = self.analyzer.board_data
+        return {board: (board_data.is_loaded(board) if isinstance(board_data, LazyBoardData) else True)
+                for board in board_data}
+
+    def search(self, params):
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+        matches = self.analyzer.iter_search_matches(_split(self._required(params, 'keywords')),
+                                                    self._required(params, 'start'), self._required(params, 'end'),
+                                                    _flag(params.get('collapse')))
+        posts = list(islice(matches, limit + 1))
+        return {'posts': posts[:limit], 'truncated': len(posts) > limit}
+
+    def count(self, params):
+        counts = {}
+        for board, _ in self.analyzer.iter_keyword_matches(_split(self._required(params, 'keywords')),
+                                                             _flag(params.get('collapse'))):
+            counts[board] = counts.get(board, 0) + 1
+        return counts
+
+    def keywords(self, params):
+        keyword_counts, match_counts = self.analyzer.keyword_hits(_split(self._required(params, 'keywords')),
+                                                                  params.get('match', 'all'))
+        return {'keyword_counts': keyword_counts, 'match_counts': match_counts}
+
+    def top(self, params):
+        return self.analyzer.top_posts(params.get('metric', 'total_comments'), int(params.get('top_n', 20)),
+                                       self._boards(params.get('boards')), params.get('start'), params.get('end'),
+                                       _flag(params.get('collapse')))
+
+    def query(self, params):
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+        matches = self.analyzer.iter_query_matches(self._required(params, 'q'), _flag(params.get('collapse')))
+        posts = list(islice(matches, limit + 1))
+        return {'posts': posts[:limit], 'truncated': len(posts) > limit}
+
+    def comments(self, params):
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+        options = (params.get('keyword') or None, _split(params.get('tags')) or None,
+                   self._boards(params.get('boards')), params.get('start'), params.get('end'))
+        comments = list(islice(self.analyzer.iter_comment_matches(*options), limit + 1))
+        return {'tag_counts': self.analyzer.comment_tag_counts(*options),
+                'comments': comments[:limit], 'truncated': len(comments) > limit}
+
+    def duplicates(self, params):
+        return self.analyzer.duplicate_clusters(int(params.get('limit', 20)))
+
+    def common(self, params):
+        ngram_size = params.get('ngram_size')
+        stop_words = self.analyzer.stop_words | set(_split(params.get('stop_words')))
+        board = self._required(params, 'board')
+        self._boards(board)
+        return self.analyzer.common_strings(board, int(params.get('top_n', 20)), stop_words,
+                                            int(ngram_size) if ngram_size else None)
+
+    def reload(self, params):
+        # 解析變動的檔案時不持有查詢用的鎖，其他查詢照常進行；只有替換資料與更新索引時才持有
+        with self.reload_lock:
+            changes = self.analyzer.prepare_reload()
+            with self.lock:
+                return self.analyzer.apply_reload(changes)
+
+    ENDPOINTS = ('health', 'search', 'count', 'keywords', 'top', 'common', 'query', 'comments', 'duplicates', 'reload')
+
+    def handle(self, endpoint, params):
+        """執行端點，回傳 (HTTP 狀態碼, 回應內容)"""
+        if endpoint not in self.ENDPOINTS:
+            return 404, {'error': f"找不到端點：/{endpoint}"}
+        start = time.perf_counter()
+        try:
+            if endpoint == 'reload':
+                result = self.reload(params)
+            else:
+                with self.lock:
+                    result = getattr(self, endpoint)(params)
+        except MissingParameter as e:
+            return 400, {'error': f"缺少參數：{e.args[0]}"}
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        except Exception as e:  # 未預期的錯誤只影響這次查詢，服務繼續執行
+            print(f"執行 /{endpoint} 時發生錯誤：{e!r}")
+            return 500, {'error': f"內部錯誤：{e}"}
+        return 200, {'result': result, 'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)}
+
+def make_handler(service):
+    class AnalysisRequestHandler(BaseHTTPRequestHandler):
+        def _respond(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            status, payload = service.handle(url.path.strip('/'), params)
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond()
+
+        def do_POST(self):
+            self._respond()
+
+        def log_message(self, format, *args):
+            print(f"[{self.log_date_time_string()}] {format % args}")
+
+    return AnalysisRequestHandler
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, analyzer=None):
+    """啟動查詢服務，直到按下 Ctrl+C"""
+    if analyzer is None:
+        analyzer = AdvancedAnalysis(lazy=True, parallel=True)
+    server = ThreadingHTTPServer((host, port), make_handler(AnalysisService(analyzer)))
+    print(f"分析服務已啟動：http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n服務結束")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT)
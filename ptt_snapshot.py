@@ -0,0 +1,55 @@
+"""
+版位資料的二進位快照
+第一次載入 JSON 後將解析結果存成 pickle，之後來源檔案未變動時直接讀取快照。
+kind 為快照內容的形式：'raw' 為解析後的 JSON，其他（例如 'compact'）為轉換後的資料，各自保存互不影響
+"""
+import glob
+import hashlib
+import os
+import pickle
+
+SNAPSHOT_DIR = '.moptt_cache'  # 快照存放目錄
+SNAPSHOT_VERSION = 2  # 快照格式變更時遞增，讓舊快照自動失效
+
+RAW = 'raw'  # 解析後未經轉換的 JSON
+
+def _snapshot_prefix(source_path, kind=RAW):
+    """同一個來源檔案、同一種形式的所有快照共用的檔名前綴"""
+    abs_path = os.path.abspath(source_path)
+    name = os.path.splitext(os.path.basename(abs_path))[0]
+    path_hash = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(SNAPSHOT_DIR, f"{name}.{kind}.{path_hash}")
+
+def snapshot_path(source_path, kind=RAW):
+    """依來源檔案路徑、大小、修改時間與快照形式決定快照檔名"""
+    stat = os.stat(source_path)
+    key = f"{stat.st_size}:{stat.st_mtime_ns}:v{SNAPSHOT_VERSION}"
+    key_hash = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+    return f"{_snapshot_prefix(source_path, kind)}.{key_hash}.pickle"
+
+def load_snapshot(source_path, kind=RAW):
+    """讀取來源檔案對應的快照，快照不存在、已失效或無法還原時回傳 None，改由來源檔案重新載入"""
+    try:
+        path = snapshot_path(source_path, kind)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        # 損壞或由不相容版本寫入的快照可能引發任何例外（例如 AttributeError、ImportError），一律視為沒有快照
+        return None
+
+def save_snapshot(source_path, data, kind=RAW):
+    """儲存快照並移除同一來源檔案、同一種形式的舊快照"""
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        path = snapshot_path(source_path, kind)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # 以原子操作替換，避免其他行程讀到寫一半的快照
+        for old_path in glob.glob(f"{_snapshot_prefix(source_path, kind)}.*.pickle"):
+            if old_path != path:
+                os.remove(old_path)
+        return path
+    except OSError as e:
+        print(f"儲存快照時發生錯誤：{e}")
+        return None
@@ -0,0 +1,220 @@
+"""
+版位文字的後綴陣列索引
+將版位所有文章的標題、內文與留言串接後建立後綴陣列與 LCP 陣列，
+可在對數時間內查詢任意字串的出現次數與所在文章，並列舉任意長度的高頻字串
+"""
+import heapq
+import re
+from array import array
+from bisect import bisect_right
+
+import numpy as np
+
+from ptt_index import BoardIndexes
+from ptt_ngram import iter_post_texts
+
+POST_SEPARATOR = '\x00'  # 文章之間的分隔字元
+FIELD_SEPARATOR = '\n'  # 同一篇文章中標題、內文與留言之間的分隔字元
+HAN_CHAR = re.compile(r'[\u4e00-\u9fff]')
+# 新文章先暫存，暫存的文字超過已建立索引文字的這個比例（且至少 REBUILD_MIN_CHARS 字）時才重建後綴陣列
+REBUILD_RATIO = 0.1
+REBUILD_MIN_CHARS = 100000
+
+def build_suffix_array(text):
+    """以 numpy 向量化的倍增法建立後綴陣列，回傳 array('i')
+
+    字元先壓縮成連續的排名（0 到字元種類數 - 1），每一輪以 (前 k 字的排名, 後 k 字的排名)
+    合成的 int64 鍵值排序，所有後綴的排名都不同時提早結束；暫存陣列都是 numpy 陣列，
+    不會為每個字元建立 Python 整數。
+    """
+    n = len(text)
+    if n == 0:
+        return array('i')
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    rank = np.unique(codes, return_inverse=True)[1].astype(np.int64).reshape(n)
+    second = np.empty(n, dtype=np.int64)
+    k = 1
+    while True:
+        # 後 k 字的排名加一，超出字串尾端的後綴為 0；排名小於 n，鍵值不會超過 n^2
+        second[:] = 0
+        if k < n:
+            second[:n - k] = rank[k:] + 1
+        keys = rank * (n + 1) + second
+        sa = np.argsort(keys, kind='stable')
+        sorted_keys = keys[sa]
+        new_rank = np.empty(n, dtype=np.int64)
+        new_rank[sa] = np.concatenate(([0], np.cumsum(sorted_keys[1:] != sorted_keys[:-1])))
+        rank = new_rank
+        if rank[sa[-1]] == n - 1:
+            break
+        k *= 2
+    result = array('i')
+    result.frombytes(sa.astype(np.int32).tobytes())
+    return result
+
+def build_lcp_array(text, sa):
+    """Kasai 演算法：lcp[i] 為 sa[i-1] 與 sa[i] 兩個後綴的最長共同前綴長度，O(n)"""
+    n = len(text)
+    # 每個後綴在後綴陣列中的位置，以 numpy 一次寫入後存成 array('i')，不建立 n 個 Python 整數的列表
+    ranks = np.empty(n, dtype=np.int32)
+    ranks[np.frombuffer(sa, dtype=np.int32)] = np.arange(n, dtype=np.int32)
+    rank = array('i')
+    rank.frombytes(ranks.tobytes())
+    lcp = array('i', [0]) * n
+    h = 0
+    for suffix in range(n):
+        r = rank[suffix]
+        if r > 0:
+            previous = sa[r - 1]
+            while suffix + h < n and previous + h < n and text[suffix + h] == text[previous + h]:
+                h += 1
+            lcp[r] = h
+            if h > 0:
+                h -= 1
+        else:
+            h = 0
+    return lcp
+
+def post_text(post):
+    """單篇文章在串接文字中的內容：標題、內文與留言以 FIELD_SEPARATOR 分隔，以 POST_SEPARATOR 結尾"""
+    return FIELD_SEPARATOR.join(
+        text.replace(POST_SEPARATOR, ' ') for text in iter_post_texts([post])) + POST_SEPARATOR
+
+def _count_overlapping(text, pattern):
+    """字串在 text 中的出現次數（允許重疊，與後綴陣列的計數方式相同）"""
+    count = 0
+    index = text.find(pattern)
+    while index >= 0:
+        count += 1
+        index = text.find(pattern, index + 1)
+    return count
+
+class BoardSuffixArray:
+    """單一版位的後綴陣列
+
+    text 為所有文章文字的串接，每篇文章以 POST_SEPARATOR 結尾；
+    post_starts 記錄每篇文章在 text 中的起始位置，用來把出現位置對應回文章。
+    之後加入的文章先放在 pending，查詢次數時直接掃描這些文章，累積夠多時才合併並重建；
+    LCP 陣列只有列舉高頻字串時才需要，第一次使用時才建立。
+    """
+    __slots__ = ('text', 'post_starts', 'sa', '_lcp', 'pending')
+
+    def __init__(self, posts):
+        pieces = []
+        self.post_starts = array('l')
+        offset = 0
+        for post in posts:
+            self.post_starts.append(offset)
+            pieces.append(post_text(post))
+            offset += len(pieces[-1])
+        self.text = ''.join(pieces)
+        self.sa = build_suffix_array(self.text)
+        self._lcp = None
+        self.pending = []  # 尚未合併的 (文章位置, 文字)
+
+    @property
+    def lcp(self):
+        self._merge_pending()
+        if self._lcp is None:
+            self._lcp = build_lcp_array(self.text, self.sa)
+        return self._lcp
+
+    def add(self, position, post):
+        """加入新文章；暫存的文字夠多時才重建後綴陣列"""
+        self.pending.append((position, post_text(post)))
+        pending_chars = sum(len(text) for _, text in self.pending)
+        if pending_chars >= max(REBUILD_MIN_CHARS, len(self.text) * REBUILD_RATIO):
+            self._merge_pending()
+
+    def _merge_pending(self):
+        if not self.pending:
+            return
+        offset = len(self.text)
+        for _, text in self.pending:
+            self.post_starts.append(offset)
+            offset += len(text)
+        self.text += ''.join(text for _, text in self.pending)
+        self.pending = []
+        self.sa = build_suffix_array(self.text)
+        self._lcp = None
+
+    def _bounds(self, pattern):
+        """回傳以 pattern 為前綴的後綴在後綴陣列中的範圍 [lo, hi)"""
+        text, sa, m = self.text, self.sa, len(pattern)
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] < pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+        hi = len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] <= pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def count(self, pattern):
+        """字串出現的總次數"""
+        if not pattern:
+            return 0
+        lo, hi = self._bounds(pattern)
+        return hi - lo + sum(_count_overlapping(text, pattern) for _, text in self.pending)
+
+    def occurrences(self, pattern):
+        """回傳 {文章位置: 出現次數}，依文章位置排序"""
+        if not pattern:
+            return {}
+        lo, hi = self._bounds(pattern)
+        posts = {}
+        for offset in self.sa[lo:hi]:
+            position = bisect_right(self.post_starts, offset) - 1
+            posts[position] = posts.get(position, 0) + 1
+        for position, text in self.pending:
+            count = _count_overlapping(text, pattern)
+            if count:
+                posts[position] = count
+        return dict(sorted(posts.items()))
+
+    def frequent_substrings(self, min_count=10, min_length=2, max_length=10, top_n=50, han_only=True):
+        """列舉出現至少 min_count 次的字串
+
+        以 LCP 區間列舉後綴樹的內部節點，每個節點只回報其最長（不超過 max_length）的字串，
+        因此結果不會包含次數與更長字串相同的子字串。han_only 為 True 時只保留純中文字串。
+
+        Returns:
+            list: 依次數與長度排序的 (字串, 次數)
+        """
+        lcp = self.lcp  # 會先合併暫存的文章
+        text, sa = self.text, self.sa
+        n = len(sa)
+        results = []
+        stack = [(0, 0)]  # (lcp 值, 區間左端)
+        for i in range(1, n + 1):
+            current = lcp[i] if i < n else 0
+            left = i - 1
+            while current < stack[-1][0]:
+                length, left = stack.pop()
+                count = i - left
+                parent_length = max(current, stack[-1][0])
+                if count >= min_count:
+                    start = sa[left]
+                    candidate = text[start:start + min(length, max_length)]
+                    for j, char in enumerate(candidate):
+                        if char in (POST_SEPARATOR, FIELD_SEPARATOR) or (han_only and not HAN_CHAR.match(char)):
+                            candidate = candidate[:j]
+                            break
+                    # 長度不超過父節點的字串屬於父節點，由父節點回報正確的次數
+                    if len(candidate) >= min_length and len(candidate) > parent_length:
+                        results.append((count, len(candidate), candidate))
+            if current > stack[-1][0]:
+                stack.append((current, left))
+        return [(substring, count) for count, _, substring in heapq.nlargest(top_n, results)]
+
+class SuffixArrays(BoardIndexes):
+    """所有版位的後綴陣列；新文章先暫存在已建立的索引中（見 BoardSuffixArray.add），累積夠多時才重建"""
+    index_class = BoardSuffixArray
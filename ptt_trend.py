@@ -0,0 +1,176 @@
+"""
+增量式關鍵詞爆量偵測
+為每個版位保存每日 n-gram 次數，每次執行只統計新文章，再比較近期視窗與前段基準期的頻率
+
+每天、每種長度的 n-gram 各自使用一個 Space-Saving 計數器，常見的二字詞不會擠掉三、四字詞；
+比較時近期視窗取次數下限（次數 - 誤差），基準期取次數上限（沒有追蹤到的詞以該計數器的最小次數計），
+被取代的項目繼承的次數不會造成誤判的爆量。停用詞在查詢時才排除，統計狀態與停用詞無關。
+
+使用方式：python ptt_trend.py <版位名稱> [視窗天數] [基準天數]
+"""
+import os
+import pickle
+import sys
+from datetime import timedelta
+
+from ptt_index import EPOCH, post_epoch_day
+from ptt_ngram import SpaceSavingCounter, iter_ngrams, iter_post_texts
+from ptt_snapshot import SNAPSHOT_DIR
+
+TREND_SIZES = (2, 3, 4)  # 統計的 n-gram 長度
+DAY_CAPACITY = 20000  # 每日每種長度最多追蹤的詞組數
+RETENTION_DAYS = 120  # 保留的天數，更早的每日統計與文章 _id 會被移除
+STATE_VERSION = 2
+
+class TrendTracker:
+    """單一版位的每日 n-gram 統計與爆量偵測
+
+    只統計已有 comments_data 的文章（留言抓取完成後內容才完整），
+    已統計過的文章以 _id 記錄，重複執行不會重複計算；超過保留天數的文章不統計，其 _id 也會被移除。
+    stop_words 只在 detect 時排除，不影響保存的統計。
+    """
+
+    def __init__(self, board_name, stop_words=(), state_dir=SNAPSHOT_DIR):
+        self.board_name = board_name
+        self.stop_words = set(stop_words)
+        self.state_path = os.path.join(state_dir, f"trend_{board_name}.pickle")
+        self.seen_ids = {}  # {文章 _id: epoch 天數}
+        self.days = {}  # {epoch 天數: {n-gram 長度: SpaceSavingCounter}}
+        self.load()
+
+    def load(self):
+        """讀取先前保存的統計狀態"""
+        try:
+            with open(self.state_path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return
+        if state.get('version') == STATE_VERSION:
+            self.seen_ids = state['seen_ids']
+            self.days = state['days']
+
+    def save(self):
+        """保存統計狀態"""
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': STATE_VERSION, 'seen_ids': self.seen_ids, 'days': self.days},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.state_path)
+
+    def _oldest_day(self):
+        return max(self.days) - RETENTION_DAYS if self.days else None
+
+    def ingest(self, posts):
+        """統計尚未處理過的文章，回傳新統計的文章數"""
+        added = 0
+        for post in posts:
+            post_id = post.get('_id')
+            if post_id is None or post_id in self.seen_ids or not post.get('comments_data'):
+                continue
+            day = post_epoch_day(post)
+            if day is None:
+                continue
+            oldest = self._oldest_day()
+            if oldest is not None and day < oldest:
+                continue
+            counters = self.days.get(day)
+            if counters is None:
+                counters = self.days[day] = {size: SpaceSavingCounter(DAY_CAPACITY) for size in TREND_SIZES}
+            for text in iter_post_texts([post]):
+                for size in TREND_SIZES:
+                    counters[size].update(iter_ngrams(text, size))
+            self.seen_ids[post_id] = day
+            added += 1
+        self._prune()
+        return added
+
+    def _prune(self):
+        """移除超過保留天數的每日統計與文章 _id"""
+        oldest = self._oldest_day()
+        if oldest is None:
+            return
+        for day in [day for day in self.days if day < oldest]:
+            del self.days[day]
+        self.seen_ids = {post_id: day for post_id, day in self.seen_ids.items() if day >= oldest}
+
+    def _window_counts(self, first_day, last_day, lower):
+        """視窗內每個詞組的總次數
+
+        lower 為 True 時取保證的次數下限（次數 - 誤差），回傳 {詞組: 次數}。
+        否則取次數上限：已滿的計數器中沒有追蹤到的詞組，次數最多為該計數器的最小次數；
+        回傳 ({詞組: 超出最小次數的部分}, {n-gram 長度: 各日最小次數的總和})，兩者相加即為上限
+        """
+        totals = {}
+        floors = dict.fromkeys(TREND_SIZES, 0)
+        for day in range(first_day, last_day + 1):
+            for size, counter in self.days.get(day, {}).items():
+                if lower:
+                    errors = counter.errors
+                    for gram, count in counter.counts.items():
+                        totals[gram] = totals.get(gram, 0) + count - errors.get(gram, 0)
+                    continue
+                floor = min(counter.counts.values()) if len(counter) >= counter.capacity else 0
+                floors[size] += floor
+                for gram, count in counter.counts.items():
+                    totals[gram] = totals.get(gram, 0) + count - floor
+        return totals if lower else (totals, floors)
+
+    def detect(self, window_days=1, baseline_days=7, end_day=None, min_count=5, min_ratio=3.0, top_n=20):
+        """找出近期視窗內相對於基準期爆量的詞組
+
+        Args:
+            window_days: 近期視窗天數（含 end_day）
+            baseline_days: 視窗之前用來計算平均的基準天數
+            end_day: 視窗最後一天的 epoch 天數，預設為最新有資料的一天
+            min_count: 視窗內最少出現次數
+            min_ratio: 視窗日平均相對基準日平均（皆加 1 平滑）的最小倍數
+
+        Returns:
+            list: 依倍數排序的 {'phrase', 'date', 'window_count', 'baseline_avg', 'ratio'}
+        """
+        if not self.days:
+            return []
+        if end_day is None:
+            end_day = max(self.days)
+        window_start = end_day - window_days + 1
+        window = self._window_counts(window_start, end_day, lower=True)
+        baseline, floors = self._window_counts(window_start - baseline_days, window_start - 1, lower=False)
+
+        date_str = (EPOCH + timedelta(days=end_day)).strftime('%Y-%m-%d')
+        trends = []
+        for gram, count in window.items():
+            if count < min_count or gram in self.stop_words:
+                continue
+            window_avg = count / window_days
+            baseline_avg = (baseline.get(gram, 0) + floors[len(gram)]) / baseline_days
+            ratio = (window_avg + 1) / (baseline_avg + 1)
+            if ratio >= min_ratio:
+                trends.append({
+                    'phrase': gram,
+                    'date': date_str,
+                    'window_count': count,
+                    'baseline_avg': round(baseline_avg, 2),
+                    'ratio': round(ratio, 2),
+                })
+        trends.sort(key=lambda trend: (trend['ratio'], trend['window_count']), reverse=True)
+        return trends[:top_n]
+
+def main():
+    if len(sys.argv) < 2:
+        print("使用方式：python ptt_trend.py <版位名稱> [視窗天數] [基準天數]")
+        return
+    from ptt_analysis import load_json_file
+
+    board_name = sys.argv[1]
+    window_days = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    baseline_days = int(sys.argv[3]) if len(sys.argv) > 3 else 7
+    tracker = TrendTracker(board_name)
+    added = tracker.ingest(load_json_file(f"moptt_{board_name}.json"))
+    tracker.save()
+    print(f"{board_name} 版新統計 {added} 篇文章")
+    for trend in tracker.detect(window_days, baseline_days):
+        print(f"{trend['phrase']}: {trend['window_count']} 次（基準日平均 {trend['baseline_avg']}，{trend['ratio']} 倍）")
+
+if __name__ == "__main__":
+    main()
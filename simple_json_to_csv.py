@@ -5,81 +5,42 @@ import json
 import sys
 import os
 import glob
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
 from datetime import datetime
-from dateutil import parser
-import pandas as pd
+from ptt_export import SimpleCsvSink, export_board, simple_frame
+from ptt_incremental import incremental_export
 
-def clean_text(text):
-    """清理文字，移除可能造成 CSV 格式問題的字元"""
-    if not text:
-        return ''
-    # 移除換行符和多餘的空白
-    text = ' '.join(str(text).split())
-    # 移除引號，避免 CSV 格式問題
-    text = text.replace('"', '').replace("'", '')
-    # 移除逗號，因為這是 CSV 分隔符
-    text = text.replace(',', '；')
-    return text
+def convert_to_simple_csv(input_file, output_file=None, max_chars_per_cell=MAX_CHARS_PER_CELL, stream=False,
+                          incremental=False):
+    """將 JSON 資料轉換為簡單的 CSV 格式，留言整合在同一個欄位中
 
-def convert_to_simple_csv(input_file, output_file=None, max_chars_per_cell=MAX_CHARS_PER_CELL):
-    """將 JSON 資料轉換為簡單的 CSV 格式，留言整合在同一個欄位中"""
+    stream 為 True 時逐篇解析並分批寫入 CSV，記憶體用量不隨版位大小增加；
+    incremental 為 True 時依輸出檔案旁的匯出狀態只附加新文章、改寫有變動的文章（見 ptt_incremental）
+    """
     try:
-        # 讀取 JSON 檔案
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 處理資料
-        processed_data = []
-        for item in data:
-            comments_data = item.get('comments_data', {})
-            
-            # 處理時間格式
-            try:
-                dt = parser.parse(item.get('timestamp', ''))
-                time_str = dt.strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                time_str = ''
-            
-            # 處理文章內容
-            content = clean_text(item.get('content', ''))
-            
-            # 基本資料
-            row = {
-                'title': clean_text(item.get('title', '')),
-                'time': time_str,
-                'views': str(item.get('hits', 0)),
-                'total_comments': str(comments_data.get('total_comments', 0)),
-                'likes': str(comments_data.get('like_count', 0)),
-                'dislikes': str(comments_data.get('dislike_count', 0)),
-                'neutral': str(comments_data.get('neutral_count', 0)),
-                'content': content,
-            }
-            
-            # 處理留言
-            comments = comments_data.get('comments', [])
-            if comments:
-                comments_text = []
-                for comment in comments:
-                    text = clean_text(comment.get('content', ''))
-                    if text and not text.startswith('http'):  # 排除圖片連結
-                        comment_str = f"{comment.get('type', '')} {text}"
-                        comments_text.append(comment_str)
-                row['comments'] = '\n'.join(comments_text) if comments_text else ''
-            else:
-                row['comments'] = ''
-            
-            processed_data.append(row)
-        
-        # 轉換為 DataFrame
-        df = pd.DataFrame(processed_data)
-        
         # 如果沒有指定輸出檔案，使用預設名稱
         if output_file is None:
             output_file = os.path.splitext(input_file)[0] + '_simple.csv'
         
-        # 儲存為 CSV
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
-        print(f"\n成功將 {input_file} 轉換為 {output_file}")
+        if incremental:
+            incremental_export(input_file, output_file, format='simple')
+        elif stream:
+            count = export_board(input_file, [SimpleCsvSink(output_file)])
+            print(f"\n成功將 {input_file} 轉換為 {output_file}（串流模式，共 {count} 筆）")
+        else:
+            # 讀取 JSON 檔案
+            with open(input_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            # 處理資料並轉換為 DataFrame（整欄批次清理文字）
+            df = simple_frame(data)
+            
+            # 儲存為 CSV
+            df.to_csv(output_file, index=False, encoding='utf-8-sig')
+            print(f"\n成功將 {input_file} 轉換為 {output_file}")
         
         print(f"\n欄位資訊：")
         print("- title: 標題")
@@ -96,21 +57,79 @@ def convert_to_simple_csv(input_file, output_file=None, max_chars_per_cell=MAX_C
         
     except Exception as e:
         print(f"錯誤：{str(e)}")
+        # 串流模式失敗時移除寫到一半的檔案
+        if stream and not incremental and output_file and os.path.exists(output_file):
+            os.remove(output_file)
         return False
 
-def convert_all_json_files(max_chars_per_cell=MAX_CHARS_PER_CELL):
-    """轉換目錄下所有的 JSON 檔案為 CSV 格式"""
+def _convert_file(json_file, max_chars_per_cell, stream, incremental=False):
+    """在子行程中轉換單一檔案，回傳 (輸出檔案, 是否成功, 耗時秒數, 轉換過程的訊息)"""
+    output_file = os.path.splitext(json_file)[0] + '_simple.csv'
+    start = time.time()
+    log = io.StringIO()
+    with redirect_stdout(log):
+        try:
+            success = convert_to_simple_csv(json_file, output_file, max_chars_per_cell, stream=stream,
+                                            incremental=incremental)
+        except MemoryError:  # 單一檔案記憶體不足不影響其他檔案
+            print("錯誤：記憶體不足")
+            success = False
+        except Exception as e:  # 單一檔案失敗不影響其他檔案
+            print(f"錯誤：{e!r}")
+            success = False
+    return output_file, success, time.time() - start, log.getvalue()
+
+def convert_all_json_files(max_chars_per_cell=MAX_CHARS_PER_CELL, stream=False, workers=None, incremental=False):
+    """轉換目錄下所有的 JSON 檔案為 CSV 格式
+
+    workers 為同時轉換的行程數，預設為 CPU 核心數；設為 1 時在目前行程中依序轉換。
+    平行轉換時一律使用串流模式，避免多個行程同時把大型版位檔案整個載入記憶體。
+    每個檔案各自轉換，其中一個失敗不會中斷其他檔案，全部完成後輸出彙整結果。
+
+    Returns:
+        dict: {JSON 檔案: (輸出檔案, 是否成功, 耗時秒數)}
+    """
     json_files = glob.glob('*.json')
     if not json_files:
         print("找不到任何 JSON 檔案")
-        return
+        return {}
     
-    for json_file in json_files:
-        output_file = os.path.splitext(json_file)[0] + '_simple.csv'
-        print(f"正在轉換 {json_file} 到 {output_file}")
-        convert_to_simple_csv(json_file, output_file, max_chars_per_cell)
+    # 先轉換最大的檔案，總耗時約等於最大檔案的轉換時間
+    json_files.sort(key=os.path.getsize, reverse=True)
+    workers = min(workers or os.cpu_count() or 1, len(json_files))
+    start = time.time()
+    results = {}
+    if workers == 1:
+        for json_file in json_files:
+            output_file = os.path.splitext(json_file)[0] + '_simple.csv'
+            print(f"正在轉換 {json_file} 到 {output_file}")
+            file_start = time.time()
+            success = convert_to_simple_csv(json_file, output_file, max_chars_per_cell, stream=stream,
+                                            incremental=incremental)
+            results[json_file] = (output_file, success, time.time() - file_start)
+    else:
+        print(f"以 {workers} 個行程平行轉換 {len(json_files)} 個檔案（串流模式）...")
+        stream = True
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_convert_file, json_file, max_chars_per_cell, stream, incremental): json_file
+                       for json_file in json_files}
+            for future in as_completed(futures):
+                json_file = futures[future]
+                try:
+                    output_file, success, elapsed, log = future.result()
+                except Exception as e:  # 子行程異常結束
+                    output_file, success, elapsed, log = None, False, 0.0, f"錯誤：{e!r}\n"
+                results[json_file] = (output_file, success, elapsed)
+                if success:
+                    print(f"已完成 {json_file} → {output_file}（{elapsed:.1f} 秒）")
+                else:
+                    print(f"轉換 {json_file} 失敗：{log.strip().splitlines()[-1] if log.strip() else '未知錯誤'}")
     
-    print(f"完成轉換 {len(json_files)} 個檔案")
+    failed = [json_file for json_file, (_, success, _) in results.items() if not success]
+    print(f"\n完成轉換 {len(json_files) - len(failed)}/{len(json_files)} 個檔案，總耗時 {time.time() - start:.1f} 秒")
+    for json_file in failed:
+        print(f"- 失敗：{json_file}")
+    return results
 
 def list_json_files():
     """列出當前目錄下所有的 JSON 檔案"""
@@ -137,20 +156,38 @@ def list_json_files():
 
 def main():
     """主程式"""
-    if len(sys.argv) < 2:
+    # --stream：以固定記憶體用量轉換大型版位檔案；--incremental：只匯出新增與有變動的文章；
+    # --workers N：--all 時同時轉換的行程數
+    stream = '--stream' in sys.argv
+    incremental = '--incremental' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg not in ('--stream', '--incremental')]
+    workers = None
+    if '--workers' in args:
+        i = args.index('--workers')
+        try:
+            workers = int(args[i + 1])
+        except (IndexError, ValueError):
+            workers = 0
+        if workers < 1:
+            print("錯誤：--workers 需要指定行程數")
+            return
+        del args[i:i + 2]
+    if not args:
         print("使用方式：")
         print("1. 轉換單一檔案：python simple_json_to_csv.py <json檔案>")
         print("2. 轉換所有JSON檔案：python simple_json_to_csv.py --all")
+        print("加上 --stream 以串流模式轉換（適用於大型檔案），--incremental 只匯出新增與有變動的文章，"
+              "--workers N 指定 --all 同時轉換的行程數")
         print("\n可用的JSON檔案：")
         selected_file = list_json_files()
         if selected_file:  # 如果使用者選擇了檔案
-            convert_to_simple_csv(selected_file)
+            convert_to_simple_csv(selected_file, stream=stream, incremental=incremental)
         return
 
-    if sys.argv[1] == '--all':
-        convert_all_json_files()
+    if args[0] == '--all':
+        convert_all_json_files(stream=stream, workers=workers, incremental=incremental)
     else:
-        input_file = sys.argv[1]
+        input_file = args[0]
         if not input_file.endswith('.json'):
             print("錯誤：請指定 JSON 檔案")
             return
@@ -158,7 +195,7 @@ def main():
             print(f"錯誤：找不到檔案 {input_file}")
             return
         
-        convert_to_simple_csv(input_file)
+        convert_to_simple_csv(input_file, stream=stream, incremental=incremental)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+"""測試共用的設定：以隨機產生的小型版位資料與暴力解比對"""
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ALPHABET = '台積電聯發科財報法說會股AaBb '
+TAGS = ('推', '噓', '→ ', None)
+
+def random_text(rng, max_length=30, alphabet=ALPHABET):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+def make_posts(rng, count, board='Test', junk_comments=False):
+    """產生與 moptt 版位檔案相同結構的文章；junk_comments 為 True 時部分文章夾雜無法辨識的留言項目"""
+    posts = []
+    for number in range(1, count + 1):
+        comments = [{'tag': rng.choice(TAGS), 'content': random_text(rng, 12)} for _ in range(rng.randint(0, 5))]
+        if junk_comments and rng.random() < 0.2:
+            comments.append('無法辨識的留言')
+        posts.append({
+            '_id': f"{board}{number}",
+            'title': random_text(rng, 12),
+            'url': f"https://moptt.tw/p/{board}.M.{number}",
+            'hits': rng.randint(0, 2000),
+            'acceptedDate': f"2024-01-{rng.randint(1, 28):02d}T08:00:00.000Z",
+            'number': number,
+            'comments_data': {
+                'total_comments': len(comments),
+                'like_count': sum(1 for c in comments if isinstance(c, dict) and c['tag'] == '推'),
+                'dislike_count': sum(1 for c in comments if isinstance(c, dict) and c['tag'] == '噓'),
+                'neutral_count': sum(1 for c in comments if isinstance(c, dict) and c['tag'] == '→ '),
+                'content': random_text(rng, 60),
+                'comments': comments,
+            },
+        })
+    return posts
+
+@pytest.fixture
+def rng():
+    return random.Random(20240101)
+
+@pytest.fixture
+def board_dir(tmp_path, monkeypatch, rng):
+    """在暫存目錄中建立三個版位檔案並切換到該目錄，回傳 {版位: 文章列表}"""
+    monkeypatch.chdir(tmp_path)
+    boards = {}
+    for board, count in (('Stock', 80), ('Gossiping', 120), ('Baseball', 40)):
+        boards[board] = make_posts(rng, count, board)
+        with open(tmp_path / f"moptt_{board}.json", 'w', encoding='utf-8') as f:
+            json.dump(boards[board], f, ensure_ascii=False)
+    return boards
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from ptt_advanced_analysis import AdvancedAnalysis
+from ptt_batch import load_queries, run_batch
+
+
+def write_queries(path, queries):
+    with open(path, 'w', encoding='utf-8') as f:
+        for query in queries:
+            f.write(json.dumps(query, ensure_ascii=False) + '\n')
+    return path
+
+
+@pytest.mark.parametrize('queries', [
+    [{'id': 'a', 'type': 'top'}, {'id': 'a', 'type': 'top'}],
+    [{'id': 'a b', 'type': 'top'}, {'id': 'a:b', 'type': 'top'}],
+    [{'id': 'Top', 'type': 'top'}, {'id': 'top', 'type': 'top'}],
+    [{'type': 'count', 'keywords': ['台積電']}, {'id': '001_count', 'type': 'top'}],
+    [{'id': 1, 'type': 'top'}, {'id': '1', 'type': 'top'}],
+])
+def test_colliding_ids_are_rejected(tmp_path, queries):
+    with pytest.raises(ValueError, match='結果檔名相同'):
+        load_queries(write_queries(tmp_path / 'queries.jsonl', queries))
+
+
+def test_default_ids_and_validation(tmp_path):
+    queries = load_queries(write_queries(tmp_path / 'queries.jsonl', [
+        {'type': 'top'}, {'id': 'mine', 'type': 'count', 'keywords': ['台積電']}]))
+    assert [query['id'] for query in queries] == ['001_top', 'mine']
+    with pytest.raises(ValueError, match='缺少參數'):
+        load_queries(write_queries(tmp_path / 'bad.jsonl', [{'type': 'search', 'keywords': ['台積電']}]))
+    with pytest.raises(ValueError, match='type 不正確'):
+        load_queries(write_queries(tmp_path / 'bad.jsonl', [{'type': 'nope'}]))
+
+
+def test_run_batch_matches_single_queries(board_dir, tmp_path):
+    analyzer = AdvancedAnalysis()
+    query_file = write_queries(tmp_path / 'queries.jsonl', [
+        {'id': 'count', 'type': 'count', 'keywords': ['台積電', '財報']},
+        {'id': 'any', 'type': 'keywords', 'keywords': ['聯發科', '法說會'], 'match': 'any'},
+        {'id': 'bad_match', 'type': 'keywords', 'keywords': ['股'], 'match': 'some'},
+        {'id': 'bad_date', 'type': 'search', 'keywords': ['股'], 'start': 'not-a-date', 'end': '2024-02-01'},
+        {'id': 'top', 'type': 'top', 'metric': 'hits', 'top_n': 5, 'boards': ['Stock']},
+    ])
+    output_files = run_batch(query_file, str(tmp_path / 'out'), analyzer)
+    assert list(output_files) == ['count', 'any', 'bad_match', 'bad_date', 'top']
+    outputs = {}
+    for query_id, path in output_files.items():
+        with open(path, encoding='utf-8') as f:
+            outputs[query_id] = json.load(f)
+
+    expected_counts = {}
+    for board, posts in board_dir.items():
+        for post in posts:
+            text = (post['title'] + post['comments_data']['content']).lower()
+            if '台積電' in text and '財報' in text:
+                expected_counts[board] = expected_counts.get(board, 0) + 1
+    assert outputs['count']['result']['counts'] == expected_counts
+
+    keyword_counts, match_counts = analyzer.keyword_hits(['聯發科', '法說會'], 'any')
+    assert outputs['any']['result']['keyword_counts'] == keyword_counts
+    assert outputs['any']['result']['match_counts'] == match_counts
+
+    assert 'error' in outputs['bad_match']
+    assert 'error' in outputs['bad_date']
+    hits = sorted((post['hits'] for post in board_dir['Stock']), reverse=True)[:5]
+    assert [post['hits'] for post in outputs['top']['result']] == hits
+    assert sorted(os.listdir(tmp_path / 'out')) == sorted(f"{query_id}.json" for query_id in output_files)
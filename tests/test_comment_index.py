@@ -0,0 +1,50 @@
+"""留言索引與逐則檢查的暴力解比對（包含無法辨識的留言項目）"""
+import json
+
+import pytest
+
+from conftest import make_posts
+from ptt_advanced_analysis import AdvancedAnalysis
+from ptt_comment_index import BoardCommentIndex, parse_tags, tag_code
+
+def _brute(posts, keyword, tags):
+    codes = parse_tags(tags)
+    for position, post in enumerate(posts):
+        for comment in post['comments_data']['comments']:
+            content = comment.get('content') if isinstance(comment, dict) else ''
+            tag = tag_code(comment.get('tag')) if isinstance(comment, dict) else tag_code(None)
+            if (keyword is None or keyword.lower() in content.lower()) and (codes is None or tag in codes):
+                yield position, content
+
+@pytest.mark.parametrize('keyword, tags', [(None, None), ('台積', None), ('a', None), (None, '噓'),
+                                           ('電', ['推', '→']), ('Ab', 'boo')])
+def test_search_matches_brute_force(rng, keyword, tags):
+    posts = make_posts(rng, 200, junk_comments=True)
+    index = BoardCommentIndex(posts)
+    found = [(index.comment_posts[i], index.content(i)) for i in index.search(keyword, parse_tags(tags))]
+    assert found == list(_brute(posts, keyword, tags))
+
+def test_comment_ids_follow_list_positions(rng):
+    posts = make_posts(rng, 100, junk_comments=True)
+    board = posts[:60]
+    index = BoardCommentIndex(board)
+    for post in posts[60:]:
+        # 與 BoardIndexes.add_post 相同：文章先加入版位資料，再更新索引
+        board.append(post)
+        index.add(len(board) - 1, post)
+    assert len(index) == sum(len(post['comments_data']['comments']) for post in posts)
+    for comment_id in range(len(index)):
+        position = index.comment_posts[comment_id]
+        comment = posts[position]['comments_data']['comments'][comment_id - index.post_offsets[position]]
+        assert index.content(comment_id) == (comment['content'] if isinstance(comment, dict) else '')
+
+def test_iter_comment_matches(tmp_path, monkeypatch, rng):
+    monkeypatch.chdir(tmp_path)
+    posts = make_posts(rng, 80, 'Stock')
+    with open('moptt_Stock.json', 'w', encoding='utf-8') as f:
+        json.dump(posts, f, ensure_ascii=False)
+    analyzer = AdvancedAnalysis(lazy=True)
+    matches = [c['content'] for c in analyzer.iter_comment_matches('台', '推', start_time='2024-01-10')]
+    expected = [content for position, content in _brute(posts, '台', '推')
+                if posts[position]['acceptedDate'] >= '2024-01-10']
+    assert sorted(matches) == sorted(expected)
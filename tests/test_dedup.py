@@ -0,0 +1,61 @@
+"""MinHash 簽章與 LSH 分群與精確 Jaccard 相似度的比對"""
+import numpy as np
+
+from conftest import random_text
+from ptt_dedup import DuplicateIndex, MinHasher, shingle_hashes
+
+def _jaccard(a, b):
+    a, b = set(a.tolist()), set(b.tolist())
+    return len(a & b) / len(a | b)
+
+def _post(content, day=1):
+    return {'title': '', 'acceptedDate': f"2024-01-{day:02d}T00:00:00.000Z", 'comments_data': {'content': content}}
+
+def _edit(rng, text, changes):
+    chars = list(text)
+    for _ in range(changes):
+        chars[rng.randrange(len(chars))] = rng.choice('聯發科財報')
+    return ''.join(chars)
+
+def test_signature_estimates_jaccard(rng):
+    hasher = MinHasher(num_perm=256)
+    for _ in range(20):
+        base = random_text(rng, 300, '台積電聯發科財報法說會股價漲跌')
+        other = _edit(rng, base, rng.randint(0, 40))
+        a, b = shingle_hashes(base), shingle_hashes(other)
+        estimate = np.mean(hasher.signature(a) == hasher.signature(b))
+        assert abs(estimate - _jaccard(a, b)) < 0.12
+
+def test_clusters_match_exact_similarity(rng):
+    bases = [random_text(rng, 400, '台積電聯發科財報法說會股價漲跌外資') * 2 for _ in range(6)]
+    posts = {'A': [], 'B': []}
+    for i, base in enumerate(bases):
+        posts['A'].append(_post(base, day=i + 2))
+        posts['B'].append(_post(_edit(rng, base, 2), day=1))  # 幾乎相同，日期較早
+        posts['B'].append(_post(random_text(rng, 400, '棒球比賽投手打擊全壘打'), day=3))
+    posts['A'].append(_post('太短'))
+
+    index = DuplicateIndex(posts)
+    keys = [(board, position) for board in posts for position in range(len(posts[board]))]
+    content = {key: posts[key[0]][key[1]]['comments_data']['content'] for key in keys}
+    clustered = {}
+    for cluster_id, cluster in enumerate(index.clusters()):
+        for key in cluster:
+            clustered[key] = cluster_id
+
+    for i, a in enumerate(keys):
+        for b in keys[i + 1:]:
+            if min(len(content[a]), len(content[b])) < index.min_length:
+                assert a not in clustered or b not in clustered or clustered[a] != clustered[b]
+                continue
+            similarity = _jaccard(shingle_hashes(content[a]), shingle_hashes(content[b]))
+            same = a in clustered and clustered.get(a) == clustered.get(b)
+            if similarity >= 0.95:
+                assert same, (a, b, similarity)
+            elif similarity < 0.5:
+                assert not same, (a, b, similarity)
+
+    # 較早發表的文章為代表，其餘視為重複
+    for cluster in index.clusters():
+        assert cluster[0][0] == 'B'
+    assert index.duplicates('A') == set(range(len(bases)))
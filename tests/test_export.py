@@ -0,0 +1,115 @@
+import csv
+import json
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+import json_to_csv_converter
+import simple_json_to_csv
+from conftest import make_posts
+from ptt_export import (COMMENT_COLUMNS, clean_series, clean_text, export_all, export_normalized, post_fields,
+                        simple_frame, simple_row)
+
+TRICKY = ['', None, 0, 1.5, 'a, b', '"引號"', "it's", ' 前後 空白 ', 'x\r\ny\tz', 'a\x1c\x1d\x1e\x1fb',
+          '\x85\xa0 　全形', '零寬​字元', 'http://i.imgur.com/x.jpg', ' http://a', '，,；']
+
+
+def reference_clean_text(text):
+    """原本逐一處理的清理規則"""
+    if not text:
+        return ''
+    text = ' '.join(str(text).split())
+    text = text.replace('"', '').replace("'", '')
+    text = text.replace(',', '；')
+    return text
+
+
+def tricky_posts(rng):
+    posts = make_posts(rng, 120)
+    for i, post in enumerate(posts):
+        post['timestamp'] = f"2024-01-{i % 28 + 1:02d}T0{i % 10}:30:00+08:00" if i % 7 else 'not a date'
+        post['content'] = TRICKY[i % len(TRICKY)]
+        for j, comment in enumerate(post['comments_data']['comments']):
+            comment['content'] = TRICKY[(i + j) % len(TRICKY)]
+            if j % 2:
+                comment['type'] = '推'
+    posts[3]['board'] = 'Test'  # 只有部分文章有的欄位
+    posts[5].pop('comments_data')
+    posts[8]['comments_data']['comments'] = None
+    posts[9]['title'] = 12345
+    return posts
+
+
+def write_board(tmp_path, posts):
+    path = tmp_path / 'moptt_Test.json'
+    path.write_text(json.dumps(posts, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_clean_text_matches_reference():
+    for text in TRICKY:
+        assert clean_text(text) == reference_clean_text(text)
+    assert clean_series(TRICKY).tolist() == [reference_clean_text(text) for text in TRICKY]
+    assert clean_series([]).tolist() == []
+
+
+def test_simple_frame_matches_row_by_row(rng):
+    posts = tricky_posts(rng)
+    expected = pd.DataFrame([simple_row(post) for post in posts]).to_csv(index=False)
+    assert simple_frame(posts).to_csv(index=False) == expected
+    assert simple_frame(posts[8:10]).to_csv(index=False) == pd.DataFrame(
+        [simple_row(post) for post in posts[8:10]]).to_csv(index=False)
+
+
+def test_streaming_output_is_byte_identical(rng, tmp_path, monkeypatch):
+    monkeypatch.setattr('builtins.input', lambda prompt='': 'n')
+    posts = tricky_posts(rng)
+    source = write_board(tmp_path, posts)
+    json_to_csv_converter.convert_json_to_csv(source, str(tmp_path / 'full.csv'))
+    json_to_csv_converter.convert_json_to_csv(source, str(tmp_path / 'full_stream.csv'), stream=True)
+    assert (tmp_path / 'full_stream.csv').read_bytes() == (tmp_path / 'full.csv').read_bytes()
+
+    assert simple_json_to_csv.convert_to_simple_csv(source, str(tmp_path / 'simple.csv'))
+    assert simple_json_to_csv.convert_to_simple_csv(source, str(tmp_path / 'simple_stream.csv'), stream=True)
+    assert (tmp_path / 'simple_stream.csv').read_bytes() == (tmp_path / 'simple.csv').read_bytes()
+    expected = pd.DataFrame([simple_row(post) for post in posts])
+    assert (tmp_path / 'simple.csv').read_bytes() == expected.to_csv(index=False).encode('utf-8-sig')
+
+
+def test_normalized_export(rng, tmp_path):
+    posts = tricky_posts(rng)
+    source = write_board(tmp_path, posts)
+    outputs = export_all(source, full_csv=str(tmp_path / 'full.csv'), simple_csv=False, normalized=True,
+                         parquet=False)
+    assert outputs['posts_parquet'] is None and outputs['comments_parquet'] is None
+
+    expected_posts = pd.DataFrame([post_fields(post) for post in posts])
+    with open(outputs['posts'], 'rb') as f:
+        assert f.read() == expected_posts.to_csv(index=False).encode('utf-8-sig')
+    expected_comments = [(post.get('_id'), position, comment.get('tag', ''), comment.get('content', ''))
+                         for post in posts
+                         for position, comment in enumerate(post.get('comments_data', {}).get('comments') or [])]
+    with open(outputs['comments'], encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == COMMENT_COLUMNS
+    assert rows[1:] == [['' if value is None else str(value) for value in row] for row in expected_comments]
+
+    # 同一次讀取產生的完整 CSV 與單獨轉換的結果相同
+    json_to_csv_converter.convert_json_to_csv(source, str(tmp_path / 'full_stream.csv'), stream=True)
+    assert (tmp_path / 'full.csv').read_bytes() == (tmp_path / 'full_stream.csv').read_bytes()
+
+
+def test_normalized_parquet(rng, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    posts = make_posts(rng, 50)
+    posts[2].pop('hits')
+    outputs = export_normalized(write_board(tmp_path, posts))
+    table = pq.read_table(outputs['posts_parquet'])
+    assert table.column('_id').to_pylist() == [post['_id'] for post in posts]
+    assert table.column('hits').to_pylist() == [post.get('hits') for post in posts]
+    comments = pq.read_table(outputs['comments_parquet'])
+    assert comments.column('content').to_pylist() == [
+        comment['content'] for post in posts for comment in post['comments_data']['comments']]
+    assert comments.column('position').to_pylist() == [
+        position for post in posts for position in range(len(post['comments_data']['comments']))]
@@ -0,0 +1,79 @@
+"""增量匯出的結果需與完整匯出完全相同"""
+import copy
+import json
+
+import pytest
+
+from conftest import make_posts
+from ptt_export import FullCsvSink, SimpleCsvSink, export_board
+from ptt_incremental import _row_offsets, incremental_export, load_state
+
+def _write(path, posts):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(posts, f, ensure_ascii=False)
+
+def _full_export(tmp_path, posts, format):
+    source, output = tmp_path / 'reference.json', tmp_path / 'reference.csv'
+    _write(source, posts)
+    sink = FullCsvSink(str(output)) if format == 'full' else SimpleCsvSink(str(output))
+    export_board(str(source), [sink])
+    return output.read_bytes()
+
+@pytest.mark.parametrize('format', ['full', 'simple'])
+def test_incremental_matches_full_export(tmp_path, rng, format):
+    posts = make_posts(rng, 150)
+    source, output = str(tmp_path / 'moptt_Test.json'), str(tmp_path / 'out.csv')
+
+    def export(expected_rebuilt=None):
+        _write(source, posts)
+        result = incremental_export(source, output, format=format)
+        assert open(output, 'rb').read() == _full_export(tmp_path, posts, format)
+        state = load_state(output, format)
+        assert state is not None
+        assert (state['offsets'], state['size']) == _row_offsets(output)
+        if expected_rebuilt is not None:
+            assert result['rebuilt'] == expected_rebuilt
+        return result
+
+    del posts[100:]
+    export(expected_rebuilt=True)
+    assert export() == {'appended': 0, 'updated': 0, 'rebuilt': False}
+
+    # 新文章附加到尾端
+    posts.extend(make_posts(rng, 150)[100:120])
+    for number, post in enumerate(posts, 1):
+        post['_id'], post['number'] = f"Test{number}", number
+    assert export(expected_rebuilt=False)['appended'] == 20
+
+    # 舊文章的新留言與觀看次數，加上新文章
+    posts[3]['comments_data']['comments'].append({'tag': '推', 'content': '新留言, "引號"\n換行'})
+    posts[3]['comments_data']['total_comments'] += 1
+    posts[90]['hits'] += 5
+    new_post = copy.deepcopy(posts[0])
+    new_post['_id'], new_post['number'] = 'Test999', 999
+    posts.append(new_post)
+    assert export(expected_rebuilt=False) == {'appended': 1, 'updated': 2, 'rebuilt': False}
+
+    # 長度不變的編輯：留言內容與標題各改一個字
+    comments = posts[10]['comments_data']['comments']
+    if not comments:
+        comments.append({'tag': '推', 'content': '甲'})
+        posts[10]['comments_data']['total_comments'] += 1
+        export()
+    comments[-1]['content'] = comments[-1]['content'][:-1] + '乙' if comments[-1]['content'] else '乙'
+    posts[20]['title'] = '丙' + posts[20]['title'][1:]
+    assert export(expected_rebuilt=False) == {'appended': 0, 'updated': 2, 'rebuilt': False}
+
+    # 欄位版面改變時改為完整匯出
+    posts[7]['new_field'] = 'x'
+    export(expected_rebuilt=(format == 'full'))
+
+def test_modified_output_triggers_full_export(tmp_path, rng):
+    posts = make_posts(rng, 30)
+    source, output = str(tmp_path / 'moptt_Test.json'), str(tmp_path / 'out.csv')
+    _write(source, posts)
+    incremental_export(source, output, format='full')
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write('extra\n')
+    assert incremental_export(source, output, format='full')['rebuilt']
+    assert open(output, 'rb').read() == _full_export(tmp_path, posts, 'full')
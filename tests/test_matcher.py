@@ -0,0 +1,37 @@
+"""Aho–Corasick 自動機與逐一 str.find 的比對"""
+import pytest
+
+from conftest import random_text
+from ptt_matcher import AhoCorasick
+
+def _brute_matches(text, patterns):
+    matches = set()
+    for pattern_id, pattern in enumerate(patterns):
+        if not pattern:
+            continue
+        start = text.find(pattern)
+        while start >= 0:
+            matches.add((start + len(pattern) - 1, pattern_id))
+            start = text.find(pattern, start + 1)
+    return matches
+
+@pytest.mark.parametrize('alphabet', ['ab', 'abc', '台積電聯發'])
+def test_iter_matches_random(rng, alphabet):
+    for _ in range(200):
+        patterns = [random_text(rng, 4, alphabet) for _ in range(rng.randint(1, 8))]
+        text = random_text(rng, 40, alphabet)
+        matches = list(AhoCorasick(patterns).iter_matches(text))
+        assert len(matches) == len(set(matches))
+        assert set(matches) == _brute_matches(text, patterns)
+
+def test_overlapping_and_duplicate_patterns():
+    patterns = ['he', 'she', 'his', 'hers', 'she', '']
+    text = 'ushershis'
+    assert set(AhoCorasick(patterns).iter_matches(text)) == _brute_matches(text, patterns)
+
+def test_find_ids(rng):
+    for _ in range(200):
+        patterns = [random_text(rng, 3, 'abcd') for _ in range(rng.randint(1, 6))]
+        text = random_text(rng, 30, 'abcd')
+        expected = {pattern_id for _, pattern_id in _brute_matches(text, patterns)}
+        assert AhoCorasick(patterns).find_ids(text) == expected
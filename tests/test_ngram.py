@@ -0,0 +1,50 @@
+"""Space-Saving 計數器與精確計數的比對"""
+from collections import Counter
+
+import pytest
+
+from ptt_ngram import SpaceSavingCounter, count_ngrams, iter_ngrams
+
+def _stream(rng, length, universe):
+    # 偏斜的分布：少數項目出現很多次，其餘是長尾
+    weights = [1 / (rank + 1) ** 1.2 for rank in range(universe)]
+    return rng.choices([f"item{i}" for i in range(universe)], weights=weights, k=length)
+
+def test_exact_when_under_capacity(rng):
+    items = _stream(rng, 2000, 50)
+    counter = SpaceSavingCounter(capacity=50)
+    counter.update(items)
+    assert counter.counts == Counter(items)
+    assert not counter.errors
+
+@pytest.mark.parametrize('capacity', [5, 20, 100])
+def test_error_bounds(rng, capacity):
+    items = _stream(rng, 5000, 400)
+    exact = Counter(items)
+    counter = SpaceSavingCounter(capacity)
+    for item in items:
+        counter.add(item)
+
+    assert len(counter) == capacity
+    assert sum(counter.counts.values()) == len(items)
+    for item, count in counter.counts.items():
+        error = counter.errors.get(item, 0)
+        assert count - error <= exact[item] <= count
+    # 次數超過 N / capacity 的項目一定會被追蹤
+    for item, count in exact.items():
+        if count > len(items) / capacity:
+            assert item in counter.counts
+
+def test_most_common_matches_counter_for_heavy_hitters(rng):
+    items = _stream(rng, 5000, 300)
+    counter = SpaceSavingCounter(capacity=200)
+    counter.update(items)
+    top = [item for item, _ in Counter(items).most_common(3)]
+    assert [item for item, _ in counter.most_common(3)] == top
+
+def test_count_ngrams_matches_brute_force():
+    texts = ['台積電法說會 台積電', 'abc 聯發科財報', '']
+    counters = count_ngrams(texts, sizes=(2, 3), stop_words={'台積'})
+    for size in (2, 3):
+        expected = Counter(gram for text in texts for gram in iter_ngrams(text, size) if gram != '台積')
+        assert counters[size].counts == expected
@@ -0,0 +1,64 @@
+import csv
+import json
+
+import pytest
+
+from ptt_output import ConsolePager, ResultWriter, output_format, stream_results
+
+ROWS = [{'title': f"標題{i}", 'url': f"https://moptt.tw/p/Test.M.{i}", 'extra': [i]} for i in range(5)]
+
+
+def test_output_format():
+    assert output_format('a.jsonl') == 'jsonl'
+    assert output_format('a.JSON') == 'json'
+    assert output_format('a.csv') == output_format('a') == 'csv'
+
+
+@pytest.mark.parametrize('rows', [ROWS, ROWS[:1], []])
+def test_json_writes_an_array(tmp_path, rows):
+    path = tmp_path / 'out.json'
+    with ResultWriter(str(path), ['title', 'url']) as writer:
+        stream_results(rows, writer)
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f) == rows
+
+
+def test_jsonl_and_csv(tmp_path):
+    with ResultWriter(str(tmp_path / 'out.jsonl'), ['title', 'url']) as writer:
+        stream_results(ROWS, writer)
+    with open(tmp_path / 'out.jsonl', encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == ROWS
+    with ResultWriter(str(tmp_path / 'out.csv'), ['title', 'url']) as writer:
+        stream_results(ROWS, writer)
+    with open(tmp_path / 'out.csv', encoding='utf-8-sig', newline='') as f:
+        assert list(csv.DictReader(f)) == [{'title': row['title'], 'url': row['url']} for row in ROWS]
+
+
+def test_lazy_writer_leaves_no_file_without_results(tmp_path):
+    for name in ('out.json', 'out.jsonl', 'out.csv'):
+        with ResultWriter(str(tmp_path / name), ['title'], lazy=True) as writer:
+            stream_results([], writer)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        ResultWriter(str(tmp_path / 'out'), ['title'], format='xml')
+
+
+def test_pager_limit_does_not_prompt():
+    shown = []
+
+    def no_input(prompt):
+        raise AssertionError('不分頁時不應該詢問')
+    pager = ConsolePager(shown.append, limit=2, input_func=no_input)
+    assert stream_results(ROWS, pager=pager) == len(ROWS)
+    assert shown == ROWS[:2] and pager.shown == 2
+
+
+def test_pager_pages_until_stopped():
+    shown, answers = [], iter(['', 'q'])
+    pager = ConsolePager(shown.append, limit=None, page_size=2, input_func=lambda prompt: next(answers))
+    collected = []
+    assert stream_results(ROWS * 2, pager=pager, collect=collected) == 10
+    assert shown == (ROWS * 2)[:4] and collected == ROWS * 2
@@ -0,0 +1,101 @@
+"""布林查詢的語法解析與求值，與逐篇檢查的暴力解比對"""
+import pytest
+
+from ptt_advanced_analysis import AdvancedAnalysis
+from ptt_comment_index import tag_code
+from ptt_index import post_epoch_day
+from ptt_query import And, BoardTerm, Node, Not, Or, Range, Term, evaluate_query, parse_query
+from ptt_ranking import METRICS
+
+QUERIES = [
+    '台積',
+    '台積 財報',
+    '台積 OR 聯發',
+    '台積 -財報',
+    'NOT 台積',
+    'title:股 content:法說',
+    '"a b"',
+    'AB',
+    'comment:台積',
+    'boo:電',
+    'push:聯 OR neutral:發科',
+    'board:Stock',
+    '-board:Gossiping 台',
+    'board:Stock OR board:Baseball',
+    'date:2024-01-05..2024-01-10',
+    'date:>=2024-01-20 hits:<500',
+    'hits:>1500 OR total_comments:4..',
+    '(台積 OR 聯發) AND -board:Gossiping date:..2024-01-15',
+    'board:Nope 台積',
+    '台積 board:Stock -board:Stock',
+    'NOT (board:Stock OR 財報)',
+]
+
+def _matches(node, board, post):
+    """不使用任何索引，直接檢查單篇文章是否符合語法樹"""
+    if isinstance(node, And):
+        return all(_matches(child, board, post) for child in node.children)
+    if isinstance(node, Or):
+        return any(_matches(child, board, post) for child in node.children)
+    if isinstance(node, Not):
+        return not _matches(node.child, board, post)
+    if isinstance(node, BoardTerm):
+        return board.lower() == node.value.lower()
+    if isinstance(node, Range):
+        value = post_epoch_day(post) if node.field == 'date' else METRICS[node.field](post)
+        low = float('-inf') if node.low is None else node.low
+        high = float('inf') if node.high is None else node.high
+        return value is not None and low <= value <= high
+    assert isinstance(node, Term)
+    title = post['title'].lower()
+    content = post['comments_data']['content'].lower()
+    if node.field == 'comment':
+        return any(isinstance(c, dict) and node.value in c['content'].lower()
+                   and (node.tags is None or tag_code(c['tag']) in node.tags)
+                   for c in post['comments_data']['comments'])
+    text = {'title': title, 'content': content, 'text': title + ' ' + content}[node.field]
+    return node.value in text
+
+@pytest.fixture
+def analyzer(board_dir):
+    return AdvancedAnalysis(lazy=True)
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_evaluate_matches_brute_force(board_dir, analyzer, query):
+    node = parse_query(query)
+    expected = [(board, position) for board in analyzer.board_data
+                for position, post in enumerate(board_dir[board]) if _matches(node, board, post)]
+    assert sorted(evaluate_query(analyzer, node)) == sorted(expected)
+
+def test_board_terms_do_not_load_other_boards(board_dir):
+    analyzer = AdvancedAnalysis(lazy=True)
+    list(evaluate_query(analyzer, parse_query('board:Stock 台積')))
+    assert analyzer.board_data.is_loaded('Stock')
+    assert not analyzer.board_data.is_loaded('Gossiping')
+    assert not analyzer.board_data.is_loaded('Baseball')
+
+def test_parse_structure():
+    node = parse_query('a b OR NOT c')
+    assert isinstance(node, Or)
+    assert isinstance(node.children[0], And)
+    assert isinstance(node.children[1], Not)
+    assert isinstance(parse_query('-board:Stock').child, BoardTerm)
+    assert parse_query('hits:>10').low > 10
+    assert (parse_query('date:2024-01-02').low, parse_query('date:2024-01-02').high) == (19724, 19724)
+    assert parse_query('title:"x y"').value == 'x y'
+
+@pytest.mark.parametrize('query', ['', '(a', 'a)', 'AND', 'a OR', 'hits:abc', 'date:2024-13-01', 'title:',
+                                   'push:', 'hits:>1..2'])
+def test_parse_errors(query):
+    with pytest.raises(ValueError):
+        parse_query(query)
+
+
+def test_node_is_abstract():
+    with pytest.raises(TypeError):
+        Node()
+
+    class Incomplete(Node):
+        pass
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,67 @@
+import pickle
+from collections.abc import Mapping
+
+import pytest
+
+from conftest import make_posts
+from ptt_records import PostRecord, StringPool, compact_posts
+
+
+def plain(value):
+    """將精簡紀錄還原為 dict / list，方便與原始資料比較"""
+    if isinstance(value, Mapping):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+def test_records_match_source_posts(rng):
+    posts = make_posts(rng, 200, junk_comments=True)
+    records = compact_posts(posts)
+    assert [plain(record) for record in records] == posts
+    for post, record in zip(posts, records):
+        assert len(record) == len(post) and set(record) == set(post)
+        assert record['title'] == post['title'] and record.get('nope', 0) == 0
+        comments = record['comments_data']['comments']
+        assert [c for c in comments if not isinstance(c, Mapping)] == \
+               [c for c in post['comments_data']['comments'] if not isinstance(c, dict)]
+
+
+def test_missing_fields_and_extra_fields():
+    post = {'title': 't', 'hits': '12', 'board': 'Stock', 'comments_data': {'comments': [{'tag': '推'}, 3, None]}}
+    record = PostRecord(post, StringPool())
+    assert record['hits'] == 12
+    assert record['board'] == 'Stock' and 'board' in record
+    assert 'url' not in record and record.get('url') is None
+    assert set(record) == {'title', 'hits', 'board', 'comments_data'}
+    comments_data = record['comments_data']
+    assert 'content' not in comments_data and set(comments_data) == {'comments'}
+    assert plain(comments_data['comments']) == [{'tag': '推'}, 3, None]
+    with pytest.raises(KeyError):
+        record['url']
+
+
+def test_non_list_comments_and_non_dict_posts():
+    records = compact_posts([{'comments_data': {'comments': 'broken'}}, 'junk', None])
+    assert records[0]['comments_data']['comments'] == 'broken'
+    assert records[1:] == ['junk', None]
+
+
+def test_string_pool_shares_short_strings():
+    pool = StringPool(max_length=8)
+    posts = [{'title': ''.join(['標', '題']), 'comments_data': {'comments': [{'tag': '推', 'content': ''.join(['好', '文'])}]}}
+             for _ in range(3)]
+    records = compact_posts(posts, pool)
+    contents = [record['comments_data']['comments'][0]['content'] for record in records]
+    assert all(content is contents[0] for content in contents)
+    long_text = '長' * 9
+    assert pool.intern(long_text) is long_text and long_text not in pool._strings
+
+
+def test_records_survive_pickle(rng):
+    posts = make_posts(rng, 50, junk_comments=True)
+    posts[0].pop('url')
+    records = pickle.loads(pickle.dumps(compact_posts(posts), protocol=pickle.HIGHEST_PROTOCOL))
+    assert [plain(record) for record in records] == posts
+    assert 'url' not in records[0] and records[0].get('url') is None
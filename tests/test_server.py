@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from conftest import make_posts
+from ptt_advanced_analysis import AdvancedAnalysis
+from ptt_server import AnalysisService, make_handler
+
+
+def write_board(board, posts):
+    with open(f"moptt_{board}.json", 'w', encoding='utf-8') as f:
+        json.dump(posts, f, ensure_ascii=False)
+    # 確保修改時間與前一次不同，讓 reload 偵測到變動
+    stat = os.stat(f"moptt_{board}.json")
+    os.utime(f"moptt_{board}.json", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture(params=[False, True], ids=['eager', 'lazy'])
+def service(request, board_dir):
+    return AnalysisService(AdvancedAnalysis(lazy=request.param))
+
+
+def test_errors(service):
+    assert service.handle('nope', {})[0] == 404
+    status, payload = service.handle('search', {'keywords': '台積電', 'start': '2024-01-01'})
+    assert (status, payload['error']) == (400, '缺少參數：end')
+    status, payload = service.handle('top', {'boards': 'Nope'})
+    assert (status, payload['error']) == (400, '找不到版位：Nope')
+    status, payload = service.handle('comments', {'boards': 'Stock,Nope'})
+    assert (status, payload['error']) == (400, '找不到版位：Nope')
+    status, payload = service.handle('common', {'board': 'Nope'})
+    assert (status, payload['error']) == (400, '找不到版位：Nope')
+
+
+def test_unexpected_key_error_is_internal(service, monkeypatch):
+    def broken(*args, **kwargs):
+        raise KeyError('title')
+    monkeypatch.setattr(service.analyzer, 'top_posts', broken)
+    assert service.handle('top', {})[0] == 500
+
+
+def test_queries(service, board_dir):
+    status, payload = service.handle('top', {'metric': 'hits', 'top_n': '3', 'boards': 'Stock'})
+    assert status == 200
+    hits = sorted((post['hits'] for post in board_dir['Stock']), reverse=True)[:3]
+    assert [post['hits'] for post in payload['result']] == hits
+
+    status, payload = service.handle('count', {'keywords': '台積電 財報'})
+    expected = {}
+    for board, posts in board_dir.items():
+        for post in posts:
+            text = (post['title'] + post['comments_data']['content']).lower()
+            if '台積電' in text and '財報' in text:
+                expected[board] = expected.get(board, 0) + 1
+    assert status == 200 and payload['result'] == expected
+
+
+def test_reload(service, board_dir, rng):
+    service.handle('top', {'boards': 'Stock,Gossiping'})  # 先載入並建立索引
+    appended = board_dir['Stock'] + make_posts(rng, 10, 'Stock')[-5:]
+    for i, post in enumerate(appended[-5:], len(board_dir['Stock']) + 1):
+        post['_id'], post['number'] = f"Stock{i}", i
+    write_board('Stock', appended)
+    write_board('Gossiping', board_dir['Gossiping'][10:])
+    write_board('Movie', make_posts(rng, 15, 'Movie'))
+    os.remove('moptt_Baseball.json')
+
+    status, payload = service.handle('reload', {})
+    assert status == 200
+    assert payload['result'] == {'added': ['Movie'], 'appended': ['Stock'],
+                                 'replaced': ['Gossiping'], 'removed': ['Baseball']}
+    assert service.handle('reload', {})[1]['result'] == {'added': [], 'appended': [], 'replaced': [], 'removed': []}
+
+    fresh = AnalysisService(AdvancedAnalysis())
+    for params in ({'metric': 'hits', 'top_n': '1000'}, {'metric': 'like_count', 'boards': 'Movie'}):
+        # 數值相同的文章順序取決於版位順序，因此以網址排序後比較
+        assert (sorted(service.handle('top', params)[1]['result'], key=lambda post: post['url'])
+                == sorted(fresh.handle('top', params)[1]['result'], key=lambda post: post['url']))
+    assert service.handle('count', {'keywords': '股'})[1]['result'] == fresh.handle('count', {'keywords': '股'})[1]['result']
+    assert service.handle('top', {'boards': 'Baseball'})[0] == 400
+
+
+def test_reload_parses_outside_the_query_lock(service, board_dir, monkeypatch):
+    service.handle('top', {'boards': 'Stock'})
+    write_board('Stock', board_dir['Stock'][:-1])
+    load_board = service.analyzer._load_board
+    held = []
+
+    def checked_load(path):
+        held.append(service.lock.locked())
+        return load_board(path)
+    monkeypatch.setattr(service.analyzer, '_load_board', checked_load)
+    assert service.handle('reload', {})[1]['result']['replaced'] == ['Stock']
+    assert held == [False]
+
+
+def test_http(board_dir):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(AnalysisService(AdvancedAnalysis(lazy=True))))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/health") as response:
+            assert set(json.load(response)['result']) == set(board_dir)
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/top?boards=Nope")
+        assert error.value.code == 400
+        assert json.load(error.value)['error'] == '找不到版位：Nope'
+    finally:
+        server.shutdown()
+        server.server_close()
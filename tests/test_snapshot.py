@@ -0,0 +1,27 @@
+import json
+import os
+
+import ptt_snapshot
+
+
+def test_snapshot_round_trip(board_dir):
+    data = board_dir['Stock']
+    assert ptt_snapshot.load_snapshot('moptt_Stock.json') is None
+    ptt_snapshot.save_snapshot('moptt_Stock.json', data)
+    assert ptt_snapshot.load_snapshot('moptt_Stock.json') == data
+
+
+def test_unreadable_snapshot_is_a_miss(board_dir):
+    path = ptt_snapshot.save_snapshot('moptt_Stock.json', board_dir['Stock'])
+    for content in (b'', b'not a pickle', b'\x80\x04\x95garbage'):
+        with open(path, 'wb') as f:
+            f.write(content)
+        assert ptt_snapshot.load_snapshot('moptt_Stock.json') is None
+
+
+def test_changed_source_invalidates_snapshot(board_dir):
+    ptt_snapshot.save_snapshot('moptt_Stock.json', board_dir['Stock'])
+    with open('moptt_Stock.json', 'w', encoding='utf-8') as f:
+        json.dump([], f)
+    os.utime('moptt_Stock.json', ns=(0, 0))
+    assert ptt_snapshot.load_snapshot('moptt_Stock.json') is None
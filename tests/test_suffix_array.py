@@ -0,0 +1,51 @@
+"""後綴陣列、LCP 陣列與子字串計數的暴力解比對"""
+import pytest
+
+from conftest import make_posts, random_text
+from ptt_suffix_array import BoardSuffixArray, build_lcp_array, build_suffix_array, post_text
+
+def _brute_lcp(text, sa):
+    lcp = [0] * len(sa)
+    for i in range(1, len(sa)):
+        a, b = text[sa[i - 1]:], text[sa[i]:]
+        while lcp[i] < min(len(a), len(b)) and a[lcp[i]] == b[lcp[i]]:
+            lcp[i] += 1
+    return lcp
+
+def _count(text, pattern):
+    return sum(1 for i in range(len(text)) if text.startswith(pattern, i))
+
+@pytest.mark.parametrize('alphabet', ['a', 'ab', 'abcd', '台積電\x1e\x1f'])
+def test_suffix_and_lcp_arrays(rng, alphabet):
+    for length in (0, 1, 2, 3, 17, 64, 200):
+        text = ''.join(rng.choice(alphabet) for _ in range(length))
+        sa = build_suffix_array(text)
+        assert list(sa) == sorted(range(len(text)), key=lambda i: text[i:])
+        assert list(build_lcp_array(text, sa)) == _brute_lcp(text, sa)
+
+def test_count_and_occurrences_with_pending_posts(rng):
+    posts = make_posts(rng, 30)
+    index = BoardSuffixArray(posts[:20])
+    for position in range(20, 30):
+        index.add(position, posts[position])
+    assert index.pending  # 新文章尚未合併
+
+    texts = [post_text(post) for post in posts]
+    for _ in range(100):
+        pattern = random_text(rng, 3) or '台'
+        expected = {position: _count(text, pattern) for position, text in enumerate(texts)
+                    if _count(text, pattern)}
+        assert index.count(pattern) == sum(expected.values())
+        assert index.occurrences(pattern) == expected
+
+    # 合併後結果不變
+    index._merge_pending()
+    assert index.text == ''.join(texts)
+    assert list(index.sa) == sorted(range(len(index.text)), key=lambda i: index.text[i:])
+
+def test_frequent_substrings_counts(rng):
+    posts = make_posts(rng, 40)
+    index = BoardSuffixArray(posts)
+    for substring, count in index.frequent_substrings(min_count=5, top_n=30):
+        assert count == _count(index.text, substring)
+        assert count >= 5
@@ -0,0 +1,131 @@
+from collections import Counter
+
+import pytest
+
+import ptt_trend
+from conftest import make_posts
+from ptt_index import post_epoch_day, to_epoch_day
+from ptt_ngram import iter_ngrams, iter_post_texts
+from ptt_trend import TREND_SIZES, TrendTracker
+
+
+def exact_counts(posts):
+    """暴力解：{epoch 天數: Counter(詞組)}"""
+    days = {}
+    for post in posts:
+        counter = days.setdefault(post_epoch_day(post), Counter())
+        for text in iter_post_texts([post]):
+            for size in TREND_SIZES:
+                counter.update(iter_ngrams(text, size))
+    return days
+
+
+def brute_force_detect(posts, window_days, baseline_days, min_count, min_ratio, stop_words=()):
+    days = exact_counts(posts)
+    end_day = max(days)
+    window, baseline = Counter(), Counter()
+    for day, counter in days.items():
+        if end_day - window_days < day <= end_day:
+            window.update(counter)
+        elif end_day - window_days - baseline_days < day <= end_day - window_days:
+            baseline.update(counter)
+    trends = {}
+    for gram, count in window.items():
+        if count < min_count or gram in stop_words:
+            continue
+        ratio = (count / window_days + 1) / (baseline[gram] / baseline_days + 1)
+        if ratio >= min_ratio:
+            trends[gram] = (count, round(baseline[gram] / baseline_days, 2), round(ratio, 2))
+    return trends
+
+
+def burst_posts(rng):
+    """一般文章之外，最後兩天大量出現「法說會」"""
+    posts = make_posts(rng, 200)
+    for number, post in enumerate(posts[-30:], 171):
+        post['acceptedDate'] = f"2024-01-{27 + number % 2}T08:00:00.000Z"
+        post['title'] = '法說會' + post['title']
+    return posts
+
+
+def as_dict(trends):
+    return {trend['phrase']: (trend['window_count'], trend['baseline_avg'], trend['ratio']) for trend in trends}
+
+
+def test_detect_is_exact_under_capacity(rng, tmp_path):
+    posts = burst_posts(rng)
+    tracker = TrendTracker('Test', state_dir=tmp_path)
+    assert tracker.ingest(posts) == len(posts)
+    trends = tracker.detect(window_days=2, baseline_days=7, min_count=5, min_ratio=2.0, top_n=10 ** 6)
+    assert as_dict(trends) == brute_force_detect(posts, 2, 7, 5, 2.0)
+    assert '法說會' in as_dict(trends)
+    assert [trend['ratio'] for trend in trends] == sorted((trend['ratio'] for trend in trends), reverse=True)
+    assert {trend['date'] for trend in trends} == {'2024-01-28'}
+
+
+def test_stop_words_only_filter_detection(rng, tmp_path):
+    posts = burst_posts(rng)
+    tracker = TrendTracker('Test', stop_words={'法說會'}, state_dir=tmp_path)
+    tracker.ingest(posts)
+    trends = tracker.detect(window_days=2, min_ratio=2.0, top_n=10 ** 6)
+    assert as_dict(trends) == brute_force_detect(posts, 2, 7, 5, 2.0, stop_words={'法說會'})
+    tracker.stop_words = set()
+    assert '法說會' in as_dict(tracker.detect(window_days=2, min_ratio=2.0, top_n=10 ** 6))
+
+
+def test_incremental_ingest_and_state(rng, tmp_path):
+    posts = burst_posts(rng)
+    tracker = TrendTracker('Test', state_dir=tmp_path)
+    assert tracker.ingest(posts[:120]) == 120
+    tracker.save()
+
+    resumed = TrendTracker('Test', state_dir=tmp_path)
+    assert resumed.ingest(posts) == len(posts) - 120
+    assert resumed.ingest(posts) == 0
+    resumed.save()
+    full = TrendTracker('Other', state_dir=tmp_path)
+    full.ingest(posts)
+    options = dict(window_days=2, min_ratio=2.0, top_n=10 ** 6)
+    assert as_dict(TrendTracker('Test', state_dir=tmp_path).detect(**options)) == as_dict(full.detect(**options))
+
+
+def test_posts_without_comments_are_not_counted_yet(rng, tmp_path):
+    posts = make_posts(rng, 10)
+    pending = dict(posts[0], comments_data={})
+    tracker = TrendTracker('Test', state_dir=tmp_path)
+    assert tracker.ingest([pending] + posts[1:]) == 9
+    assert tracker.ingest(posts) == 1
+
+
+def test_bounds_when_counters_overflow(rng, tmp_path, monkeypatch):
+    monkeypatch.setattr(ptt_trend, 'DAY_CAPACITY', 8)
+    posts = burst_posts(rng)
+    tracker = TrendTracker('Test', state_dir=tmp_path)
+    tracker.ingest(posts)
+    days = exact_counts(posts)
+    end_day = to_epoch_day('2024-01-28')
+    for trend in tracker.detect(window_days=2, baseline_days=7, min_count=1, min_ratio=0, top_n=10 ** 6):
+        gram = trend['phrase']
+        window = sum(days.get(day, Counter())[gram] for day in range(end_day - 1, end_day + 1))
+        baseline = sum(days.get(day, Counter())[gram] for day in range(end_day - 8, end_day - 1))
+        assert trend['window_count'] <= window
+        assert trend['baseline_avg'] >= round(baseline / 7, 2)
+
+
+def test_retention(rng, tmp_path, monkeypatch):
+    monkeypatch.setattr(ptt_trend, 'RETENTION_DAYS', 5)
+    posts = make_posts(rng, 100)
+    tracker = TrendTracker('Test', state_dir=tmp_path)
+    tracker.ingest(posts)
+    newest = max(tracker.days)
+    assert min(tracker.days) >= newest - 5
+    assert all(day >= newest - 5 for day in tracker.seen_ids.values())
+    old = dict(posts[0], _id='old', acceptedDate='2023-01-01T00:00:00.000Z')
+    assert tracker.ingest([old]) == 0
+
+
+@pytest.mark.parametrize('content', [b'', b'garbage'])
+def test_unreadable_state_starts_empty(tmp_path, content):
+    (tmp_path / 'trend_Test.pickle').write_bytes(content)
+    tracker = TrendTracker('Test', state_dir=tmp_path)
+    assert tracker.days == {} and tracker.seen_ids == {}
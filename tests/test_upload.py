@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+import upload_to_sheets
+from upload_to_sheets import is_retryable, plan_sheets, plan_value_ranges
+
+
+def test_plan_sheets():
+    assert plan_sheets(0, 5) == [('Sheet1', 0, 0)]
+    assert plan_sheets(10, 5) == plan_sheets(10, 5, 10) == [('Sheet1', 0, 10)]
+    assert plan_sheets(25, 5, 10) == [('Sheet1', 0, 10), ('Sheet2', 10, 20), ('Sheet3', 20, 25)]
+
+
+@pytest.mark.parametrize('rows_per_sheet,max_payload', [(None, 10 ** 9), (None, 500), (7, 300), (7, 10 ** 9), (30, 1)])
+def test_plan_value_ranges(rng, rows_per_sheet, max_payload):
+    header = ['title', 'hits', 'comments_1']
+    rows = [[f"標題{i}" * rng.randint(0, 5), rng.randint(0, 999), 'x' * rng.randint(0, 60)] for i in range(30)]
+    sheets = plan_sheets(len(rows), len(header), rows_per_sheet)
+    batches = plan_value_ranges(header, rows, sheets, max_payload)
+
+    # 每個請求不超過大小上限（單一資料列本身超過上限時獨立成一個請求）
+    for ranges in batches:
+        rows_in_batch = [row for value_range in ranges for row in value_range['values']]
+        size = sum(len(json.dumps(row)) + 1 for row in rows_in_batch)
+        assert size <= max_payload or len(rows_in_batch) == 1
+
+    # 所有範圍依序組合後，每個工作表都是標題列加上該工作表的資料列，且範圍起始列正確
+    uploaded = {}
+    for ranges in batches:
+        for value_range in ranges:
+            title, start = value_range['range'].split('!A')
+            values = uploaded.setdefault(title.strip("'"), [])
+            assert int(start) == len(values) + 1
+            values.extend(value_range['values'])
+    assert uploaded == {title: [header] + rows[start:end] for title, start, end in sheets}
+    if max_payload == 10 ** 9:
+        assert len(batches) == 1
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = 'error'
+
+
+class FakeError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = FakeResponse(status)
+
+
+@pytest.mark.parametrize('status,retryable', [(429, True), (500, True), (503, True), ('502', True),
+                                              (400, False), (403, False), (404, False), (None, False)])
+def test_is_retryable(status, retryable):
+    assert is_retryable(FakeError(status)) == retryable
+    assert not is_retryable(ValueError('x'))
+
+
+def test_execute_with_retry(monkeypatch):
+    errors = pytest.importorskip('googleapiclient.errors')
+    monkeypatch.setattr(upload_to_sheets.time, 'sleep', lambda seconds: None)
+
+    class Request:
+        def __init__(self, outcomes):
+            self.outcomes = list(outcomes)
+            self.calls = 0
+
+        def execute(self):
+            self.calls += 1
+            outcome = self.outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+    def http_error(status):
+        return errors.HttpError(FakeResponse(status), b'{}')
+
+    request = Request([http_error(429), http_error(503), 'ok'])
+    assert upload_to_sheets.execute_with_retry(request, '測試') == 'ok' and request.calls == 3
+    request = Request([http_error(400), 'ok'])
+    with pytest.raises(errors.HttpError):
+        upload_to_sheets.execute_with_retry(request, '測試')
+    assert request.calls == 1
+    request = Request([ValueError('bad'), 'ok'])
+    with pytest.raises(ValueError):
+        upload_to_sheets.execute_with_retry(request, '測試')
+    assert request.calls == 1
+    request = Request([http_error(500)] * 3)
+    with pytest.raises(errors.HttpError):
+        upload_to_sheets.execute_with_retry(request, '測試')
+    assert request.calls == 3
@@ -1,20 +1,27 @@
 import json
-import pandas as pd
 import sys
 import os
 import glob
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 import pickle
+import time
+from ptt_export import SheetsFrameSink, export_board
 
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+# Google Sheets 的限制（https://support.google.com/drive/answer/37603）
+SPREADSHEET_MAX_CELLS = 10_000_000  # 單一試算表（所有工作表合計）的儲存格上限
+SHEET_MAX_CELL_CHARS = 50000  # 單一儲存格的字元上限
+MAX_PAYLOAD_BYTES = 2_000_000  # 每個 values.batchUpdate 請求的資料大小（官方建議 2 MB 以內）
+MAX_RETRIES = 3  # API 請求最大重試次數
+RETRY_DELAY = 2  # 重試前等待的秒數
+
+# pandas 與 Google API 套件在實際上傳時才載入，避免只是解析參數或轉換檔案時的啟動延遲
+
 def get_google_sheets_credentials():
     """取得 Google Sheets API 認證"""
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
     creds = None
     # token.pickle 儲存使用者的存取和更新令牌
     if os.path.exists('token.pickle'):
@@ -78,6 +85,7 @@ def get_google_sheets_credentials():
 
 def create_new_spreadsheet(service, title):
     """建立新的 Google Sheets"""
+    from googleapiclient.errors import HttpError
     spreadsheet = {
         'properties': {
             'title': title
@@ -91,226 +99,164 @@ def create_new_spreadsheet(service, title):
         print(f"建立 spreadsheet 時發生錯誤：{str(e)}")
         return None
 
-def create_new_sheet(service, spreadsheet_id, sheet_title):
-    """建立新的工作表"""
+def process_json_file(input_file):
+    """處理 JSON 檔案並轉換成 DataFrame（留言依儲存格字元上限橫向分割成多個欄位）"""
     try:
-        request = {
-            'addSheet': {
-                'properties': {
-                    'title': sheet_title
-                }
-            }
-        }
+        sink = SheetsFrameSink()
+        if export_board(input_file, [sink]) == 0:
+            print(f"處理檔案時發生錯誤：{input_file} 中沒有任何文章")
+            return None
+        return sink.frame
         
-        body = {'requests': [request]}
-        response = service.spreadsheets().batchUpdate(
-            spreadsheetId=spreadsheet_id,
-            body=body
-        ).execute()
-        
-        return response['replies'][0]['addSheet']['properties']['sheetId']
     except Exception as e:
-        print(f"建立新工作表時發生錯誤：{str(e)}")
+        print(f"處理檔案時發生錯誤：{str(e)}")
         return None
 
-def split_comments_horizontally(comments_list, max_chars=40000):
-    """將留言列表橫向分割，每個部分不超過指定字元數"""
-    result = []
-    current_chunk = []
-    current_length = 0
-    
-    for comment in comments_list:
-        comment_str = json.dumps([comment], ensure_ascii=False)
-        comment_length = len(comment_str)
-        
-        if current_length + comment_length > max_chars and current_chunk:
-            result.append(json.dumps(current_chunk, ensure_ascii=False))
-            current_chunk = [comment]
-            current_length = comment_length
-        else:
-            current_chunk.append(comment)
-            current_length += comment_length
-    
-    if current_chunk:
-        result.append(json.dumps(current_chunk, ensure_ascii=False))
-    
-    return result
+def plan_sheets(row_count, column_count, rows_per_sheet=None):
+    """規劃工作表：回傳 [(工作表名稱, 起始資料列, 結束資料列)]，資料列不含標題列
 
-def process_json_file(input_file):
-    """處理 JSON 檔案並轉換成 DataFrame"""
+    rows_per_sheet 為 None 時所有資料放在同一個工作表（Google Sheets 的上限是整個試算表的儲存格數，
+    不是每個工作表的列數）；有指定時依列數分成多個工作表，每個工作表都有自己的標題列
+    """
+    if not rows_per_sheet or row_count <= rows_per_sheet:
+        return [('Sheet1', 0, row_count)]
+    return [(f'Sheet{number + 1}', start, min(start + rows_per_sheet, row_count))
+            for number, start in enumerate(range(0, row_count, rows_per_sheet))]
+
+def plan_value_ranges(header, rows, sheets, max_payload=MAX_PAYLOAD_BYTES):
+    """將資料列打包成多個 values.batchUpdate 請求
+
+    依序走過每個工作表的資料列，以 JSON 序列化後的大小估計請求內容，累積到 max_payload 時切成下一個請求；
+    同一個請求中可以包含多個工作表的範圍。回傳 [[{'range': ..., 'values': [...]}, ...], ...]
+    """
+    batches = []
+    ranges = []
+    payload = 0
+    for title, start, end in sheets:
+        current = None
+        for offset, row in enumerate([header] + rows[start:end]):
+            size = len(json.dumps(row)) + 1
+            if payload + size > max_payload and payload:
+                batches.append(ranges)
+                ranges, payload, current = [], 0, None
+            if current is None:
+                # 新的範圍從目前的列開始（第 1 列為標題列）
+                current = {'range': f"'{title}'!A{offset + 1}", 'values': []}
+                ranges.append(current)
+            current['values'].append(row)
+            payload += size
+    if ranges:
+        batches.append(ranges)
+    return batches
+
+def is_retryable(error):
+    """API 錯誤是否為暫時性的：超過速率限制（429）或伺服器錯誤（5xx）"""
+    status = getattr(getattr(error, 'resp', None), 'status', None)
     try:
-        # 讀取 JSON 檔案
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 處理資料
-        processed_data = []
-        max_comment_parts = 1  # 追蹤最大的留言分割數
-        
-        # 第一次遍歷：處理資料並找出最大分割數
-        for item in data:
-            comments_data = item.get('comments_data', {})
-            row_data = {k: v for k, v in item.items() if k != 'comments_data'}
-            
-            # 新增留言統計
-            row_data['total_comments'] = comments_data.get('total_comments', 0)
-            row_data['like_count'] = comments_data.get('like_count', 0)
-            row_data['dislike_count'] = comments_data.get('dislike_count', 0)
-            row_data['neutral_count'] = comments_data.get('neutral_count', 0)
-            
-            # 分割留言
-            comments = comments_data.get('comments', [])
-            comments_parts = split_comments_horizontally(comments)
-            row_data['comments_parts'] = comments_parts
-            
-            max_comment_parts = max(max_comment_parts, len(comments_parts))
-            processed_data.append(row_data)
-        
-        # 建立 DataFrame 欄位
-        columns = list(processed_data[0].keys())
-        columns.remove('comments_parts')
-        for i in range(max_comment_parts):
-            columns.append(f'comments_{i+1}')
-        
-        # 建立最終資料
-        final_data = []
-        for row in processed_data:
-            comments_parts = row.pop('comments_parts')
-            row_data = list(row.values())
-            # 加入分割的留言
-            row_data.extend(comments_parts)
-            # 如果留言部分不足，補充空值
-            while len(row_data) < len(columns):
-                row_data.append('')
-            final_data.append(row_data)
-        
-        return pd.DataFrame(final_data, columns=columns)
-        
-    except Exception as e:
-        print(f"處理檔案時發生錯誤：{str(e)}")
-        return None
+        status = int(status)
+    except (TypeError, ValueError):
+        return False
+    return status == 429 or 500 <= status < 600
+
+def execute_with_retry(request, description, max_retries=MAX_RETRIES):
+    """執行 API 請求，遇到暫時性的錯誤（429、5xx）時等待後重試；其他錯誤或最後仍失敗時拋出原本的例外"""
+    from googleapiclient.errors import HttpError
+    for retry_count in range(1, max_retries + 1):
+        try:
+            return request.execute()
+        except HttpError as e:
+            if retry_count == max_retries or not is_retryable(e):
+                raise
+            print(f"{description}失敗，重試第 {retry_count} 次...（{str(e)}）")
+            time.sleep(RETRY_DELAY)
 
-def update_sheet_values(service, spreadsheet_id, data_df):
-    """更新 Google Sheets 的值"""
+def update_sheet_values(service, spreadsheet_id, data_df, rows_per_sheet=None, max_payload=MAX_PAYLOAD_BYTES):
+    """更新 Google Sheets 的值
+
+    先一次 batchUpdate 建立並調整所有工作表的大小，再以 values.batchUpdate 將資料列依請求大小打包上傳，
+    最後一次 batchUpdate 調整所有工作表的欄寬；API 請求數約為 2 + 資料大小 / max_payload
+    """
+    from googleapiclient.errors import HttpError
     try:
         # 準備要上傳的數據
-        values = [data_df.columns.values.tolist()]  # 標題列
-        values.extend(data_df.values.tolist())      # 數據列
+        header = data_df.columns.values.tolist()  # 標題列
+        rows = data_df.values.tolist()            # 數據列
+        column_count = len(header)
 
         # 檢查每個儲存格的內容長度
-        max_length = 0
-        for row in values:
+        for row in rows:
             for cell in row:
-                if isinstance(cell, str):
-                    length = len(cell)
-                    if length > max_length:
-                        max_length = length
-                    if length > 50000:
-                        print(f"警告：發現超過 50,000 字元的儲存格內容（長度：{length}）")
-                        return None
-
-        # 分批上傳數據
-        BATCH_SIZE = 100  # 每次上傳100行
-        SHEET_MAX_ROWS = 1000  # Google Sheets 每個工作表的最大行數
-        total_rows = len(values)
-        current_sheet = 1
-        
-        for start_idx in range(0, total_rows, BATCH_SIZE):
-            end_idx = min(start_idx + BATCH_SIZE, total_rows)
-            current_batch = values[start_idx:end_idx]
-            
-            # 計算目前應該使用的工作表
-            sheet_number = (start_idx // SHEET_MAX_ROWS) + 1
-            
-            # 如果需要新的工作表
-            if sheet_number > current_sheet:
-                sheet_title = f'Sheet{sheet_number}'
-                print(f"\n建立新工作表：{sheet_title}")
-                sheet_id = create_new_sheet(service, spreadsheet_id, sheet_title)
-                if sheet_id is None:
+                if isinstance(cell, str) and len(cell) > SHEET_MAX_CELL_CHARS:
+                    print(f"警告：發現超過 50,000 字元的儲存格內容（長度：{len(cell)}）")
                     return None
-                current_sheet = sheet_number
-                
-                # 在新工作表的第一行加入標題
-                if start_idx > 0:
-                    header_body = {'values': [values[0]]}  # 只有標題行
-                    service.spreadsheets().values().update(
-                        spreadsheetId=spreadsheet_id,
-                        range=f'{sheet_title}!A1',
-                        valueInputOption='RAW',
-                        body=header_body
-                    ).execute()
-            
-            # 計算在當前工作表中的相對位置
-            relative_start = (start_idx % SHEET_MAX_ROWS) + 1
-            sheet_name = f'Sheet{sheet_number}'
-            range_name = f'{sheet_name}!A{relative_start}'
-            
-            # 重試機制
-            max_retries = 3
-            retry_count = 0
-            while retry_count < max_retries:
-                try:
-                    body = {'values': current_batch}
-                    service.spreadsheets().values().update(
-                        spreadsheetId=spreadsheet_id,
-                        range=range_name,
-                        valueInputOption='RAW',
-                        body=body
-                    ).execute()
-                    print(f"成功上傳第 {start_idx + 1} 到 {end_idx} 行 (工作表：{sheet_name})")
-                    break
-                except HttpError as e:
-                    retry_count += 1
-                    if retry_count == max_retries:
-                        print(f"上傳第 {start_idx + 1} 到 {end_idx} 行失敗：{str(e)}")
-                        if "Internal error" in str(e):
-                            print("Google Sheets API 內部錯誤，請稍後再試")
-                        return None
-                    print(f"重試第 {retry_count} 次...")
-                    import time
-                    time.sleep(2)  # 等待2秒後重試
-        
-        # 為每個工作表調整欄寬
-        for sheet_num in range(1, current_sheet + 1):
+
+        sheets = plan_sheets(len(rows), column_count, rows_per_sheet)
+        total_cells = (len(rows) + len(sheets)) * column_count
+        if total_cells > SPREADSHEET_MAX_CELLS:
+            print(f"錯誤：資料共 {total_cells:,} 個儲存格，超過 Google Sheets 單一試算表 "
+                  f"{SPREADSHEET_MAX_CELLS:,} 個儲存格的上限")
+            return None
+
+        # 一次建立所有工作表並設定大小：第一個工作表（ID 為 0）沿用新試算表預設的工作表
+        requests = []
+        for sheet_id, (title, start, end) in enumerate(sheets):
+            properties = {
+                'sheetId': sheet_id,
+                'title': title,
+                'gridProperties': {'rowCount': end - start + 1, 'columnCount': column_count}
+            }
+            if sheet_id == 0:
+                requests.append({'updateSheetProperties': {
+                    'properties': properties,
+                    'fields': 'title,gridProperties(rowCount,columnCount)'
+                }})
+            else:
+                requests.append({'addSheet': {'properties': properties}})
+        print(f"正在建立 {len(sheets)} 個工作表...")
+        execute_with_retry(service.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={'requests': requests}
+        ), "建立工作表")
+
+        # 多個範圍打包成少數幾個 values.batchUpdate 請求
+        batches = plan_value_ranges(header, rows, sheets, max_payload)
+        uploaded = 0
+        for number, data in enumerate(batches, 1):
             try:
-                print(f"\n正在調整工作表 Sheet{sheet_num} 的欄寬...")
-                requests = []
-                for i in range(len(data_df.columns)):
-                    requests.append({
-                        "autoResizeDimensions": {
-                            "dimensions": {
-                                "sheetId": sheet_num - 1,  # 第一個工作表的 ID 是 0
-                                "dimension": "COLUMNS",
-                                "startIndex": i,
-                                "endIndex": i + 1
-                            }
+                execute_with_retry(service.spreadsheets().values().batchUpdate(
+                    spreadsheetId=spreadsheet_id,
+                    body={'valueInputOption': 'RAW', 'data': data}
+                ), f"上傳第 {number}/{len(batches)} 批資料")
+            except HttpError as e:
+                print(f"上傳第 {number}/{len(batches)} 批資料失敗：{str(e)}")
+                if "Internal error" in str(e):
+                    print("Google Sheets API 內部錯誤，請稍後再試")
+                return None
+            uploaded += sum(len(value_range['values']) for value_range in data)
+            print(f"成功上傳第 {number}/{len(batches)} 批（{len(data)} 個範圍，累計 {uploaded} 行）")
+
+        # 一次調整所有工作表的欄寬
+        try:
+            print(f"\n正在調整 {len(sheets)} 個工作表的欄寬...")
+            execute_with_retry(service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={'requests': [{
+                    'autoResizeDimensions': {
+                        'dimensions': {
+                            'sheetId': sheet_id,
+                            'dimension': 'COLUMNS',
+                            'startIndex': 0,
+                            'endIndex': column_count
                         }
-                    })
-                
-                # 重試機制
-                retry_count = 0
-                while retry_count < max_retries:
-                    try:
-                        service.spreadsheets().batchUpdate(
-                            spreadsheetId=spreadsheet_id,
-                            body={"requests": requests}
-                        ).execute()
-                        print(f"成功調整工作表 Sheet{sheet_num} 的欄寬")
-                        break
-                    except Exception as e:
-                        retry_count += 1
-                        if retry_count == max_retries:
-                            print(f"調整工作表 Sheet{sheet_num} 欄寬時發生錯誤：{str(e)}")
-                        else:
-                            print(f"重試調整欄寬第 {retry_count} 次...")
-                            time.sleep(2)
-                
-            except Exception as e:
-                print(f"調整工作表 Sheet{sheet_num} 欄寬時發生錯誤：{str(e)}")
-        
+                    }
+                } for sheet_id in range(len(sheets))]}
+            ), "調整欄寬")
+            print("成功調整欄寬")
+        except Exception as e:
+            print(f"調整欄寬時發生錯誤：{str(e)}")
+
         return True
-        
+
     except HttpError as e:
         print(f"更新表格內容時發生錯誤：{str(e)}")
         if "Your input contains more than the maximum of 50000 characters in a single cell" in str(e):
@@ -340,20 +286,10 @@ def list_json_files():
         except ValueError:
             print("請輸入有效的數字")
 
-def main():
-    # 選擇 JSON 檔案
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
-    else:
-        input_file = list_json_files()
-        if input_file is None:
-            return
-
-    # 處理 JSON 檔案
-    df = process_json_file(input_file)
-    if df is None:
-        return
-
+def upload_frame(df, input_file):
+    """將處理好的 DataFrame 上傳到新建立的 Google Sheets"""
+    import pandas as pd
+    from googleapiclient.discovery import build
     try:
         # 取得 Google Sheets API 認證
         print("正在連接 Google Sheets...")
@@ -381,5 +317,20 @@ def main():
     except Exception as e:
         print(f"上傳到 Google Sheets 時發生錯誤：{str(e)}")
 
+def main():
+    # 選擇 JSON 檔案
+    if len(sys.argv) > 1:
+        input_file = sys.argv[1]
+    else:
+        input_file = list_json_files()
+        if input_file is None:
+            return
+
+    # 處理 JSON 檔案
+    df = process_json_file(input_file)
+    if df is None:
+        return
+    upload_frame(df, input_file)
+
 if __name__ == '__main__':
     main()